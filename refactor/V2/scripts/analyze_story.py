@@ -0,0 +1,54 @@
+"""
+Analiza el grafo narrativo y muestra sus problemas.
+
+Uso (desde la raíz del proyecto):
+
+    python -m scripts.analyze_story
+    python -m scripts.analyze_story --dominators final_diana
+
+Termina con código 1 si hay opciones con destino inexistente o fragmentos
+inalcanzables, para poder usarlo en CI tras editar el contenido.
+"""
+
+import argparse
+import asyncio
+import sys
+
+from src.bot.database.engine import async_session
+from src.bot.services.story_graph import StoryGraphStore
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description="Analiza el grafo narrativo")
+    parser.add_argument(
+        "--dominators", action="append", default=[], metavar="FRAGMENTO",
+        help="Muestra los fragmentos por los que pasa todo camino hasta FRAGMENTO (repetible)"
+    )
+    args = parser.parse_args()
+
+    async with async_session() as session:
+        graph = await StoryGraphStore().load(session)
+    analysis = graph.analysis
+    initial = graph.initial
+
+    print(f"Fragmentos: {len(graph)}  Opciones: {len(graph.choices)}")
+    if initial:
+        print(f"Camino más largo desde el inicio: {analysis.remaining[initial.key] + 1} fragmentos")
+    else:
+        print("No hay fragmento inicial")
+
+    for choice_id, key, target in analysis.dangling:
+        print(f"Opción {choice_id} en '{key}' apunta a un fragmento inexistente: '{target}'")
+    for key in analysis.unreachable:
+        print(f"Fragmento inalcanzable: '{key}'")
+    print(f"Finales (sin opciones): {', '.join(analysis.dead_ends) or '-'}")
+
+    for key in args.dominators:
+        if not graph.fragment(key):
+            print(f"Fragmento desconocido: '{key}'")
+            continue
+        print(f"Paso obligado hasta '{key}': {' -> '.join(analysis.dominators(key)) or '-'}")
+
+    return 1 if analysis.dangling or analysis.unreachable else 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
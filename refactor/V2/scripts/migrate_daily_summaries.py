@@ -0,0 +1,21 @@
+"""
+Crea el índice único de resúmenes diarios de memorias emocionales.
+
+Uso (desde la raíz del proyecto, antes de desplegar el bot):
+
+    python -m scripts.migrate_daily_summaries
+
+Fusiona los resúmenes duplicados de una misma relación y día (UTC) y crea el
+índice ``uix_emotional_memories_daily_summary``. Es idempotente.
+"""
+
+import asyncio
+
+from src.bot.services.memory_retention import memory_retention
+
+async def main() -> None:
+    await memory_retention.migrate_schema()
+    print("Índice de resúmenes diarios listo")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,21 @@
+"""
+Añade el token de concurrencia ``step`` a los estados narrativos.
+
+Uso (desde la raíz del proyecto, antes de desplegar el bot):
+
+    python -m scripts.migrate_narrative_step
+
+Crea la columna ``user_narrative_states.step`` (0 en los estados existentes).
+Es idempotente.
+"""
+
+import asyncio
+
+from src.bot.services.narrative import UserNarrativeStateService
+
+async def main() -> None:
+    await UserNarrativeStateService().migrate_schema()
+    print("Columna step del estado narrativo lista")
+
+if __name__ == "__main__":
+    asyncio.run(main())
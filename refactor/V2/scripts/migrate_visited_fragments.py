@@ -0,0 +1,28 @@
+"""
+Convierte los fragmentos visitados de lista de claves a mapa de bits.
+
+Uso (desde la raíz del proyecto, antes de desplegar el bot):
+
+    python -m scripts.migrate_visited_fragments
+    python -m scripts.migrate_visited_fragments --chunk-size 5000
+
+Es idempotente: añade las columnas si faltan, numera los fragmentos nuevos y
+solo convierte los estados que aún no tienen mapa.
+"""
+
+import argparse
+import asyncio
+
+from src.bot.services.visited_migration import VisitedFragmentsMigration
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Migra visited_fragments a visited_bitmap")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="Estados por bloque")
+    args = parser.parse_args()
+
+    migration = VisitedFragmentsMigration(chunk_size=args.chunk_size)
+    written = await migration.migrate()
+    print(f"{written} estados narrativos convertidos")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,41 @@
+"""
+Rebasa los estados emocionales de un personaje.
+
+Uso (desde la raíz del proyecto):
+
+    python -m scripts.rebase_emotional_states Diana --base joy=60 --base trust=35
+    python -m scripts.rebase_emotional_states Lucien  # solo consolida el decaimiento
+
+El bot carga los perfiles al arrancar: reinícialo después de cambiar la base.
+"""
+
+import argparse
+import asyncio
+from typing import Dict, List
+
+from src.bot.services.emotional_rebase import EmotionalStateRebaser
+
+def parse_base(values: List[str]) -> Dict[str, float]:
+    """Convierte ``emocion=valor`` en un diccionario."""
+    base = {}
+    for value in values:
+        emotion, _, number = value.partition("=")
+        base[emotion.strip()] = float(number)
+    return base
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebasa los estados emocionales de un personaje")
+    parser.add_argument("character", help="Nombre del personaje")
+    parser.add_argument(
+        "--base", action="append", default=[], metavar="EMOCION=VALOR",
+        help="Nuevo valor base de una emoción (repetible)"
+    )
+    parser.add_argument("--chunk-size", type=int, default=10000, help="Estados por bloque")
+    args = parser.parse_args()
+
+    rebaser = EmotionalStateRebaser(chunk_size=args.chunk_size)
+    written = await rebaser.rebase(args.character, parse_base(args.base))
+    print(f"{written} estados emocionales recalculados")
+
+if __name__ == "__main__":
+    asyncio.run(main())
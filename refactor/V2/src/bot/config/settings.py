@@ -18,6 +18,8 @@ class Settings(BaseSettings):
     DATABASE_POOL_SIZE: int = 10
     DATABASE_MAX_OVERFLOW: int = 20
     DATABASE_ECHO: bool = False
+    DATABASE_PROFILE_QUERIES: bool = False
+    DATABASE_N_PLUS_ONE_THRESHOLD: int = 3
     
     # Admin settings
     ADMIN_USER_IDS: str = ""
@@ -41,7 +43,66 @@ class Settings(BaseSettings):
     ENABLE_ANALYTICS: bool = False
     ENABLE_BACKGROUND_TASKS: bool = True
     ENABLE_EMOTIONAL_SYSTEM: bool = True
-    
+    ENABLE_POINTS_LEDGER: bool = True
+
+    # Points ledger (escritura diferida de besitos)
+    POINTS_LEDGER_FLUSH_INTERVAL: float = 2.0
+    POINTS_LEDGER_MAX_PENDING: int = 500
+    POINTS_LEDGER_MAX_ATTEMPTS: int = 5
+
+    # User identity cache
+    USER_CACHE_SIZE: int = 10000
+    USER_CACHE_TTL: int = 300
+    USER_ACTIVITY_WRITE_INTERVAL: int = 60
+    USER_ACTIVITY_FLUSH_INTERVAL: int = 60
+
+    # Throttling (GCRA por usuario y por chat de grupo)
+    THROTTLE_RATE: float = 2.0
+    THROTTLE_BURST: int = 3
+    THROTTLE_CHAT_RATE: float = 5.0
+    THROTTLE_CHAT_BURST: int = 20
+    THROTTLE_POLICY: str = "drop"
+    THROTTLE_MAX_DELAY: float = 2.0
+    THROTTLE_NOTICE_COOLDOWN: float = 10.0
+
+    # Tipos de update que se descartan antes de cualquier trabajo (separados por comas)
+    IGNORED_UPDATE_TYPES: str = "edited_message,edited_channel_post,channel_post"
+
+    @property
+    def ignored_update_types(self) -> Set[str]:
+        """Devuelve los tipos de update ignorados."""
+        return {x.strip() for x in self.IGNORED_UPDATE_TYPES.split(",") if x.strip()}
+
+    # Metrics (servidor Prometheus si METRICS_PORT está definido,
+    # volcado a logs cada METRICS_LOG_INTERVAL segundos si es mayor que 0)
+    METRICS_HOST: str = "127.0.0.1"
+    METRICS_PORT: Optional[int] = None
+    METRICS_LOG_INTERVAL: int = 0
+
+    # Emotion analysis (inline, thread o process)
+    EMOTION_ANALYSIS_MODE: str = "inline"
+    EMOTION_ANALYSIS_WORKERS: int = 2
+    EMOTION_ANALYSIS_BATCH_SIZE: int = 64
+    EMOTION_ANALYSIS_BATCH_DELAY: float = 0.005
+    EMOTION_ANALYSIS_QUEUE_SIZE: int = 1000
+
+    # Emotional pipeline (sync: dentro del update; async: colas por usuario)
+    EMOTIONAL_PIPELINE_MODE: str = "sync"
+    EMOTIONAL_PIPELINE_SHARDS: int = 4
+    EMOTIONAL_PIPELINE_QUEUE_SIZE: int = 1000
+    EMOTIONAL_STATE_CACHE_TTL: int = 600
+
+    # Emotional decay toward the character baseline (seconds, 0 disables it)
+    EMOTIONAL_DECAY_HALF_LIFE: float = 86400.0
+
+    # Emotional memory retention
+    EMOTIONAL_MEMORY_MIN_IMPORTANCE: float = 0.1
+    EMOTIONAL_MEMORY_CAP: int = 200
+    EMOTIONAL_MEMORY_COMPACTION_INTERVAL: int = 3600
+
+    # In-memory story graph (seconds between content version checks)
+    STORY_GRAPH_REFRESH_INTERVAL: int = 60
+
     # Task scheduler
     TASK_SCHEDULER_TIMEZONE: str = "UTC"
     
@@ -7,12 +7,20 @@ from aiogram.fsm.storage.memory import MemoryStorage
 
 from ..config import settings
 from ..database import init_db
+from ..database.engine import async_session
 from .bot import setup_bot
 from .middleware import setup_middlewares
 from .di import setup_di_container
 from .handlers import setup_handlers
 from .errors import setup_error_handlers
 from .scheduler import setup_scheduler
+from ..services.points_ledger import points_ledger
+from ..services.activity_tracker import activity_tracker
+from ..services.character_registry import character_profile_registry
+from ..services.story_graph import story_graph_store
+from ..services.analysis_executor import analysis_executor
+from ..services.emotional_pipeline import emotional_pipeline
+from ..metrics import metrics, MetricsServer, MetricsReporter
 
 logger = structlog.get_logger()
 
@@ -24,6 +32,16 @@ async def bootstrap():
     logger.info("Inicializando base de datos")
     await init_db()
     
+    # Cargar perfiles de personajes en memoria
+    logger.info("Cargando perfiles de personajes")
+    async with async_session() as session:
+        await character_profile_registry.load(session)
+    
+    # Compilar el grafo narrativo en memoria
+    logger.info("Cargando grafo narrativo")
+    async with async_session() as session:
+        await story_graph_store.load(session)
+    
     # Crear bot y dispatcher
     logger.info("Creando bot y dispatcher")
     bot = Bot(token=settings.BOT_TOKEN, parse_mode="HTML")
@@ -45,7 +63,7 @@ async def bootstrap():
     
     # Configurar middlewares
     logger.info("Configurando middlewares")
-    setup_middlewares(dp)
+    pipeline = setup_middlewares(dp)
     
     # Configurar manejadores
     logger.info("Configurando manejadores")
@@ -55,12 +73,39 @@ async def bootstrap():
     logger.info("Configurando programador de tareas")
     scheduler = setup_scheduler()
     
+    # Exportación de métricas
+    metrics_server = None
+    if settings.METRICS_PORT:
+        metrics_server = MetricsServer(metrics, settings.METRICS_HOST, settings.METRICS_PORT)
+    metrics_reporter = None
+    if settings.METRICS_LOG_INTERVAL > 0:
+        metrics_reporter = MetricsReporter(metrics, settings.METRICS_LOG_INTERVAL)
+    
     try:
         # Iniciar programador de tareas
         if settings.ENABLE_BACKGROUND_TASKS:
             logger.info("Iniciando programador de tareas")
             scheduler.start()
         
+        # Iniciar libro de puntos
+        if settings.ENABLE_POINTS_LEDGER:
+            logger.info("Iniciando libro de puntos")
+            await points_ledger.start()
+        
+        # Iniciar ejecutor de análisis emocional
+        await analysis_executor.start()
+        
+        # Iniciar pipeline emocional asíncrono
+        if settings.ENABLE_EMOTIONAL_SYSTEM and settings.EMOTIONAL_PIPELINE_MODE == "async":
+            logger.info("Iniciando pipeline emocional")
+            await emotional_pipeline.start()
+        
+        # Iniciar exportación de métricas
+        if metrics_server:
+            await metrics_server.start()
+        if metrics_reporter:
+            await metrics_reporter.start()
+        
         # Iniciar polling
         logger.info("Iniciando polling")
         await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
@@ -69,6 +114,30 @@ async def bootstrap():
         if settings.ENABLE_BACKGROUND_TASKS:
             logger.info("Deteniendo programador de tareas")
             scheduler.shutdown(wait=True)
+            
+            # Volcar actividad pendiente
+            await activity_tracker.flush()
+        
+        # Vaciar el pipeline emocional
+        await emotional_pipeline.stop()
+        
+        # Terminar análisis y escrituras emocionales en segundo plano
+        logger.info("Deteniendo ejecutor de análisis emocional")
+        await analysis_executor.stop()
+        
+        # Volcar puntos pendientes
+        if settings.ENABLE_POINTS_LEDGER:
+            logger.info("Deteniendo libro de puntos")
+            await points_ledger.stop()
+        
+        # Detener exportación de métricas
+        if metrics_server:
+            await metrics_server.stop()
+        if metrics_reporter:
+            await metrics_reporter.stop()
+        
+        # Resumen de tiempos por etapa del pipeline
+        logger.info("Tiempos del pipeline", stages=pipeline.timings.snapshot())
         
         # Cerrar sesión del bot
         logger.info("Cerrando sesión del bot")
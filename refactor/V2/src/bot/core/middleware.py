@@ -3,35 +3,78 @@
 import structlog
 from aiogram import Dispatcher
 
-from ..middlewares.database import DatabaseMiddleware
+from ..config import settings
+from ..middlewares.filters import UpdateFilterMiddleware, BanFilterMiddleware
+from ..middlewares.database import DatabaseMiddleware, HandlerTransactionMiddleware
 from ..middlewares.user import UserMiddleware
 from ..middlewares.throttling import ThrottlingMiddleware
 from ..middlewares.emotional import EmotionalMiddleware
 from ..middlewares.points import PointsMiddleware
+from ..middlewares.metrics import HandlerTimingMiddleware
+from .pipeline import Pipeline, Stage, StageCost
 
 logger = structlog.get_logger()
 
-def setup_middlewares(dp: Dispatcher) -> None:
+# Etapas del pipeline. El orden real lo deciden el coste y la prioridad:
+# los filtros en memoria descartan updates antes de abrir una sesión.
+PIPELINE_STAGES = [
+    # Tipos de update ignorados y mensajes de bots
+    Stage("update_filter", UpdateFilterMiddleware, cost=StageCost.MEMORY, priority=10),
+    # Limitar frecuencia por usuario y chat
+    Stage("throttling", ThrottlingMiddleware, cost=StageCost.MEMORY, priority=20),
+    # Usuarios baneados presentes en el caché de identidad
+    Stage("ban_filter", BanFilterMiddleware, cost=StageCost.MEMORY, priority=30),
+    # Sesión perezosa y unidad de trabajo (proporciona la sesión al resto)
+    Stage("database", DatabaseMiddleware, cost=StageCost.DATABASE, priority=10),
+    # Garantizar que el usuario existe
+    Stage("user", UserMiddleware, cost=StageCost.DATABASE, priority=20),
+    # Sistema emocional
+    Stage(
+        "emotional",
+        EmotionalMiddleware,
+        observer="message",
+        cost=StageCost.HEAVY,
+        priority=10,
+        enabled=lambda: settings.ENABLE_EMOTIONAL_SYSTEM
+    ),
+    # Puntos (besitos)
+    Stage("points", PointsMiddleware, observer="message", cost=StageCost.HEAVY, priority=20),
+    # Confirmar el trabajo de los middlewares antes del manejador (sin bloqueos durante la E/S)
+    Stage(
+        "handler_transaction_message",
+        HandlerTransactionMiddleware,
+        observer="message",
+        cost=StageCost.HEAVY,
+        priority=900
+    ),
+    Stage(
+        "handler_transaction_callback_query",
+        HandlerTransactionMiddleware,
+        observer="callback_query",
+        cost=StageCost.HEAVY,
+        priority=900
+    ),
+    # Duración de los manejadores (último middleware interno de cada observador)
+    Stage(
+        "handler_message",
+        HandlerTimingMiddleware,
+        observer="message",
+        cost=StageCost.HEAVY,
+        priority=1000
+    ),
+    Stage(
+        "handler_callback_query",
+        HandlerTimingMiddleware,
+        observer="callback_query",
+        cost=StageCost.HEAVY,
+        priority=1000
+    ),
+]
+
+def setup_middlewares(dp: Dispatcher) -> Pipeline:
     """Configura todos los middlewares."""
-    
-    # Middleware de base de datos (debe ser el primero para proporcionar la sesión)
-    dp.update.middleware(DatabaseMiddleware())
-    logger.info("Middleware de base de datos configurado")
-    
-    # Middleware de usuarios (segundo para garantizar que el usuario existe)
-    dp.update.middleware(UserMiddleware())
-    logger.info("Middleware de usuarios configurado")
-    
-    # Middleware de throttling (limitar mensajes)
-    dp.message.middleware(ThrottlingMiddleware())
-    logger.info("Middleware de throttling configurado")
-    
-    # Middleware de sistema emocional
-    dp.message.middleware(EmotionalMiddleware())
-    logger.info("Middleware emocional configurado")
-    
-    # Middleware de puntos (besitos)
-    dp.message.middleware(PointsMiddleware())
-    logger.info("Middleware de puntos configurado")
-    
-    logger.info("Todos los middlewares configurados")
\ No newline at end of file
+    pipeline = Pipeline(PIPELINE_STAGES)
+    pipeline.install(dp)
+
+    logger.info("Todos los middlewares configurados")
+    return pipeline
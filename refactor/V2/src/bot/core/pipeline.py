@@ -0,0 +1,159 @@
+"""Pipeline declarativo de middlewares."""
+
+import enum
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import structlog
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.types import TelegramObject
+
+from ..metrics import stage_seconds
+
+logger = structlog.get_logger()
+
+class StageCost(enum.IntEnum):
+    """Coste de una etapa; las más baratas se ejecutan primero."""
+    MEMORY = 0      # Solo estado en memoria (filtros, throttling)
+    DATABASE = 1    # Necesita la sesión de base de datos
+    HEAVY = 2       # Análisis o escrituras adicionales por update
+
+class Stage:
+    """Descripción declarativa de una etapa del pipeline."""
+
+    __slots__ = ("name", "factory", "observer", "cost", "priority", "enabled")
+
+    def __init__(
+        self,
+        name: str,
+        factory: Callable[[], BaseMiddleware],
+        observer: str = "update",
+        cost: StageCost = StageCost.MEMORY,
+        priority: int = 100,
+        enabled: Callable[[], bool] = lambda: True
+    ):
+        """
+        Inicializa la etapa.
+
+        Args:
+            name: Nombre de la etapa (para logs y tiempos).
+            factory: Crea la instancia del middleware.
+            observer: Observador del dispatcher (``update``, ``message``...).
+            cost: Coste de la etapa.
+            priority: Orden entre etapas del mismo coste (menor primero).
+            enabled: Indica si la etapa está activa con la configuración actual.
+        """
+        self.name = name
+        self.factory = factory
+        self.observer = observer
+        self.cost = cost
+        self.priority = priority
+        self.enabled = enabled
+
+class StageTimings:
+    """
+    Tiempos acumulados por etapa (tiempo propio, sin las etapas siguientes).
+
+    Cada ejecución se registra también en el histograma ``bot_stage_seconds``.
+    """
+
+    def __init__(self):
+        self._stats: Dict[str, List[float]] = {}
+
+    def record(self, name: str, elapsed: float, passed: bool) -> None:
+        """Registra una ejecución de la etapa."""
+        stats = self._stats.get(name)
+        if stats is None:
+            # [llamadas, descartados, segundos totales, máximo]
+            stats = self._stats[name] = [0, 0, 0.0, 0.0]
+
+        stage_seconds.observe(elapsed, name)
+
+        stats[0] += 1
+        if not passed:
+            stats[1] += 1
+        stats[2] += elapsed
+        if elapsed > stats[3]:
+            stats[3] = elapsed
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Devuelve un resumen de los tiempos por etapa."""
+        return {
+            name: {
+                "calls": calls,
+                "stopped": stopped,
+                "avg_ms": total / calls * 1000 if calls else 0.0,
+                "max_ms": maximum * 1000,
+            }
+            for name, (calls, stopped, total, maximum) in self._stats.items()
+        }
+
+    def reset(self) -> None:
+        """Reinicia los tiempos."""
+        self._stats.clear()
+
+class TimedStage(BaseMiddleware):
+    """Envuelve un middleware para medir su tiempo propio."""
+
+    def __init__(self, name: str, middleware: BaseMiddleware, timings: StageTimings):
+        self.name = name
+        self.middleware = middleware
+        self.timings = timings
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        """Ejecuta el middleware descontando el tiempo de las etapas siguientes."""
+        downstream = [0.0]
+        called = [False]
+
+        async def timed_handler(event: TelegramObject, data: Dict[str, Any]) -> Any:
+            called[0] = True
+            start = time.perf_counter()
+            try:
+                return await handler(event, data)
+            finally:
+                downstream[0] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        try:
+            return await self.middleware(timed_handler, event, data)
+        finally:
+            elapsed = time.perf_counter() - start - downstream[0]
+            self.timings.record(self.name, elapsed, called[0])
+
+class Pipeline:
+    """
+    Conjunto ordenado de etapas.
+
+    Las etapas se registran por observador ordenadas por coste y prioridad,
+    de modo que los filtros en memoria descartan updates antes de que se abra
+    una sesión de base de datos.
+    """
+
+    def __init__(self, stages: List[Stage], timings: Optional[StageTimings] = None):
+        self.stages = stages
+        self.timings = timings or stage_timings
+
+    def ordered(self) -> List[Stage]:
+        """Devuelve las etapas activas en orden de ejecución."""
+        active = [stage for stage in self.stages if stage.enabled()]
+        return sorted(active, key=lambda stage: (stage.cost, stage.priority))
+
+    def install(self, dp: Dispatcher) -> None:
+        """Registra las etapas en el dispatcher."""
+        for stage in self.ordered():
+            observer = dp.observers[stage.observer]
+            observer.middleware(TimedStage(stage.name, stage.factory(), self.timings))
+            logger.info(
+                "Etapa del pipeline configurada",
+                stage=stage.name,
+                observer=stage.observer,
+                cost=stage.cost.name
+            )
+
+
+# Singleton instance
+stage_timings = StageTimings()
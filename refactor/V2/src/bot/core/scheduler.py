@@ -4,11 +4,15 @@ import structlog
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.jobstores.memory import MemoryJobStore
 from apscheduler.executors.pool import ThreadPoolExecutor
+from apscheduler.executors.asyncio import AsyncIOExecutor
 import pytz
 
 from ..config import settings
 from ..tasks.daily import schedule_daily_tasks
 from ..tasks.maintenance import schedule_maintenance_tasks
+from ..services.activity_tracker import activity_tracker
+from ..services.memory_retention import memory_retention
+from ..services.story_graph import story_graph_store
 
 logger = structlog.get_logger()
 
@@ -24,7 +28,8 @@ def setup_scheduler() -> AsyncIOScheduler:
     }
     
     executors = {
-        'default': ThreadPoolExecutor(20)
+        'default': ThreadPoolExecutor(20),
+        'asyncio': AsyncIOExecutor()
     }
     
     # Crear scheduler
@@ -38,6 +43,39 @@ def setup_scheduler() -> AsyncIOScheduler:
     schedule_daily_tasks(scheduler)
     schedule_maintenance_tasks(scheduler)
     
+    # Volcado en bloque de la última actividad de usuarios
+    scheduler.add_job(
+        activity_tracker.flush,
+        "interval",
+        seconds=settings.USER_ACTIVITY_FLUSH_INTERVAL,
+        id="flush_user_activity",
+        executor="asyncio",
+        coalesce=True,
+        max_instances=1
+    )
+    
+    # Compactación de memorias emocionales
+    scheduler.add_job(
+        memory_retention.compact,
+        "interval",
+        seconds=settings.EMOTIONAL_MEMORY_COMPACTION_INTERVAL,
+        id="compact_emotional_memories",
+        executor="asyncio",
+        coalesce=True,
+        max_instances=1
+    )
+    
+    # Recarga del grafo narrativo si otro proceso editó el contenido
+    scheduler.add_job(
+        story_graph_store.refresh,
+        "interval",
+        seconds=settings.STORY_GRAPH_REFRESH_INTERVAL,
+        id="refresh_story_graph",
+        executor="asyncio",
+        coalesce=True,
+        max_instances=1
+    )
+    
     logger.info("Programador de tareas configurado")
     
     return scheduler
\ No newline at end of file
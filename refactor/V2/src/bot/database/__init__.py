@@ -1,6 +1,7 @@
 """Módulo de base de datos."""
 
-from .engine import get_session, init_db
+from .engine import get_session, init_db, LazySession
 from .base import Base
+from .uow import UnitOfWork
 
-__all__ = ["get_session", "init_db", "Base"]
\ No newline at end of file
+__all__ = ["get_session", "init_db", "LazySession", "Base", "UnitOfWork"]
\ No newline at end of file
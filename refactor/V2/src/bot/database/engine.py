@@ -1,13 +1,14 @@
 """Configuración del motor de base de datos."""
 
 import logging
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator, Callable, Optional
 
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.pool import NullPool
 
 from ..config import settings
 from .base import Base
+from .instrumentation import instrument_engine
 
 # Configurar el logger
 logger = logging.getLogger(__name__)
@@ -21,6 +22,9 @@ engine = create_async_engine(
     future=True,
 )
 
+# Contar sentencias y filas por update
+instrument_engine(engine)
+
 # Crear el fabricador de sesiones
 async_session = async_sessionmaker(
     engine, expire_on_commit=False, class_=AsyncSession
@@ -46,4 +50,51 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
             await session.rollback()
             raise
         finally:
-            await session.close()
\ No newline at end of file
+            await session.close()
+
+class LazySession:
+    """
+    Proxy de ``AsyncSession`` que crea la sesión real en el primer uso.
+
+    Los updates que nunca tocan la base de datos no construyen sesión ni
+    ejecutan commit/rollback/close, y no llegan a pedir una conexión al pool.
+    """
+
+    def __init__(self, factory: Callable[[], AsyncSession] = async_session):
+        self._factory = factory
+        self._session: Optional[AsyncSession] = None
+
+    @property
+    def is_materialized(self) -> bool:
+        """Indica si la sesión real ya fue creada."""
+        return self._session is not None
+
+    def materialize(self) -> AsyncSession:
+        """Devuelve la sesión real, creándola si es necesario."""
+        if self._session is None:
+            self._session = self._factory()
+        return self._session
+
+    def __getattr__(self, name: str) -> Any:
+        # Cualquier uso de la sesión (execute, get, add, begin_nested...) la crea
+        return getattr(self.materialize(), name)
+
+    def in_transaction(self) -> bool:
+        """Indica si hay una transacción abierta (sin crear la sesión)."""
+        return self._session is not None and self._session.in_transaction()
+
+    async def commit(self) -> None:
+        """Confirma la transacción si la sesión llegó a usarse."""
+        if self._session is not None:
+            await self._session.commit()
+
+    async def rollback(self) -> None:
+        """Revierte la transacción si la sesión llegó a usarse."""
+        if self._session is not None:
+            await self._session.rollback()
+
+    async def close(self) -> None:
+        """Cierra la sesión si la sesión llegó a usarse."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
@@ -0,0 +1,123 @@
+"""Instrumentación del motor de base de datos."""
+
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, TypeVar
+import structlog
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from ..config import settings
+from ..metrics import metrics
+
+logger = structlog.get_logger()
+
+F = TypeVar("F", bound=Callable[..., Awaitable[Any]])
+
+# Sentencias por operación lógica (solo con DATABASE_PROFILE_QUERIES)
+operation_statements = metrics.counter(
+    "bot_db_operation_statements_total",
+    "Sentencias SQL por operación de servicio",
+    ["operation"]
+)
+
+class QueryStats:
+    """Sentencias y filas ejecutadas durante un update."""
+
+    __slots__ = ("statements", "rows", "shapes", "suspects")
+
+    def __init__(self, profile: bool = False):
+        self.statements = 0
+        self.rows = 0
+        # Solo con el perfilador: repeticiones por forma de sentencia y
+        # sospechosos de N+1 (sentencia -> operación que la emitió)
+        self.shapes: Optional[Dict[str, int]] = {} if profile else None
+        self.suspects: Dict[str, str] = {}
+
+# Estadísticas del update en curso (None fuera de un update)
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+# Operación de servicio en curso (la más externa)
+_current_operation: ContextVar[Optional[str]] = ContextVar("db_operation", default=None)
+
+@contextmanager
+def track_queries(profile: Optional[bool] = None) -> Iterator[QueryStats]:
+    """
+    Cuenta las sentencias ejecutadas dentro del bloque.
+
+    Con el perfilador activo, además detecta formas de sentencia repetidas
+    (probable N+1) y las registra al salir del bloque.
+    """
+    if profile is None:
+        profile = settings.DATABASE_PROFILE_QUERIES
+
+    stats = QueryStats(profile)
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+        for statement, operation in stats.suspects.items():
+            logger.warning(
+                "Posible N+1: sentencia repetida en un mismo update",
+                operation=operation,
+                repetitions=stats.shapes[statement],
+                statement=statement[:300]
+            )
+
+def profile_operation(name: str, fn: F) -> F:
+    """Envuelve un método de servicio para atribuirle las sentencias que emite."""
+    @functools.wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        # Solo cuenta la operación más externa
+        if _current_operation.get() is not None:
+            return await fn(*args, **kwargs)
+
+        token = _current_operation.set(name)
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            _current_operation.reset(token)
+
+    return wrapper
+
+def current_stats() -> Optional[QueryStats]:
+    """Devuelve las estadísticas del update en curso."""
+    return _current_stats.get()
+
+def _after_cursor_execute(
+    conn: Any,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: Any,
+    executemany: bool
+) -> None:
+    """Suma la sentencia y sus filas a las estadísticas del update."""
+    stats = _current_stats.get()
+    if stats is None:
+        return
+
+    stats.statements += 1
+    rowcount = cursor.rowcount
+    if rowcount and rowcount > 0:
+        stats.rows += rowcount
+
+    if stats.shapes is None:
+        return
+
+    # Perfilador: las sentencias ya vienen parametrizadas, así que el texto
+    # SQL identifica la forma de la consulta
+    operation = _current_operation.get() or "unknown"
+    operation_statements.inc(1, operation)
+
+    repetitions = stats.shapes.get(statement, 0) + 1
+    stats.shapes[statement] = repetitions
+    if repetitions == settings.DATABASE_N_PLUS_ONE_THRESHOLD:
+        stats.suspects[statement] = operation
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Registra los listeners de instrumentación en el motor."""
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
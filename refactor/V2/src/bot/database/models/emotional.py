@@ -3,7 +3,7 @@
 import enum
 from sqlalchemy import (
     Column, Integer, String, Text, ForeignKey, BigInteger, JSON, Float,
-    DateTime, Boolean, Index, UniqueConstraint, Enum, ARRAY
+    DateTime, Boolean, Index, UniqueConstraint, Enum, ARRAY, text
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -187,6 +187,14 @@ class EmotionalMemory(Base, TimestampMixin):
         Index("idx_emotional_memories_user_char", "user_id", "character_id"),
         Index("idx_emotional_memories_importance", "user_id", "character_id", "importance_score", "is_forgotten"),
         Index("idx_emotional_memories_last_recalled", "user_id", "character_id", "last_recalled_at"),
+        # Un resumen diario por relación y día (UTC); destino del ON CONFLICT de MemoryRetention
+        Index(
+            "uix_emotional_memories_daily_summary",
+            "relationship_id",
+            text("date(timezone('UTC', created_at))"),
+            unique=True,
+            postgresql_where=text("memory_type = 'daily_summary'")
+        ),
     )
     
     def __repr__(self) -> str:
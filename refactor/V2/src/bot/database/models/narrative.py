@@ -2,12 +2,15 @@
 
 from sqlalchemy import (
     Column, Integer, String, Text, ForeignKey, BigInteger, JSON, Float,
-    Boolean, Index, UniqueConstraint, ARRAY
+    Boolean, Index, UniqueConstraint, ARRAY, LargeBinary, Sequence
 )
 from sqlalchemy.orm import relationship
 
 from ..base import Base, TimestampMixin
 
+# Los ordinales no se reutilizan nunca, aunque se borre el fragmento
+ORDINAL_SEQUENCE = Sequence("story_fragment_ordinal_seq", minvalue=0, start=0, metadata=Base.metadata)
+
 class StoryFragment(Base, TimestampMixin):
     """Fragmentos de historia para el sistema narrativo."""
     
@@ -15,6 +18,10 @@ class StoryFragment(Base, TimestampMixin):
     
     id = Column(Integer, primary_key=True)
     key = Column(String(50), unique=True, nullable=False)
+    # Posición densa del fragmento en los mapas de bits de visitados
+    ordinal = Column(
+        Integer, server_default=ORDINAL_SEQUENCE.next_value(), unique=True, nullable=True
+    )
     title = Column(String(255), nullable=False)
     character = Column(String(50), nullable=False)
     text = Column(Text, nullable=False)
@@ -89,10 +96,15 @@ class UserNarrativeState(Base, TimestampMixin):
     current_fragment_key = Column(String(50), ForeignKey("story_fragments.key", ondelete="SET NULL"), nullable=True)
     
     # Progreso narrativo
-    visited_fragments = Column(ARRAY(String), default=[])
+    # Mapa de bits por ordinal de fragmento (ver services/fragment_bitmap.py)
+    visited_bitmap = Column(LargeBinary, nullable=True)
+    # Legado: lista de claves, convertida por scripts/migrate_visited_fragments.py
+    visited_fragments = Column(ARRAY(String), nullable=True)
     decisions_made = Column(JSON, default={})
     narrative_items = Column(JSON, default={})
     narrative_variables = Column(JSON, default={})
+    # Cambios de fragmento aplicados; los botones lo llevan como token de concurrencia
+    step = Column(Integer, nullable=False, default=0, server_default="0")
     
     # Relaciones
     user = relationship("User", back_populates="narrative_states")
@@ -0,0 +1,59 @@
+"""Unidad de trabajo por update."""
+
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, List
+import structlog
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = structlog.get_logger()
+
+class UnitOfWork:
+    """
+    Agrupa el trabajo de middlewares y manejadores de un update en una sola
+    transacción.
+
+    Cada subsistema registra su trabajo dentro de un savepoint: si falla, solo
+    se revierte ese trabajo y el resto se confirma con un único commit al
+    final del update.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.failed: List[str] = []
+        self._after_commit: List[Callable[[], None]] = []
+
+    @asynccontextmanager
+    async def savepoint(self, name: str) -> AsyncIterator[AsyncSession]:
+        """Ejecuta el trabajo de un subsistema dentro de un savepoint."""
+        try:
+            async with self.session.begin_nested():
+                yield self.session
+        except Exception as e:
+            # El savepoint ya se revirtió; el resto de la transacción sigue viva
+            self.failed.append(name)
+            logger.error(
+                "Error en subsistema, savepoint revertido",
+                subsystem=name,
+                error=str(e)
+            )
+
+    def on_commit(self, callback: Callable[[], None]) -> None:
+        """Registra una acción a ejecutar tras confirmar la transacción."""
+        self._after_commit.append(callback)
+
+    async def commit(self) -> None:
+        """Confirma la transacción del update (si hubo trabajo) y ejecuta las acciones pendientes."""
+        if self.session.in_transaction():
+            await self.session.commit()
+
+        callbacks, self._after_commit = self._after_commit, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error("Error en acción posterior al commit", error=str(e))
+
+    async def rollback(self) -> None:
+        """Revierte la transacción del update y descarta las acciones pendientes."""
+        self._after_commit.clear()
+        await self.session.rollback()
@@ -0,0 +1,297 @@
+"""Métricas del bot en memoria con exportación Prometheus y volcado a logs."""
+
+import asyncio
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+import structlog
+
+logger = structlog.get_logger()
+
+# Buckets por defecto para latencias (segundos)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Buckets para conteos pequeños (sentencias o filas por update)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+ROW_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000)
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    """Formatea las etiquetas en sintaxis Prometheus."""
+    parts = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{name}="{value}"')
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _format_value(value: float) -> str:
+    """Formatea un valor numérico."""
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Contador monótono con etiquetas."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, *labels: str) -> None:
+        """Incrementa el contador."""
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        """Devuelve las líneas en formato Prometheus."""
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in self._values.items()
+        ]
+
+    def summary(self) -> Dict[str, float]:
+        """Resumen para el volcado a logs."""
+        return {"/".join(labels) or "total": value for labels, value in self._values.items()}
+
+class Gauge:
+    """Valor instantáneo con etiquetas."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, *labels: str) -> None:
+        """Fija el valor."""
+        self._values[labels] = value
+
+    def render(self) -> List[str]:
+        """Devuelve las líneas en formato Prometheus."""
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in self._values.items()
+        ]
+
+    def summary(self) -> Dict[str, float]:
+        """Resumen para el volcado a logs."""
+        return {"/".join(labels) or "total": value for labels, value in self._values.items()}
+
+class Histogram:
+    """Histograma de buckets fijos con etiquetas."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # Por etiquetas: [conteos por bucket (+Inf al final), suma, total]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        """Registra una observación."""
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def quantile(self, labels: Tuple[str, ...], q: float) -> Optional[float]:
+        """Cota superior aproximada del cuantil ``q`` según los buckets."""
+        series = self._series.get(labels)
+        if not series or not series[2]:
+            return None
+
+        target = q * series[2]
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), series[0]):
+            cumulative += count
+            if cumulative >= target:
+                return bound
+        return float("inf")
+
+    def render(self) -> List[str]:
+        """Devuelve las líneas en formato Prometheus."""
+        lines = []
+        for labels, (counts, total, count) in self._series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total!r}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Resumen para el volcado a logs."""
+        return {
+            "/".join(labels) or "total": {
+                "count": count,
+                "avg": total / count if count else 0.0,
+                "p95": self.quantile(labels, 0.95),
+            }
+            for labels, (_, total, count) in self._series.items()
+        }
+
+Metric = Union[Counter, Gauge, Histogram]
+
+class MetricsRegistry:
+    """Registro de métricas del proceso."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Crea (o devuelve) un contador."""
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        """Crea (o devuelve) un indicador."""
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        """Crea (o devuelve) un histograma."""
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def _register(self, metric: Metric) -> Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Exporta todas las métricas en formato de texto Prometheus."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> Dict[str, Dict]:
+        """Resumen de todas las métricas para el volcado a logs."""
+        return {name: metric.summary() for name, metric in self._metrics.items()}
+
+class MetricsServer:
+    """Servidor HTTP mínimo que expone ``/metrics``."""
+
+    def __init__(self, registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 9090):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        """Inicia el servidor."""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        logger.info("Servidor de métricas iniciado", host=self.host, port=self.port)
+
+    async def stop(self) -> None:
+        """Detiene el servidor."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Atiende una petición HTTP."""
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+            # Descartar cabeceras
+            while True:
+                line = await asyncio.wait_for(reader.readline(), timeout=5)
+                if line in (b"\r\n", b"\n", b""):
+                    break
+
+            parts = request_line.decode("latin-1").split()
+            path = parts[1].split("?", 1)[0] if len(parts) > 1 else ""
+
+            if path == "/metrics":
+                status = "200 OK"
+                body = self.registry.render().encode()
+            else:
+                status = "404 Not Found"
+                body = b"not found\n"
+
+            writer.write(
+                f"HTTP/1.1 {status}\r\n"
+                "Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except Exception as e:
+            logger.debug("Error al servir métricas", error=str(e))
+        finally:
+            writer.close()
+
+class MetricsReporter:
+    """Vuelca periódicamente un resumen de las métricas como evento de structlog."""
+
+    def __init__(self, registry: MetricsRegistry, interval: float = 60.0):
+        self.registry = registry
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Inicia el volcado periódico."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Detiene el volcado periódico."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            logger.info("Métricas", **self.registry.summary())
+
+
+# Singleton instance
+metrics = MetricsRegistry()
+
+# Métricas del camino caliente
+stage_seconds = metrics.histogram(
+    "bot_stage_seconds", "Tiempo propio de cada etapa del pipeline", ["stage"]
+)
+handler_seconds = metrics.histogram(
+    "bot_handler_seconds", "Tiempo de ejecución de cada manejador", ["handler"]
+)
+update_db_statements = metrics.histogram(
+    "bot_update_db_statements", "Sentencias SQL por update", buckets=COUNT_BUCKETS
+)
+update_db_rows = metrics.histogram(
+    "bot_update_db_rows", "Filas devueltas o afectadas por update", buckets=ROW_BUCKETS
+)
@@ -1,17 +1,30 @@
 """Middleware para gestionar sesiones de base de datos."""
 
-from typing import Any, Awaitable, Callable, Dict
+from typing import Any, Awaitable, Callable, Dict, Optional
 import structlog
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject
-from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..database import get_session
+from ..database import LazySession, UnitOfWork
+from ..database.engine import async_session
+from ..database.instrumentation import track_queries
+from ..metrics import update_db_statements, update_db_rows
 
 logger = structlog.get_logger()
 
 class DatabaseMiddleware(BaseMiddleware):
-    """Middleware que proporciona una sesión de base de datos a los manejadores."""
+    """
+    Middleware que proporciona una sesión de base de datos a los manejadores.
+
+    La sesión es perezosa: los updates que no tocan la base de datos (p. ej.
+    usuarios ya cacheados sin trabajo de persistencia) no crean sesión ni
+    realizan commit, rollback o close.
+    
+    El trabajo de los middlewares se confirma antes del manejador
+    (``HandlerTransactionMiddleware``) y el del manejador y las etapas
+    posteriores con un commit al final, ambos a través de la unidad de
+    trabajo expuesta en ``data["uow"]``.
+    """
     
     async def __call__(
         self,
@@ -20,19 +33,54 @@ class DatabaseMiddleware(BaseMiddleware):
         data: Dict[str, Any]
     ) -> Any:
         """Ejecuta el middleware."""
-        # Crear sesión de base de datos
-        async for session in get_session():
-            # Añadir sesión a los datos
-            data["session"] = session
-            
+        # La sesión se crea solo si algún middleware o manejador la usa
+        session = LazySession(async_session)
+        uow = UnitOfWork(session)
+        data["session"] = session
+        data["uow"] = uow
+
+        with track_queries() as stats:
             try:
                 # Ejecutar el siguiente middleware o el manejador
-                return await handler(event, data)
+                result = await handler(event, data)
+
+                # Commit único para todo el update
+                await uow.commit()
+                return result
             except Exception as e:
                 # Hacer rollback en caso de error
-                await session.rollback()
+                await uow.rollback()
                 logger.exception("Error en el manejador", error=str(e))
                 raise
             finally:
-                # Cerrar sesión
-                await session.close()
\ No newline at end of file
+                # Cerrar sesión (no-op si nunca se usó)
+                await session.close()
+
+                # Idas y vueltas a la base de datos de este update
+                update_db_statements.observe(stats.statements)
+                update_db_rows.observe(stats.rows)
+
+class HandlerTransactionMiddleware(BaseMiddleware):
+    """
+    Confirma el trabajo de los middlewares antes de ejecutar el manejador.
+
+    Así los bloqueos de fila que toman el upsert del usuario, el UPDATE
+    emocional o los puntos no se mantienen mientras el manejador espera a la
+    API de Telegram: el manejador trabaja en una transacción nueva que
+    ``DatabaseMiddleware`` confirma al final. Sin trabajo pendiente no hace
+    nada.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        """Ejecuta el middleware."""
+        uow: Optional[UnitOfWork] = data.get("uow")
+        if uow is not None:
+            await uow.commit()
+
+        # Ejecutar el manejador
+        return await handler(event, data)
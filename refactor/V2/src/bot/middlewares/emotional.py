@@ -1,28 +1,49 @@
 """Middleware para procesar el sistema emocional."""
 
-from typing import Any, Awaitable, Callable, Dict
+from typing import Any, Awaitable, Callable, Dict, Optional
 import structlog
 from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
 from aiogram.types import Message
-from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..database import UnitOfWork
+from ..database.engine import async_session
 from ..services.emotional import EmotionalService
+from ..services.analysis_executor import AnalysisExecutor, analysis_executor
+from ..services.emotional_pipeline import EmotionalPipeline, emotional_pipeline
 from ..config import settings
 
 logger = structlog.get_logger()
 
 class EmotionalMiddleware(BaseMiddleware):
-    """Middleware que procesa el sistema emocional para cada mensaje."""
+    """
+    Middleware que procesa el sistema emocional para cada mensaje.
+
+    Con ``EMOTIONAL_PIPELINE_MODE=async`` el mensaje se encola en el pipeline
+    emocional y ``data["emotional_state"]`` contiene el último estado conocido.
+    Los manejadores marcados con el flag ``emotion_background`` tampoco
+    esperan el resultado: el análisis y la escritura se hacen en segundo plano
+    con su propia sesión.
+    """
     
-    def __init__(self, character_name: str = "Diana"):
+    def __init__(
+        self,
+        character_name: str = "Diana",
+        executor: Optional[AnalysisExecutor] = None,
+        pipeline: Optional[EmotionalPipeline] = None
+    ):
         """
         Inicializa el middleware.
         
         Args:
             character_name: Nombre del personaje principal.
+            executor: Ejecutor del análisis emocional.
+            pipeline: Pipeline emocional asíncrono.
         """
         self.character_name = character_name
         self.emotional_service = EmotionalService()
+        self.executor = executor or analysis_executor
+        self.pipeline = pipeline or emotional_pipeline
     
     async def __call__(
         self,
@@ -39,30 +60,59 @@ class EmotionalMiddleware(BaseMiddleware):
         if not settings.ENABLE_EMOTIONAL_SYSTEM:
             return await handler(event, data)
         
-        # Obtener usuario y sesión
+        # Obtener usuario y unidad de trabajo
         user_id = event.from_user.id if event.from_user else None
-        session = data.get("session")
+        language = event.from_user.language_code if event.from_user else None
+        uow: Optional[UnitOfWork] = data.get("uow")
+        
+        if user_id and self.pipeline.running:
+            # Modo asíncrono: encolar (en orden por usuario) y usar el último estado conocido
+            await self.pipeline.submit(user_id, self.character_name, event.text, language)
+            data["emotional_state"] = self.pipeline.last_state(user_id, self.character_name)
+        
+        elif user_id and get_flag(data, "emotion_background"):
+            # El manejador no espera el resultado emocional
+            self.executor.spawn(self._process_in_background(user_id, event.text, language))
         
-        # Procesar emoción solo si tenemos usuario y sesión
-        if user_id and isinstance(session, AsyncSession):
-            try:
+        # Procesar emoción solo si tenemos usuario y unidad de trabajo
+        elif user_id and uow:
+            # Analizar (en el pool si está configurado) antes de tocar la base de datos
+            impacts = await self.executor.analyze(event.text, language)
+            
+            # Un fallo del sistema emocional solo revierte su savepoint
+            async with uow.savepoint("emotional") as session:
                 # Procesar mensaje
                 emotional_result = await self.emotional_service.process_message(
-                    session, user_id, self.character_name, event.text
+                    session,
+                    user_id,
+                    self.character_name,
+                    event.text,
+                    language=language,
+                    impacts=impacts
                 )
                 
                 # Añadir resultado a los datos
                 data["emotional_state"] = emotional_result
-                
-                # Commit para guardar cambios
-                await session.commit()
-            except Exception as e:
-                logger.error(
-                    "Error al procesar estado emocional", 
-                    error=str(e), 
-                    user_id=user_id
+                uow.on_commit(
+                    lambda: self.pipeline.remember(user_id, self.character_name, emotional_result)
                 )
-                await session.rollback()
         
         # Ejecutar el siguiente middleware o el manejador
-        return await handler(event, data)
\ No newline at end of file
+        return await handler(event, data)
+    
+    async def _process_in_background(self, user_id: int, text: str, language: Optional[str]) -> None:
+        """Analiza y persiste el impacto emocional fuera del update."""
+        impacts = await self.executor.analyze(text, language)
+        
+        async with async_session() as session:
+            state = await self.emotional_service.process_message(
+                session,
+                user_id,
+                self.character_name,
+                text,
+                language=language,
+                impacts=impacts
+            )
+            await session.commit()
+        
+        self.pipeline.remember(user_id, self.character_name, state)
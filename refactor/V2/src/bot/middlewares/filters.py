@@ -0,0 +1,79 @@
+"""Middlewares de filtrado baratos (sin base de datos)."""
+
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+import structlog
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update, User as TelegramUser
+
+from ..services.user import UserIdentityCache, user_identity_cache
+from ..config import settings
+
+logger = structlog.get_logger()
+
+class UpdateFilterMiddleware(BaseMiddleware):
+    """Descarta updates irrelevantes: tipos ignorados y mensajes de otros bots."""
+
+    def __init__(self, ignored_types: Optional[Set[str]] = None):
+        """
+        Inicializa el middleware.
+
+        Args:
+            ignored_types: Tipos de update a descartar (p. ej. ``edited_message``).
+        """
+        self.ignored_types = (
+            ignored_types if ignored_types is not None else settings.ignored_update_types
+        )
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        """Ejecuta el middleware."""
+        if isinstance(event, Update) and event.event_type in self.ignored_types:
+            return None
+
+        user: Optional[TelegramUser] = data.get("event_from_user")
+        if user and user.is_bot:
+            return None
+
+        # Ejecutar el siguiente middleware o el manejador
+        return await handler(event, data)
+
+class BanFilterMiddleware(BaseMiddleware):
+    """
+    Descarta updates de usuarios baneados usando el caché de identidad.
+
+    Lee el baneo de la copia inmutable en caché; ``UserService.set_ban_status``
+    invalida la entrada al confirmarse, de modo que un baneo o una readmisión
+    se aplican desde el siguiente update. Los usuarios que no están en caché
+    siguen adelante; ``UserMiddleware`` los detiene tras cargarlos si
+    resultan estar baneados.
+    """
+
+    def __init__(self, cache: Optional[UserIdentityCache] = None):
+        """
+        Inicializa el middleware.
+
+        Args:
+            cache: Caché de identidad de usuarios.
+        """
+        self.cache = cache or user_identity_cache
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        """Ejecuta el middleware."""
+        user: Optional[TelegramUser] = data.get("event_from_user")
+        if user:
+            cached = self.cache.get(user.id)
+            if cached and cached.user.is_banned:
+                logger.debug("Update de usuario baneado descartado", user_id=user.id)
+                return None
+
+        # Ejecutar el siguiente middleware o el manejador
+        return await handler(event, data)
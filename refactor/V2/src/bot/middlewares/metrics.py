@@ -0,0 +1,33 @@
+"""Middleware para medir la duración de los manejadores."""
+
+import time
+from typing import Any, Awaitable, Callable, Dict
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from ..metrics import handler_seconds
+
+class HandlerTimingMiddleware(BaseMiddleware):
+    """
+    Mide la duración de cada manejador.
+
+    Debe ser el último middleware interno del observador para que solo mida
+    el manejador (aiogram expone el manejador elegido en ``data["handler"]``).
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        """Ejecuta el middleware."""
+        handler_object = data.get("handler")
+        callback = getattr(handler_object, "callback", None)
+        name = getattr(callback, "__qualname__", None) or repr(callback)
+
+        start = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            handler_seconds.observe(time.perf_counter() - start, name)
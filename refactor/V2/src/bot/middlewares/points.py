@@ -1,12 +1,14 @@
 """Middleware para gestionar puntos (besitos)."""
 
-from typing import Any, Awaitable, Callable, Dict
+from typing import Any, Awaitable, Callable, Dict, Optional
 import structlog
 from aiogram import BaseMiddleware
-from aiogram.types import Message, CallbackQuery, ReactionTypeUpdated
-from sqlalchemy.ext.asyncio import AsyncSession
+from aiogram.types import Message, CallbackQuery, MessageReactionUpdated
 
+from ..database import UnitOfWork
 from ..services.gamification import GamificationService
+from ..services.points_ledger import PointsLedger, points_ledger
+from ..config import settings
 from ..config.constants import (
     DEFAULT_POINTS_PER_MESSAGE,
     DEFAULT_POINTS_PER_REACTION,
@@ -19,9 +21,15 @@ logger = structlog.get_logger()
 class PointsMiddleware(BaseMiddleware):
     """Middleware que otorga puntos por interacciones."""
     
-    def __init__(self):
-        """Inicializa el middleware."""
+    def __init__(self, ledger: Optional[PointsLedger] = None):
+        """
+        Inicializa el middleware.
+        
+        Args:
+            ledger: Libro de puntos con escritura diferida.
+        """
         self.gamification_service = GamificationService()
+        self.ledger = ledger or points_ledger
     
     async def __call__(
         self,
@@ -30,9 +38,9 @@ class PointsMiddleware(BaseMiddleware):
         data: Dict[str, Any]
     ) -> Any:
         """Ejecuta el middleware."""
-        # Obtener sesión
-        session = data.get("session")
-        if not isinstance(session, AsyncSession):
+        # Obtener unidad de trabajo (solo necesaria sin libro de puntos)
+        uow: Optional[UnitOfWork] = data.get("uow")
+        if not settings.ENABLE_POINTS_LEDGER and not uow:
             return await handler(event, data)
         
         # Obtener usuario de la base de datos
@@ -62,7 +70,7 @@ class PointsMiddleware(BaseMiddleware):
                         source = "poll"
                         description = "Encuesta creada"
                 
-                elif isinstance(event, ReactionTypeUpdated):
+                elif isinstance(event, MessageReactionUpdated):
                     # Puntos por reacción
                     points = DEFAULT_POINTS_PER_REACTION
                     source = "reaction"
@@ -74,18 +82,20 @@ class PointsMiddleware(BaseMiddleware):
                 
                 # Otorgar puntos si hay puntos a otorgar
                 if points > 0:
-                    await self.gamification_service.award_points(
-                        session, db_user.id, points, source, description
-                    )
-                    
-                    # Commit para guardar cambios
-                    await session.commit()
+                    if settings.ENABLE_POINTS_LEDGER:
+                        # Registrar en memoria; el libro los vuelca en lote
+                        self.ledger.record(db_user.id, points, source)
+                    else:
+                        # Se confirma con el commit único del update
+                        async with uow.savepoint("points") as session:
+                            await self.gamification_service.award_points(
+                                session, db_user.id, points, source, description
+                            )
             except Exception as e:
                 logger.error(
                     "Error al otorgar puntos", 
                     error=str(e), 
                     user_id=db_user.id
                 )
-                await session.rollback()
         
         return result
\ No newline at end of file
@@ -1,58 +1,184 @@
 """Middleware para limitar la frecuencia de mensajes."""
 
-from typing import Any, Awaitable, Callable, Dict
-import structlog
 import asyncio
-from datetime import datetime
+import enum
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+import structlog
 from aiogram import BaseMiddleware
-from aiogram.types import Message
-from cachetools import TTLCache
+from aiogram.types import Chat, TelegramObject, Update, User as TelegramUser
+
+from ..config import settings
 
 logger = structlog.get_logger()
 
+class ThrottlePolicy(str, enum.Enum):
+    """Qué hacer con un update que supera el límite."""
+    DROP = "drop"        # Descartar en silencio
+    DEFER = "defer"      # Retrasar hasta que haya cupo (con espera máxima)
+    NOTIFY = "notify"    # Descartar y avisar una vez por periodo de enfriamiento
+
+class RateLimiter:
+    """
+    Limitador GCRA (equivalente a un token bucket) con estado compacto.
+
+    Por cada clave solo se guarda el "theoretical arrival time" como un
+    ``float`` de reloj monotónico. Las claves cuyo TAT ya pasó equivalen a un
+    cubo lleno y se purgan periódicamente.
+    """
+
+    def __init__(self, rate: float, burst: int, prune_interval: float = 60.0):
+        """
+        Inicializa el limitador.
+
+        Args:
+            rate: Updates por segundo sostenidos.
+            burst: Updates que se permiten de golpe.
+            prune_interval: Segundos entre purgas del estado.
+        """
+        self.interval = 1.0 / rate
+        self.limit = self.interval * burst
+        self.prune_interval = prune_interval
+        self._tat: Dict[int, float] = {}
+        self._next_prune = 0.0
+
+    def retry_after(self, key: int, now: float) -> float:
+        """Segundos que faltan para que la clave tenga cupo (0 si ya lo tiene)."""
+        tat = max(self._tat.get(key, now), now)
+        return max(0.0, tat + self.interval - now - self.limit)
+
+    def consume(self, key: int, now: float) -> None:
+        """Consume un cupo de la clave (aunque implique esperar)."""
+        self._tat[key] = max(self._tat.get(key, now), now) + self.interval
+
+        if now >= self._next_prune:
+            self.prune(now)
+
+    def prune(self, now: float) -> None:
+        """Elimina las claves cuyo cubo ya está lleno."""
+        self._tat = {key: tat for key, tat in self._tat.items() if tat > now}
+        self._next_prune = now + self.prune_interval
+
+    def __len__(self) -> int:
+        return len(self._tat)
+
 class ThrottlingMiddleware(BaseMiddleware):
-    """Middleware para limitar la frecuencia de mensajes de un usuario."""
-    
-    def __init__(self, rate_limit: float = 0.5):
+    """
+    Middleware para limitar la frecuencia de updates por usuario y por chat.
+
+    Se registra antes que ``DatabaseMiddleware``: los updates descartados o
+    retrasados no abren sesión ni ocupan conexiones del pool.
+    """
+
+    def __init__(
+        self,
+        rate: Optional[float] = None,
+        burst: Optional[int] = None,
+        chat_rate: Optional[float] = None,
+        chat_burst: Optional[int] = None,
+        policy: Optional[str] = None,
+        max_delay: Optional[float] = None,
+        notice_cooldown: Optional[float] = None
+    ):
         """
         Inicializa el middleware.
-        
+
         Args:
-            rate_limit: Tiempo mínimo entre mensajes en segundos.
+            rate: Updates por segundo permitidos por usuario.
+            burst: Ráfaga permitida por usuario.
+            chat_rate: Updates por segundo permitidos por chat de grupo.
+            chat_burst: Ráfaga permitida por chat de grupo.
+            policy: Política al superar el límite (drop, defer o notify).
+            max_delay: Espera máxima en segundos con la política defer.
+            notice_cooldown: Segundos entre avisos con la política notify.
         """
-        self.rate_limit = rate_limit
-        self.cache = TTLCache(maxsize=10000, ttl=60)  # Cache con TTL de 60 segundos
-    
+        self.user_limiter = RateLimiter(
+            rate or settings.THROTTLE_RATE,
+            burst or settings.THROTTLE_BURST
+        )
+        self.chat_limiter = RateLimiter(
+            chat_rate or settings.THROTTLE_CHAT_RATE,
+            chat_burst or settings.THROTTLE_CHAT_BURST
+        )
+        self.policy = ThrottlePolicy(policy or settings.THROTTLE_POLICY)
+        self.max_delay = max_delay if max_delay is not None else settings.THROTTLE_MAX_DELAY
+        self.notice_cooldown = (
+            notice_cooldown if notice_cooldown is not None else settings.THROTTLE_NOTICE_COOLDOWN
+        )
+        self._noticed_until: Dict[int, float] = {}
+
     async def __call__(
         self,
-        handler: Callable[[Message, Dict[str, Any]], Awaitable[Any]],
-        event: Message,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
         data: Dict[str, Any]
     ) -> Any:
         """Ejecuta el middleware."""
-        # Solo aplicar a mensajes
-        if not isinstance(event, Message):
+        user: Optional[TelegramUser] = data.get("event_from_user")
+        chat: Optional[Chat] = data.get("event_chat")
+
+        if not user:
             return await handler(event, data)
-        
-        # Obtener usuario
-        user_id = event.from_user.id if event.from_user else None
-        
-        if user_id:
-            # Verificar si el usuario está en el caché
-            last_time = self.cache.get(user_id)
-            current_time = datetime.now()
-            
-            if last_time:
-                # Calcular tiempo transcurrido
-                delta = (current_time - last_time).total_seconds()
-                
-                # Si no ha pasado suficiente tiempo
-                if delta < self.rate_limit:
-                    # Esperar el tiempo restante
-                    await asyncio.sleep(self.rate_limit - delta)
-            
-            # Actualizar tiempo en caché
-            self.cache[user_id] = current_time
-        
+
+        # El límite por chat solo aplica a grupos y canales
+        chat_id = chat.id if chat and chat.id != user.id else None
+
+        now = time.monotonic()
+        delay = self.user_limiter.retry_after(user.id, now)
+        if chat_id is not None:
+            delay = max(delay, self.chat_limiter.retry_after(chat_id, now))
+
+        if delay > 0:
+            if self.policy is ThrottlePolicy.DEFER and delay <= self.max_delay:
+                # Reservar el cupo y esperar sin sesión de base de datos abierta
+                self._consume(user.id, chat_id, now)
+                await asyncio.sleep(delay)
+                return await handler(event, data)
+
+            logger.debug("Update limitado", user_id=user.id, chat_id=chat_id, retry_after=delay)
+
+            if self.policy is ThrottlePolicy.NOTIFY:
+                await self._notify(event, data, user.id, chat, now)
+            return None
+
+        self._consume(user.id, chat_id, now)
+
         # Ejecutar el siguiente middleware o el manejador
-        return await handler(event, data)
\ No newline at end of file
+        return await handler(event, data)
+
+    def _consume(self, user_id: int, chat_id: Optional[int], now: float) -> None:
+        """Consume el cupo del usuario y, si aplica, del chat."""
+        self.user_limiter.consume(user_id, now)
+        if chat_id is not None:
+            self.chat_limiter.consume(chat_id, now)
+
+    async def _notify(
+        self,
+        event: TelegramObject,
+        data: Dict[str, Any],
+        user_id: int,
+        chat: Optional[Chat],
+        now: float
+    ) -> None:
+        """Avisa al usuario una sola vez por periodo de enfriamiento."""
+        if self._noticed_until.get(user_id, 0.0) > now:
+            return
+
+        self._noticed_until[user_id] = now + self.notice_cooldown
+        if len(self._noticed_until) > len(self.user_limiter) * 2 + 100:
+            self._noticed_until = {
+                key: until for key, until in self._noticed_until.items() if until > now
+            }
+
+        bot = data.get("bot")
+        if bot is None:
+            return
+
+        text = "Vas muy rápido. Espera unos segundos antes de continuar."
+        try:
+            if isinstance(event, Update) and event.callback_query:
+                await bot.answer_callback_query(event.callback_query.id, text=text)
+            elif chat:
+                await bot.send_message(chat.id, text)
+        except Exception as e:
+            logger.warning("No se pudo enviar el aviso de límite", user_id=user_id, error=str(e))
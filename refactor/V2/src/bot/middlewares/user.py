@@ -1,18 +1,43 @@
 """Middleware para gestionar usuarios."""
 
-from typing import Any, Awaitable, Callable, Dict
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
 import structlog
 from aiogram import BaseMiddleware
-from aiogram.types import Message, CallbackQuery, TelegramObject
-from sqlalchemy.ext.asyncio import AsyncSession
+from aiogram.types import Message, CallbackQuery, TelegramObject, User as TelegramUser
 
-from ..services.user import UserService
+from ..database import UnitOfWork
+from ..services.user import UserService, UserIdentityCache, UserSnapshot, user_identity_cache
+from ..services.activity_tracker import ActivityTracker, activity_tracker
+from ..config import settings
 
 logger = structlog.get_logger()
 
 class UserMiddleware(BaseMiddleware):
-    """Middleware que garantiza que el usuario existe en la base de datos."""
-    
+    """
+    Middleware que garantiza que el usuario existe en la base de datos.
+
+    Deja en ``data["db_user"]`` un ``UserSnapshot`` (id, baneo y roles), no
+    una entidad ORM: los manejadores que necesiten el usuario completo lo
+    cargan en su propia sesión.
+    """
+
+    def __init__(
+        self,
+        cache: Optional[UserIdentityCache] = None,
+        tracker: Optional[ActivityTracker] = None
+    ):
+        """
+        Inicializa el middleware.
+
+        Args:
+            cache: Caché de identidad de usuarios.
+            tracker: Registro diferido de última actividad.
+        """
+        self.user_service = UserService()
+        self.cache = cache or user_identity_cache
+        self.activity_tracker = tracker or activity_tracker
+
     async def __call__(
         self,
         handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
@@ -21,44 +46,68 @@ class UserMiddleware(BaseMiddleware):
     ) -> Any:
         """Ejecuta el middleware."""
         # Obtener usuario de Telegram
-        user = None
-        if isinstance(event, Message):
-            user = event.from_user
-        elif isinstance(event, CallbackQuery):
-            user = event.from_user
-        
-        # Si hay usuario y sesión de base de datos
-        if user and "session" in data:
-            session: AsyncSession = data["session"]
-            
-            # Crear o actualizar usuario
-            user_service = UserService()
+        user = self._get_telegram_user(event, data)
+
+        # Si hay usuario y unidad de trabajo
+        uow: Optional[UnitOfWork] = data.get("uow")
+        if user and uow:
             user_data = {
                 "username": user.username,
                 "first_name": user.first_name,
                 "last_name": user.last_name,
                 "language_code": user.language_code
             }
-            
-            try:
-                # Crear o actualizar usuario
-                db_user = await user_service.create_or_update_user(
-                    session, user.id, user_data
-                )
-                
-                # Añadir usuario a los datos
-                data["db_user"] = db_user
-                
-                # Actualizar última actividad
-                await user_service.update(
-                    session, user.id, {"last_activity_at": "NOW()"}
-                )
-                
-                # Commit para guardar cambios
-                await session.commit()
-            except Exception as e:
-                logger.error("Error al gestionar usuario", error=str(e), user_id=user.id)
-                await session.rollback()
-        
+            fingerprint = self.cache.fingerprint(user_data)
+            cached = self.cache.get(user.id)
+
+            if cached and cached.fingerprint == fingerprint:
+                # Perfil sin cambios: no hace falta escribir el usuario
+                # (los baneados en caché ya se descartan en BanFilterMiddleware)
+                data["db_user"] = cached.user
+
+                if settings.ENABLE_BACKGROUND_TASKS:
+                    # El programador vuelca la actividad en bloque
+                    self.activity_tracker.touch(user.id)
+                else:
+                    # Sin programador: escribir como mucho una vez por intervalo
+                    now = time.monotonic()
+                    if now - cached.activity_written_at >= settings.USER_ACTIVITY_WRITE_INTERVAL:
+                        async with uow.savepoint("user_activity") as session:
+                            await self.user_service.touch_activity(session, user.id)
+                        uow.on_commit(lambda: setattr(cached, "activity_written_at", now))
+            else:
+                # Usuario nuevo o perfil modificado: un único upsert
+                db_user = None
+                async with uow.savepoint("user") as session:
+                    db_user, _ = await self.user_service.upsert_user(
+                        session, user.id, user_data
+                    )
+
+                if db_user is not None:
+                    snapshot = UserSnapshot(db_user)
+                    data["db_user"] = snapshot
+
+                    # Cachear solo si la transacción se confirma
+                    uow.on_commit(lambda: self.cache.put(user.id, fingerprint, snapshot))
+
+                    # Los usuarios baneados no llegan a las etapas siguientes
+                    if snapshot.is_banned:
+                        logger.debug("Update de usuario baneado descartado", user_id=user.id)
+                        return None
+
         # Ejecutar el siguiente middleware o el manejador
-        return await handler(event, data)
\ No newline at end of file
+        return await handler(event, data)
+
+    def _get_telegram_user(
+        self, event: TelegramObject, data: Dict[str, Any]
+    ) -> Optional[TelegramUser]:
+        """Obtiene el usuario de Telegram que originó el evento."""
+        # aiogram resuelve el usuario del update en el contexto del evento
+        user = data.get("event_from_user")
+        if user:
+            return user
+
+        if isinstance(event, (Message, CallbackQuery)):
+            return event.from_user
+
+        return None
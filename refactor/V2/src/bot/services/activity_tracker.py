@@ -0,0 +1,84 @@
+"""Registro diferido de la última actividad de los usuarios."""
+
+import asyncio
+from datetime import datetime, timezone
+from typing import Dict, Optional
+import structlog
+from sqlalchemy import update, values, column, or_, BigInteger, DateTime
+
+from ..database.engine import async_session
+from ..database.models.user import User
+
+logger = structlog.get_logger()
+
+class ActivityTracker:
+    """
+    Acumula en memoria la última actividad de cada usuario.
+
+    Las marcas de tiempo se truncan al minuto y se vuelcan en bloque con un
+    único ``UPDATE users ... FROM (VALUES ...)`` desde el programador de tareas.
+    """
+
+    def __init__(self):
+        self.logger = structlog.get_logger(service="ActivityTracker")
+        self._pending: Dict[int, datetime] = {}
+        self._lock = asyncio.Lock()
+
+    def touch(self, user_id: int, when: Optional[datetime] = None) -> None:
+        """Registra actividad de un usuario (precisión de minutos)."""
+        when = (when or datetime.now(timezone.utc)).replace(second=0, microsecond=0)
+
+        current = self._pending.get(user_id)
+        if current is None or when > current:
+            self._pending[user_id] = when
+
+    @property
+    def pending_count(self) -> int:
+        """Número de usuarios con actividad pendiente de volcar."""
+        return len(self._pending)
+
+    async def flush(self) -> int:
+        """Vuelca la actividad pendiente. Devuelve el número de usuarios enviados."""
+        async with self._lock:
+            if not self._pending:
+                return 0
+
+            pending, self._pending = self._pending, {}
+
+            activity = values(
+                column("user_id", BigInteger),
+                column("last_activity_at", DateTime(timezone=True)),
+                name="activity"
+            ).data(list(pending.items()))
+
+            query = (
+                update(User)
+                .where(
+                    User.id == activity.c.user_id,
+                    # No retroceder marcas escritas por otra vía (p. ej. upsert)
+                    or_(
+                        User.last_activity_at.is_(None),
+                        User.last_activity_at < activity.c.last_activity_at
+                    )
+                )
+                .values(last_activity_at=activity.c.last_activity_at)
+                .execution_options(synchronize_session=False)
+            )
+
+            try:
+                async with async_session() as session:
+                    await session.execute(query)
+                    await session.commit()
+            except Exception as e:
+                # Reincorporar la actividad para el siguiente volcado
+                for user_id, when in pending.items():
+                    self.touch(user_id, when)
+                self.logger.error("Error al volcar actividad de usuarios", error=str(e))
+                return 0
+
+            self.logger.debug("Actividad de usuarios volcada", users=len(pending))
+            return len(pending)
+
+
+# Singleton instance
+activity_tracker = ActivityTracker()
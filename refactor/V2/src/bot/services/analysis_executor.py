@@ -0,0 +1,201 @@
+"""Ejecutor de análisis emocional fuera del bucle de eventos."""
+
+import asyncio
+from array import array
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Awaitable, List, Optional, Set, Tuple
+import structlog
+
+from .emotion_analyzer import emotion_analyzers
+from ..config import settings
+
+logger = structlog.get_logger()
+
+# Elemento de la cola: idioma, texto y futuro del resultado
+_Item = Tuple[Optional[str], str, asyncio.Future]
+
+def analyze_batch(items: List[Tuple[Optional[str], str]]) -> List[array]:
+    """
+    Analiza un lote de mensajes.
+
+    Se ejecuta en el pool; en procesos hijos cada proceso carga sus propios
+    léxicos la primera vez.
+    """
+    return [emotion_analyzers.get(language).analyze(text) for language, text in items]
+
+class AnalysisExecutor:
+    """
+    Agrupa los mensajes en micro-lotes y los analiza en un pool de hilos o
+    procesos.
+
+    La cola es acotada: ``analyze`` espera si está llena (backpressure) y
+    devuelve el resultado como awaitable. En modo ``inline`` el análisis se
+    hace directamente en el bucle de eventos, lo más rápido para léxicos
+    pequeños.
+
+    Al detenerse, los mensajes del lote en curso y los que quedan en cola se
+    analizan en el bucle, de modo que ningún ``analyze`` queda esperando.
+    """
+
+    def __init__(
+        self,
+        mode: str = "inline",
+        workers: int = 2,
+        batch_size: int = 64,
+        batch_delay: float = 0.005,
+        queue_size: int = 1000
+    ):
+        """
+        Inicializa el ejecutor.
+
+        Args:
+            mode: ``inline``, ``thread`` o ``process``.
+            workers: Hilos o procesos del pool.
+            batch_size: Mensajes máximos por lote.
+            batch_delay: Segundos que se espera para completar un lote.
+            queue_size: Mensajes máximos pendientes de análisis.
+        """
+        if mode not in ("inline", "thread", "process"):
+            raise ValueError(f"Modo de análisis desconocido: {mode}")
+
+        self.mode = mode
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.logger = structlog.get_logger(service="AnalysisExecutor")
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._pool: Optional[Executor] = None
+        self._task: Optional[asyncio.Task] = None
+        self._background: Set[asyncio.Task] = set()
+        self._in_flight: List[_Item] = []
+
+    async def start(self) -> None:
+        """Inicia el pool y el bucle de lotes."""
+        if self.mode == "inline" or self._task is not None:
+            return
+
+        if self.mode == "process":
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        else:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="emotion-analysis"
+            )
+        self._task = asyncio.create_task(self._run())
+        self.logger.info("Ejecutor de análisis iniciado", mode=self.mode, workers=self.workers)
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Espera las tareas en segundo plano y detiene el pool."""
+        if self._background:
+            await asyncio.wait(set(self._background), timeout=timeout)
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        # Los mensajes que quedaron en cola se analizan en el bucle
+        while not self._queue.empty():
+            self._resolve_inline([self._queue.get_nowait()])
+
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+            self.logger.info("Ejecutor de análisis detenido")
+
+    async def analyze(self, text: str, language: Optional[str] = None) -> array:
+        """Analiza un mensaje; espera si la cola está llena."""
+        if self._task is None:
+            return emotion_analyzers.get(language).analyze(text)
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((language, text, future))
+        return await future
+
+    def spawn(self, coro: Awaitable[Any]) -> asyncio.Task:
+        """Ejecuta una corrutina en segundo plano (fire-and-forget) y la sigue hasta que termine."""
+        task = asyncio.ensure_future(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background_done)
+        return task
+
+    def _background_done(self, task: asyncio.Task) -> None:
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.logger.error("Error en tarea emocional en segundo plano", error=str(task.exception()))
+
+    @property
+    def pending(self) -> int:
+        """Mensajes en cola."""
+        return self._queue.qsize()
+
+    def _resolve_inline(self, batch: List[_Item]) -> None:
+        """Analiza en el bucle los mensajes de un lote aún sin resultado."""
+        for language, text, future in batch:
+            if future.done():
+                continue
+            try:
+                future.set_result(emotion_analyzers.get(language).analyze(text))
+            except Exception as e:
+                future.set_exception(e)
+
+    async def _next_batch(self) -> List[_Item]:
+        """Espera un mensaje y completa el lote durante ``batch_delay``."""
+        # El lote se registra en curso a medida que sale de la cola
+        self._in_flight = batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.batch_delay
+
+        while len(batch) < self.batch_size:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self) -> None:
+        """Bucle de micro-lotes."""
+        try:
+            await self._process_batches()
+        except asyncio.CancelledError:
+            # El lote en curso ya salió de la cola: resolverlo antes de salir
+            self._resolve_inline(self._in_flight)
+            self._in_flight = []
+            raise
+
+    async def _process_batches(self) -> None:
+        """Analiza lotes en el pool hasta que se cancela el bucle."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            try:
+                results = await loop.run_in_executor(
+                    self._pool, analyze_batch, [(language, text) for language, text, _ in batch]
+                )
+            except Exception as e:
+                self.logger.error("Error al analizar lote", size=len(batch), error=str(e))
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                self._in_flight = []
+                continue
+
+            for (_, _, future), impacts in zip(batch, results):
+                if not future.done():
+                    future.set_result(impacts)
+            self._in_flight = []
+
+
+# Singleton instance
+analysis_executor = AnalysisExecutor(
+    mode=settings.EMOTION_ANALYSIS_MODE,
+    workers=settings.EMOTION_ANALYSIS_WORKERS,
+    batch_size=settings.EMOTION_ANALYSIS_BATCH_SIZE,
+    batch_delay=settings.EMOTION_ANALYSIS_BATCH_DELAY,
+    queue_size=settings.EMOTION_ANALYSIS_QUEUE_SIZE,
+)
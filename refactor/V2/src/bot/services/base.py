@@ -1,12 +1,15 @@
 """Clase base para servicios."""
 
+import inspect
 from typing import TypeVar, Generic, Optional, List, Any, Dict, Type
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import update, delete
 import structlog
 
+from ..config import settings
 from ..database.base import Base
+from ..database.instrumentation import profile_operation
 
 T = TypeVar('T', bound=Base)
 logger = structlog.get_logger()
@@ -14,6 +17,22 @@ logger = structlog.get_logger()
 class BaseService(Generic[T]):
     """Clase base para servicios que proporcionan operaciones comunes de CRUD."""
     
+    def __init_subclass__(cls, **kwargs: Any):
+        """Con el perfilador activo, atribuye las sentencias a cada método público."""
+        super().__init_subclass__(**kwargs)
+        if not settings.DATABASE_PROFILE_QUERIES:
+            return
+
+        names = {
+            name
+            for klass in cls.__mro__ if issubclass(klass, BaseService)
+            for name in vars(klass)
+        }
+        for name in names:
+            method = inspect.unwrap(getattr(cls, name))
+            if not name.startswith("_") and inspect.iscoroutinefunction(method):
+                setattr(cls, name, profile_operation(f"{cls.__name__}.{name}", method))
+    
     def __init__(self, model_class: Type[T]):
         self.model_class = model_class
         self.logger = structlog.get_logger(service=self.__class__.__name__)
@@ -0,0 +1,106 @@
+"""Registro en memoria de los perfiles emocionales de personajes."""
+
+from types import MappingProxyType
+from typing import Any, Dict, Optional
+import structlog
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session
+
+from ..config.constants import EMOTION_TYPES
+from ..database.models.emotional import CharacterEmotionalProfile
+
+logger = structlog.get_logger()
+
+# Marca en ``session.info`` de que la transacción modificó perfiles
+PROFILES_CHANGED_KEY = "character_profiles_changed"
+
+class CharacterProfileSnapshot:
+    """Copia inmutable de un perfil emocional de personaje."""
+
+    __slots__ = ("id", "character_name", "personality_traits", *(f"base_{e}" for e in EMOTION_TYPES))
+
+    def __init__(self, profile: CharacterEmotionalProfile):
+        set_ = object.__setattr__
+        set_(self, "id", profile.id)
+        set_(self, "character_name", profile.character_name)
+        set_(self, "personality_traits", MappingProxyType(dict(profile.personality_traits or {})))
+        for emotion in EMOTION_TYPES:
+            set_(self, f"base_{emotion}", getattr(profile, f"base_{emotion}"))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("Los perfiles del registro son de solo lectura")
+
+    def __repr__(self) -> str:
+        return f"<CharacterProfileSnapshot(id={self.id}, name={self.character_name})>"
+
+class CharacterProfileRegistry:
+    """
+    Registro versionado de perfiles de personajes, por nombre y por id.
+
+    Se carga al arrancar y se recarga la siguiente vez que se consulta tras
+    confirmarse una transacción que modificó perfiles. Las lecturas no tocan
+    la base de datos.
+    """
+
+    def __init__(self):
+        self.logger = structlog.get_logger(service="CharacterProfileRegistry")
+        self._by_name: Dict[str, CharacterProfileSnapshot] = {}
+        self._by_id: Dict[int, CharacterProfileSnapshot] = {}
+        self.version = 0
+        self._loaded_version = -1
+
+    @property
+    def is_stale(self) -> bool:
+        """Indica si el registro debe recargarse."""
+        return self._loaded_version != self.version
+
+    async def load(self, session: AsyncSession) -> None:
+        """Carga todos los perfiles y sustituye el contenido del registro."""
+        version = self.version
+        result = await session.execute(select(CharacterEmotionalProfile))
+        snapshots = [CharacterProfileSnapshot(profile) for profile in result.scalars().all()]
+
+        # Sustitución atómica de los índices
+        self._by_name = {snapshot.character_name: snapshot for snapshot in snapshots}
+        self._by_id = {snapshot.id: snapshot for snapshot in snapshots}
+        self._loaded_version = version
+
+        self.logger.info("Perfiles de personajes cargados", profiles=len(snapshots), version=version)
+
+    async def ensure_loaded(self, session: AsyncSession) -> None:
+        """Recarga el registro si fue invalidado."""
+        if self.is_stale:
+            await self.load(session)
+
+    def invalidate(self) -> None:
+        """Marca el registro para recargarlo en la siguiente consulta."""
+        self.version += 1
+
+    def get_by_name(self, character_name: str) -> Optional[CharacterProfileSnapshot]:
+        """Obtiene un perfil por nombre de personaje."""
+        return self._by_name.get(character_name)
+
+    def get_by_id(self, character_id: int) -> Optional[CharacterProfileSnapshot]:
+        """Obtiene un perfil por id."""
+        return self._by_id.get(character_id)
+
+def mark_profiles_changed(session: AsyncSession) -> None:
+    """Indica que la transacción de la sesión modifica perfiles."""
+    session.info[PROFILES_CHANGED_KEY] = True
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    """Invalida el registro cuando se confirma una edición de perfiles."""
+    if session.info.pop(PROFILES_CHANGED_KEY, False):
+        character_profile_registry.invalidate()
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    """Descarta la marca si la edición se revierte."""
+    session.info.pop(PROFILES_CHANGED_KEY, None)
+
+
+# Singleton instance
+character_profile_registry = CharacterProfileRegistry()
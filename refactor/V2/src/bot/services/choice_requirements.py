@@ -0,0 +1,187 @@
+"""Requisitos de las opciones narrativas."""
+
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple, TypeVar
+import structlog
+from sqlalchemy import JSON, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from .points_ledger import points_ledger
+from ..database.models.emotional import CharacterEmotionalProfile, UserCharacterRelationship
+from ..database.models.gamification import UserPoints
+from ..database.models.narrative import UserNarrativeState
+
+logger = structlog.get_logger()
+
+C = TypeVar("C")
+
+class UserFacts:
+    """Datos de un usuario contra los que se evalúan los requisitos."""
+
+    __slots__ = ("points", "relationship_levels", "items")
+
+    def __init__(
+        self,
+        points: float = 0.0,
+        relationship_levels: Optional[Mapping[str, int]] = None,
+        items: Optional[Mapping[str, int]] = None
+    ):
+        self.points = points
+        self.relationship_levels = relationship_levels or {}
+        self.items = items or {}
+
+    def __repr__(self) -> str:
+        return f"<UserFacts(points={self.points}, relationships={len(self.relationship_levels)}, items={len(self.items)})>"
+
+def _required_items(required_items: Any) -> Tuple[Tuple[str, int], ...]:
+    """Normaliza ``required_items``: ``{clave: cantidad}`` o lista de claves."""
+    if not required_items:
+        return ()
+    if isinstance(required_items, Mapping):
+        return tuple((str(key), int(quantity)) for key, quantity in required_items.items())
+    return tuple((str(key), 1) for key in required_items)
+
+class ChoiceRequirement:
+    """
+    Requisitos de una opción compilados en una lista de comprobaciones.
+
+    Solo se generan las comprobaciones de los requisitos presentes, así que
+    evaluar una opción sin requisitos no cuesta nada y no exige datos.
+    """
+
+    __slots__ = ("checks", "description")
+
+    def __init__(
+        self,
+        required_items: Any = None,
+        required_relationship_level: Optional[int] = None,
+        required_points: Optional[float] = None,
+        character: Optional[str] = None
+    ):
+        """
+        Compila los requisitos.
+
+        Args:
+            required_items: Elementos narrativos necesarios.
+            required_relationship_level: Nivel mínimo de relación con ``character``.
+            required_points: Puntos mínimos.
+            character: Personaje del fragmento de la opción.
+        """
+        checks: List[Callable[[UserFacts], bool]] = []
+        description: Dict[str, Any] = {}
+
+        if required_points:
+            points = float(required_points)
+            checks.append(lambda facts: facts.points >= points)
+            description["points"] = points
+
+        if required_relationship_level:
+            level = int(required_relationship_level)
+            checks.append(lambda facts: facts.relationship_levels.get(character, 0) >= level)
+            description["relationship_level"] = level
+            description["character"] = character
+
+        for key, quantity in _required_items(required_items):
+            checks.append(lambda facts, key=key, quantity=quantity: facts.items.get(key, 0) >= quantity)
+            description.setdefault("items", {})[key] = quantity
+
+        self.checks: Tuple[Callable[[UserFacts], bool], ...] = tuple(checks)
+        self.description = description
+
+    @classmethod
+    def for_choice(cls, choice: Any, character: Optional[str]) -> "ChoiceRequirement":
+        """Compila los requisitos de una ``NarrativeChoice``."""
+        return cls(
+            choice.required_items,
+            choice.required_relationship_level,
+            choice.required_points,
+            character
+        )
+
+    @property
+    def unconditional(self) -> bool:
+        """Indica si la opción no tiene requisitos."""
+        return not self.checks
+
+    def __call__(self, facts: Optional[UserFacts]) -> bool:
+        """Evalúa los requisitos contra los datos del usuario."""
+        if not self.checks:
+            return True
+        return facts is not None and all(check(facts) for check in self.checks)
+
+    def __repr__(self) -> str:
+        return f"<ChoiceRequirement({self.description or 'sin requisitos'})>"
+
+class RequirementEngine:
+    """
+    Filtra opciones por sus requisitos.
+
+    Los datos del usuario (puntos, nivel de relación con cada personaje y
+    elementos narrativos) se leen con una sola consulta de subconsultas
+    escalares por renderizado, y solo si alguna opción tiene requisitos. A
+    los puntos guardados se suman los pendientes del ``PointsLedger``.
+    """
+
+    def __init__(self):
+        self.logger = structlog.get_logger(service="RequirementEngine")
+
+    async def fetch_facts(self, session: AsyncSession, user_id: int) -> UserFacts:
+        """Lee todos los datos de requisitos de un usuario en una consulta."""
+        points = select(UserPoints.current_points).where(
+            UserPoints.user_id == user_id
+        ).scalar_subquery()
+
+        relationship_levels = (
+            select(
+                func.json_object_agg(
+                    CharacterEmotionalProfile.character_name,
+                    UserCharacterRelationship.relationship_level,
+                    type_=JSON
+                )
+            )
+            .select_from(UserCharacterRelationship)
+            .join(
+                CharacterEmotionalProfile,
+                CharacterEmotionalProfile.id == UserCharacterRelationship.character_id
+            )
+            .where(UserCharacterRelationship.user_id == user_id)
+            .scalar_subquery()
+        )
+
+        items = select(UserNarrativeState.narrative_items).where(
+            UserNarrativeState.user_id == user_id
+        ).scalar_subquery()
+
+        result = await session.execute(select(points, relationship_levels, items))
+        stored_points, levels, narrative_items = result.one()
+
+        return UserFacts(
+            (stored_points or 0.0) + points_ledger.pending_points(user_id),
+            levels or {},
+            narrative_items or {}
+        )
+
+    async def facts_for(
+        self, session: AsyncSession, user_id: int, requirements: Iterable[ChoiceRequirement]
+    ) -> Optional[UserFacts]:
+        """Datos del usuario si alguno de los requisitos los necesita; None si no."""
+        if all(requirement.unconditional for requirement in requirements):
+            return None
+        return await self.fetch_facts(session, user_id)
+
+    async def available(
+        self,
+        session: AsyncSession,
+        user_id: int,
+        choices: Iterable[C],
+        requirement: Callable[[C], ChoiceRequirement]
+    ) -> List[C]:
+        """Opciones cuyos requisitos cumple el usuario (``requirement`` da los de cada una)."""
+        choices = list(choices)
+        requirements = [requirement(choice) for choice in choices]
+        facts = await self.facts_for(session, user_id, requirements)
+        return [choice for choice, check in zip(choices, requirements) if check(facts)]
+
+
+# Singleton instance
+requirement_engine = RequirementEngine()
@@ -0,0 +1,132 @@
+"""Analizadores de impacto emocional de mensajes."""
+
+import json
+import re
+from abc import ABC, abstractmethod
+import unicodedata
+from array import array
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple
+import structlog
+
+from ..config.constants import EMOTION_TYPES
+
+logger = structlog.get_logger()
+
+# Directorio con un léxico JSON por idioma (es.json, en.json...)
+LEXICONS_DIR = Path(__file__).resolve().parent.parent / "data" / "lexicons"
+DEFAULT_LANGUAGE = "es"
+
+# Posición de cada emoción en los vectores de impacto
+EMOTION_SLOTS = {emotion: index for index, emotion in enumerate(EMOTION_TYPES)}
+
+def normalize_text(text: str) -> str:
+    """Pasa a minúsculas y elimina acentos."""
+    text = text.casefold()
+    if text.isascii():
+        return text
+
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+class EmotionAnalyzer(ABC):
+    """
+    Interfaz de los analizadores.
+
+    ``analyze`` devuelve un ``array('d')`` con un impacto por emoción en el
+    orden de ``EMOTION_TYPES``.
+    """
+
+    @abstractmethod
+    def analyze(self, text: str) -> array:
+        """Calcula el impacto emocional de un texto."""
+
+class KeywordEmotionAnalyzer(EmotionAnalyzer):
+    """
+    Analizador por palabras clave con un único regex compilado.
+
+    Todas las palabras del léxico se combinan en una alternancia con límites
+    de palabra; cada emoción presente en el texto aporta su impacto una vez.
+    """
+
+    def __init__(self, lexicon: Dict[str, Tuple[float, Sequence[str]]]):
+        """
+        Inicializa el analizador.
+
+        Args:
+            lexicon: Por emoción, su impacto y sus palabras clave.
+        """
+        self._slots: Dict[str, int] = {}
+        self._impacts = array("d", bytes(8 * len(EMOTION_TYPES)))
+
+        for emotion, (impact, words) in lexicon.items():
+            slot = EMOTION_SLOTS[emotion]
+            self._impacts[slot] = impact
+            for word in words:
+                self._slots[normalize_text(word)] = slot
+
+        # Las palabras más largas primero para que ganen la alternancia
+        words = sorted(self._slots, key=len, reverse=True)
+        self._pattern = (
+            re.compile(r"\b(?:" + "|".join(map(re.escape, words)) + r")\b")
+            if words else None
+        )
+
+    @classmethod
+    def from_file(cls, path: Path) -> "KeywordEmotionAnalyzer":
+        """Crea el analizador a partir de un léxico JSON."""
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+
+        lexicon = {
+            emotion: (float(entry["impact"]), entry["words"])
+            for emotion, entry in data["emotions"].items()
+        }
+        return cls(lexicon)
+
+    def analyze(self, text: str) -> array:
+        """Calcula el impacto emocional de un texto."""
+        impacts = array("d", bytes(8 * len(EMOTION_TYPES)))
+        if self._pattern is None:
+            return impacts
+
+        slots = self._slots
+        for word in self._pattern.findall(normalize_text(text)):
+            slot = slots[word]
+            impacts[slot] = self._impacts[slot]
+        return impacts
+
+class AnalyzerRegistry:
+    """Analizadores por idioma, cargados bajo demanda desde los léxicos."""
+
+    def __init__(self, lexicons_dir: Path = LEXICONS_DIR, default_language: str = DEFAULT_LANGUAGE):
+        self.lexicons_dir = lexicons_dir
+        self.default_language = default_language
+        self._analyzers: Dict[str, EmotionAnalyzer] = {}
+
+    def get(self, language: Optional[str] = None) -> EmotionAnalyzer:
+        """Obtiene el analizador de un idioma (``es``, ``es-ES``...) o el predeterminado."""
+        language = (language or self.default_language).split("-")[0].lower()
+
+        analyzer = self._analyzers.get(language)
+        if analyzer is None:
+            path = self.lexicons_dir / f"{language}.json"
+            if path.exists():
+                analyzer = KeywordEmotionAnalyzer.from_file(path)
+                logger.info("Léxico emocional cargado", language=language)
+            elif language != self.default_language:
+                analyzer = self.get(self.default_language)
+            else:
+                logger.warning("Léxico emocional no encontrado", language=language)
+                analyzer = KeywordEmotionAnalyzer({})
+            self._analyzers[language] = analyzer
+
+        return analyzer
+
+    def register(self, language: str, analyzer: EmotionAnalyzer) -> None:
+        """Registra un analizador propio para un idioma."""
+        self._analyzers[language] = analyzer
+
+
+# Singleton instance
+emotion_analyzers = AnalyzerRegistry()
@@ -0,0 +1,117 @@
+"""Vector compacto de las ocho emociones."""
+
+from array import array
+from typing import Any, Dict, Iterable, Iterator, Mapping, Optional, Union
+
+from ..config.constants import EMOTION_TYPES
+
+# Umbral por debajo del cual la emoción dominante es ``neutral``
+NEUTRAL_THRESHOLD = 30.0
+
+_SIZE = len(EMOTION_TYPES)
+_SLOTS = {emotion: index for index, emotion in enumerate(EMOTION_TYPES)}
+_ZEROS = bytes(8 * _SIZE)
+
+class EmotionVector:
+    """
+    Valores de las emociones en un ``array('d')`` en el orden de ``EMOTION_TYPES``.
+
+    Las operaciones devuelven vectores nuevos; el vector se puede indexar por
+    posición o por nombre de emoción e iterar como una secuencia de floats.
+    """
+
+    __slots__ = ("values",)
+
+    def __init__(self, values: Optional[Iterable[float]] = None):
+        """
+        Crea un vector.
+
+        Args:
+            values: Un valor por emoción; sin valores, el vector es cero. Un
+                ``array('d')`` se usa sin copiar.
+        """
+        if values is None:
+            values = array("d", _ZEROS)
+        elif not (isinstance(values, array) and values.typecode == "d"):
+            values = array("d", values)
+        if len(values) != _SIZE:
+            raise ValueError(f"Se esperaban {_SIZE} emociones, no {len(values)}")
+        self.values = values
+
+    @classmethod
+    def from_row(cls, row: Any, prefix: str = "") -> "EmotionVector":
+        """Lee las emociones de una fila ORM (``joy``...) o de sus bases (``prefix='base_'``)."""
+        return cls(array("d", [getattr(row, prefix + emotion) for emotion in EMOTION_TYPES]))
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, float]) -> "EmotionVector":
+        """Crea un vector desde un diccionario por emoción; las que faltan valen 0."""
+        values = array("d", _ZEROS)
+        for emotion, value in data.items():
+            slot = _SLOTS.get(emotion)
+            if slot is not None:
+                values[slot] = value
+        return cls(values)
+
+    def to_dict(self) -> Dict[str, float]:
+        """Diccionario por emoción (serializable a JSON)."""
+        return dict(zip(EMOTION_TYPES, self.values))
+
+    def apply_to(self, row: Any, prefix: str = "") -> None:
+        """Escribe las emociones en una fila ORM."""
+        for emotion, value in zip(EMOTION_TYPES, self.values):
+            setattr(row, prefix + emotion, value)
+
+    def add(self, other: Iterable[float], scale: float = 1.0) -> "EmotionVector":
+        """Suma ``other * scale``."""
+        return EmotionVector(array("d", [a + b * scale for a, b in zip(self.values, other)]))
+
+    def scale(self, factor: float) -> "EmotionVector":
+        """Multiplica todas las emociones por ``factor``."""
+        return EmotionVector(array("d", [value * factor for value in self.values]))
+
+    def clamp(self, low: float = 0.0, high: float = 100.0) -> "EmotionVector":
+        """Acota todas las emociones al rango ``[low, high]``."""
+        return EmotionVector(array("d", [min(high, max(low, value)) for value in self.values]))
+
+    def toward(self, base: Iterable[float], factor: float) -> "EmotionVector":
+        """Acerca el vector a ``base`` conservando ``factor`` de la distancia."""
+        return EmotionVector(
+            array("d", [b + (value - b) * factor for value, b in zip(self.values, base)])
+        )
+
+    def dominant(self, threshold: float = NEUTRAL_THRESHOLD) -> str:
+        """La primera emoción con el valor máximo o ``neutral`` si el máximo es menor que ``threshold``."""
+        peak = max(self.values)
+        if peak < threshold:
+            return "neutral"
+        return EMOTION_TYPES[self.values.index(peak)]
+
+    def magnitude(self) -> float:
+        """Suma de los valores absolutos."""
+        return sum(abs(value) for value in self.values)
+
+    def __getitem__(self, key: Union[int, str]) -> float:
+        if isinstance(key, str):
+            return self.values[_SLOTS[key]]
+        return self.values[key]
+
+    def __iter__(self) -> Iterator[float]:
+        return iter(self.values)
+
+    def __len__(self) -> int:
+        return _SIZE
+
+    def __bool__(self) -> bool:
+        return any(self.values)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, EmotionVector):
+            return self.values == other.values
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        values = ", ".join(f"{emotion}={value:g}" for emotion, value in zip(EMOTION_TYPES, self.values))
+        return f"<EmotionVector({values})>"
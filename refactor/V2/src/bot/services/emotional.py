@@ -1,11 +1,11 @@
 """Servicio para el sistema emocional."""
 
-from typing import Optional, Dict, Any, List, Tuple
+from typing import Optional, Dict, Any, List, Sequence, Tuple, Union
 import structlog
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import update, and_, desc, func
+from sqlalchemy import Update, update, and_, desc, func, case
 
 from .base import BaseService
 from ..database.models.emotional import (
@@ -16,14 +16,24 @@ from ..database.models.emotional import (
     PersonalityAdaptation,
     RelationshipStatusEnum
 )
+from .character_registry import character_profile_registry, mark_profiles_changed
+from .emotion_analyzer import AnalyzerRegistry, emotion_analyzers
+from .emotional_decay import emotional_decay, profile_baseline
+from .emotion_vector import EmotionVector, NEUTRAL_THRESHOLD
+from .memory_retention import DAILY_SUMMARY_TYPE, memory_retention
+from .relationship_progression import relationship_progression
+from ..config.constants import EMOTION_TYPES
 
 logger = structlog.get_logger()
 
 class EmotionalService:
     """Servicio para gestionar el sistema emocional."""
     
-    def __init__(self):
+    def __init__(self, analyzers: Optional[AnalyzerRegistry] = None):
         self.logger = structlog.get_logger(service="EmotionalService")
+        self.analyzers = analyzers or emotion_analyzers
+        self.memory_retention = memory_retention
+        self.progression = relationship_progression
         self.profile_service = CharacterProfileService()
         self.relationship_service = RelationshipService()
         self.emotional_state_service = EmotionalStateService()
@@ -37,11 +47,16 @@ class EmotionalService:
         character_name: str,
         message_text: str,
         context_type: str = "conversation",
-        context_id: Optional[str] = None
+        context_id: Optional[str] = None,
+        language: Optional[str] = None,
+        impacts: Optional[Sequence[float]] = None
     ) -> Dict[str, Any]:
         """
         Procesa un mensaje del usuario y actualiza el estado emocional del personaje.
         
+        Si ``impacts`` viene ya calculado (p. ej. por el ejecutor de análisis),
+        no se vuelve a analizar el mensaje.
+        
         Retorna un diccionario con la información emocional actualizada.
         """
         self.logger.debug(
@@ -50,70 +65,72 @@ class EmotionalService:
             character=character_name
         )
         
-        # Obtener o crear perfil del personaje
-        character = await self.profile_service.get_by_name(session, character_name)
-        if not character:
-            # Si no existe, usar perfil predeterminado
-            self.logger.warning("Perfil de personaje no encontrado, usando predeterminado", character=character_name)
-            character = await self.profile_service.create_default_profile(session, character_name)
+        # Analizar el mensaje con el léxico del idioma del usuario
+        if impacts is None:
+            impacts = self.analyzers.get(language).analyze(message_text)
+        emotional_impact = impacts if isinstance(impacts, EmotionVector) else EmotionVector(impacts)
         
-        # Obtener o crear relación
-        relationship = await self.relationship_service.get_or_create(
-            session, user_id, character.id
-        )
-        
-        # Obtener estado emocional actual
-        emotional_state = await self.emotional_state_service.get_by_relationship(
-            session, relationship.id
-        )
+        # Perfil del personaje desde el registro en memoria
+        await character_profile_registry.ensure_loaded(session)
+        character = character_profile_registry.get_by_name(character_name)
         
-        # Analizar el mensaje (en una implementación real, aquí habría un análisis de NLP)
-        # Por ahora, usamos una implementación simple
-        emotional_impact = self._analyze_message_simple(message_text)
+        # Aplicar impacto y registrar la interacción en una sola sentencia
+        applied = None
+        if character:
+            applied = await self.emotional_state_service.apply_interaction(
+                session, user_id, character.id, emotional_impact, profile_baseline(character)
+            )
         
-        # Actualizar estado emocional
-        updated_state = await self.emotional_state_service.update_from_impact(
-            session, emotional_state.id, emotional_impact
+        if applied is None:
+            # Primer contacto: crear perfil, relación, estado y adaptación
+            if not character:
+                character = await self.profile_service.get_by_name(session, character_name)
+            if not character:
+                # Si no existe, usar perfil predeterminado
+                self.logger.warning("Perfil de personaje no encontrado, usando predeterminado", character=character_name)
+                character = await self.profile_service.create_default_profile(session, character_name)
+            
+            await self.relationship_service.get_or_create(session, user_id, character.id)
+            
+            applied = await self.emotional_state_service.apply_interaction(
+                session, user_id, character.id, emotional_impact, profile_baseline(character)
+            )
+            if applied is None:
+                self.logger.error("Estado emocional no encontrado", user_id=user_id, character=character_name)
+                raise ValueError(f"Estado emocional de {character_name} no encontrado")
+        
+        updated_state, relationship = applied
+        
+        # Crear memoria emocional (la compactación agrega después las de importancia mínima)
+        await self.memory_retention.record(
+            session,
+            user_id,
+            updated_state.character_id,
+            updated_state.relationship_id,
+            message_text,
+            emotional_impact,
+            self._calculate_importance(emotional_impact)
         )
         
-        # Crear memoria emocional
-        memory_data = {
-            "user_id": user_id,
-            "character_id": character.id,
-            "relationship_id": relationship.id,
-            "memory_type": "message",
-            "summary": f"El usuario dijo: {message_text[:50]}{'...' if len(message_text) > 50 else ''}",
-            "details": message_text,
-            "emotional_context": emotional_impact,
-            "importance_score": self._calculate_importance(emotional_impact)
-        }
-        
-        memory = await self.memory_service.create(session, memory_data)
+        # Transición de nivel o estado de la relación (aplicada en el mismo UPDATE)
+        transition = self.progression.transition(updated_state.relationship_id, relationship)
+        if transition:
+            self.progression.emit(transition)
         
-        # Actualizar contador de interacciones
-        await self.relationship_service.increment_interactions(
-            session, relationship.id
-        )
+        # Valores actuales (sin impacto la fila no se escribe y se aplica el decaimiento)
+        emotions = emotional_decay.current_values(updated_state, profile_baseline(character))
         
         # Preparar respuesta
         response = {
-            "character_name": character.character_name,
-            "dominant_emotion": updated_state.dominant_emotion,
-            "emotional_state": {
-                "joy": updated_state.joy,
-                "trust": updated_state.trust,
-                "fear": updated_state.fear,
-                "sadness": updated_state.sadness,
-                "anger": updated_state.anger,
-                "surprise": updated_state.surprise,
-                "anticipation": updated_state.anticipation,
-                "disgust": updated_state.disgust
-            },
+            "character_name": character_name,
+            "dominant_emotion": emotions.dominant(),
+            "emotional_state": emotions.to_dict(),
             "relationship": {
                 "status": relationship.relationship_status.value,
                 "level": relationship.relationship_level,
                 "trust_level": relationship.trust_level
-            }
+            },
+            "relationship_transition": transition.to_dict() if transition else None
         }
         
         return response
@@ -129,7 +146,8 @@ class EmotionalService:
         )
         
         # Obtener perfil del personaje
-        character = await self.profile_service.get_by_name(session, character_name)
+        await character_profile_registry.ensure_loaded(session)
+        character = character_profile_registry.get_by_name(character_name)
         if not character:
             self.logger.warning("Perfil de personaje no encontrado", character=character_name)
             return None
@@ -158,6 +176,9 @@ class EmotionalService:
             session, relationship.id
         )
         
+        # Valores actuales con el decaimiento hacia la base del personaje
+        emotions = emotional_decay.current_values(emotional_state, profile_baseline(character))
+        
         # Preparar resumen
         summary = {
             "character_name": character.character_name,
@@ -170,15 +191,8 @@ class EmotionalService:
                 "last_interaction": relationship.last_interaction_at.isoformat()
             },
             "emotional_state": {
-                "dominant_emotion": emotional_state.dominant_emotion,
-                "joy": emotional_state.joy,
-                "trust": emotional_state.trust,
-                "fear": emotional_state.fear,
-                "sadness": emotional_state.sadness,
-                "anger": emotional_state.anger,
-                "surprise": emotional_state.surprise,
-                "anticipation": emotional_state.anticipation,
-                "disgust": emotional_state.disgust
+                "dominant_emotion": emotions.dominant(),
+                **emotions.to_dict()
             },
             "personality_adaptation": {
                 "warmth": personality.warmth,
@@ -207,57 +221,10 @@ class EmotionalService:
         # Lucien
         await self.profile_service.create_default_profile(session, "Lucien")
     
-    def _analyze_message_simple(self, message_text: str) -> Dict[str, float]:
-        """
-        Análisis simple de mensaje (placeholder).
-        
-        En una implementación real, esto utilizaría NLP para analizar el mensaje.
-        """
-        # Implementación básica como placeholder
-        message = message_text.lower()
-        
-        emotional_impact = {
-            "joy": 0.0,
-            "trust": 0.0,
-            "fear": 0.0,
-            "sadness": 0.0,
-            "anger": 0.0,
-            "surprise": 0.0,
-            "anticipation": 0.0,
-            "disgust": 0.0
-        }
-        
-        # Palabras clave simples (en una implementación real esto sería mucho más sofisticado)
-        if any(word in message for word in ["feliz", "contento", "alegre", "divertido"]):
-            emotional_impact["joy"] = 0.6
-        
-        if any(word in message for word in ["confío", "creo", "seguro"]):
-            emotional_impact["trust"] = 0.5
-            
-        if any(word in message for word in ["miedo", "terror", "asustado"]):
-            emotional_impact["fear"] = 0.7
-            
-        if any(word in message for word in ["triste", "deprimido", "dolor"]):
-            emotional_impact["sadness"] = 0.6
-            
-        if any(word in message for word in ["enojado", "furioso", "molesto"]):
-            emotional_impact["anger"] = 0.7
-            
-        if any(word in message for word in ["wow", "increíble", "sorprendente"]):
-            emotional_impact["surprise"] = 0.6
-            
-        if any(word in message for word in ["espero", "ansioso", "pronto"]):
-            emotional_impact["anticipation"] = 0.5
-            
-        if any(word in message for word in ["asco", "repulsivo", "repugnante"]):
-            emotional_impact["disgust"] = 0.7
-        
-        return emotional_impact
-    
-    def _calculate_importance(self, emotional_impact: Dict[str, float]) -> float:
+    def _calculate_importance(self, emotional_impact: EmotionVector) -> float:
         """Calcula la importancia de una interacción basada en su impacto emocional."""
         # Suma de valores absolutos de impacto emocional
-        importance = sum(abs(value) for value in emotional_impact.values())
+        importance = emotional_impact.magnitude()
         
         # Normalizar al rango 0.1-3.0
         importance = min(3.0, max(0.1, importance / 2))
@@ -271,6 +238,35 @@ class CharacterProfileService(BaseService[CharacterEmotionalProfile]):
     def __init__(self):
         super().__init__(CharacterEmotionalProfile)
     
+    async def create(self, session: AsyncSession, data: Dict[str, Any]) -> CharacterEmotionalProfile:
+        """Crea un perfil e invalida el registro al confirmar la transacción."""
+        mark_profiles_changed(session)
+        return await super().create(session, data)
+    
+    async def update(
+        self, session: AsyncSession, id: Any, data: Dict[str, Any]
+    ) -> Optional[CharacterEmotionalProfile]:
+        """Actualiza un perfil e invalida el registro al confirmar la transacción."""
+        mark_profiles_changed(session)
+        return await super().update(session, id, data)
+    
+    async def delete(self, session: AsyncSession, id: Any) -> bool:
+        """Elimina un perfil e invalida el registro al confirmar la transacción."""
+        mark_profiles_changed(session)
+        return await super().delete(session, id)
+    
+    async def update_bulk(
+        self, session: AsyncSession, filter_dict: Dict[str, Any], data: Dict[str, Any]
+    ) -> int:
+        """Actualiza perfiles en bloque e invalida el registro al confirmar la transacción."""
+        mark_profiles_changed(session)
+        return await super().update_bulk(session, filter_dict, data)
+    
+    async def delete_bulk(self, session: AsyncSession, filter_dict: Dict[str, Any]) -> int:
+        """Elimina perfiles en bloque e invalida el registro al confirmar la transacción."""
+        mark_profiles_changed(session)
+        return await super().delete_bulk(session, filter_dict)
+    
     async def get_by_name(self, session: AsyncSession, character_name: str) -> Optional[CharacterEmotionalProfile]:
         """Obtiene un perfil de personaje por su nombre."""
         self.logger.debug("Obteniendo perfil por nombre", character=character_name)
@@ -436,12 +432,20 @@ class RelationshipService(BaseService[UserCharacterRelationship]):
         """Actualiza el nivel de confianza de una relación."""
         self.logger.debug("Actualizando nivel de confianza", relationship_id=relationship_id, change=change)
         
-        relationship = await self.get_by_id(session, relationship_id)
-        if relationship:
-            new_trust = max(0.0, min(1.0, relationship.trust_level + change))
-            return await self.update(session, relationship_id, {"trust_level": new_trust})
-        
-        return None
+        # Ajuste atómico en el servidor, sin SELECT previo
+        query = (
+            update(UserCharacterRelationship)
+            .where(UserCharacterRelationship.id == relationship_id)
+            .values(
+                trust_level=func.least(
+                    1.0, func.greatest(0.0, UserCharacterRelationship.trust_level + change)
+                )
+            )
+            .returning(UserCharacterRelationship)
+            .execution_options(synchronize_session=False)
+        )
+        result = await session.execute(query, execution_options={"populate_existing": True})
+        return result.scalars().first()
 
 
 class EmotionalStateService(BaseService[UserCharacterEmotionalState]):
@@ -473,23 +477,19 @@ class EmotionalStateService(BaseService[UserCharacterEmotionalState]):
             character_id=character_id
         )
         
-        # Obtener valores base del personaje
-        character_service = CharacterProfileService()
-        character = await character_service.get_by_id(session, character_id)
+        # Obtener valores base del personaje (el registro no incluye perfiles
+        # creados en la transacción en curso)
+        character = character_profile_registry.get_by_id(character_id)
+        if character is None:
+            character_service = CharacterProfileService()
+            character = await character_service.get_by_id(session, character_id)
         
         # Crear estado emocional inicial
         state_data = {
             "user_id": user_id,
             "character_id": character_id,
             "relationship_id": relationship_id,
-            "joy": character.base_joy,
-            "trust": character.base_trust,
-            "fear": character.base_fear,
-            "sadness": character.base_sadness,
-            "anger": character.base_anger,
-            "surprise": character.base_surprise,
-            "anticipation": character.base_anticipation,
-            "disgust": character.base_disgust,
+            **profile_baseline(character).to_dict(),
             "dominant_emotion": "neutral"
         }
         
@@ -497,7 +497,10 @@ class EmotionalStateService(BaseService[UserCharacterEmotionalState]):
         return state
     
     async def update_from_impact(
-        self, session: AsyncSession, state_id: int, emotional_impact: Dict[str, float]
+        self,
+        session: AsyncSession,
+        state_id: int,
+        emotional_impact: Union[EmotionVector, Dict[str, float]]
     ) -> UserCharacterEmotionalState:
         """Actualiza un estado emocional basado en un impacto emocional."""
         self.logger.debug("Actualizando estado emocional", state_id=state_id)
@@ -508,50 +511,179 @@ class EmotionalStateService(BaseService[UserCharacterEmotionalState]):
             self.logger.error("Estado emocional no encontrado", state_id=state_id)
             raise ValueError(f"Estado emocional {state_id} no encontrado")
         
-        # Aplicar impacto emocional
-        update_data = {}
-        for emotion, impact in emotional_impact.items():
-            if hasattr(state, emotion) and impact != 0:
-                # Calcular nuevo valor
-                current = getattr(state, emotion)
-                new_value = max(0.0, min(100.0, current + impact * 10))  # Escalar impacto
-                update_data[emotion] = new_value
-        
-        # Actualizar solo si hay cambios
-        if update_data:
-            # Actualizar estado
+        # Valores actuales con el decaimiento hacia la base del personaje
+        current = emotional_decay.current_values(
+            state, profile_baseline(character_profile_registry.get_by_id(state.character_id))
+        )
+        
+        if not isinstance(emotional_impact, EmotionVector):
+            emotional_impact = EmotionVector.from_dict(emotional_impact)
+        
+        # Actualizar solo si hay cambios (partiendo de los valores decaídos)
+        if emotional_impact:
+            new_values = current.add(emotional_impact, 10).clamp()  # Escalar impacto
+            update_data = new_values.to_dict()
+            update_data["dominant_emotion"] = new_values.dominant()
             state = await self.update(session, state_id, update_data)
-            
-            # Determinar emoción dominante
-            dominant = await self._calculate_dominant_emotion(state)
-            if dominant != state.dominant_emotion:
-                state = await self.update(session, state_id, {"dominant_emotion": dominant})
         
         return state
     
+    async def apply_interaction(
+        self,
+        session: AsyncSession,
+        user_id: int,
+        character_id: int,
+        emotional_impact: EmotionVector,
+        baseline: Optional[EmotionVector] = None
+    ) -> Optional[Tuple[UserCharacterEmotionalState, Any]]:
+        """
+        Aplica un impacto emocional y registra la interacción en una sola sentencia.
+        
+        Un CTE incrementa ``interaction_count`` de la relación, aplica su
+        progresión (familiaridad, sintonía, confianza, nivel y estado) y el UPDATE del
+        estado aplica el impacto con aritmética SQL, recalculando la emoción
+        dominante en el servidor. Con ``baseline`` (las bases del personaje)
+        el impacto parte del valor ya decaído hacia la base. Devuelve el estado y una fila con
+        ``relationship_status``, ``relationship_level``, ``trust_level``,
+        ``familiarity`` y ``rapport`` de la relación, más ``previous_status``
+        y ``previous_level`` (los de antes de la interacción), o None si la
+        relación o el estado aún no existen.
+        """
+        self.logger.debug("Aplicando interacción", user_id=user_id, character_id=character_id)
+        
+        # Fila previa bloqueada: RETURNING solo devuelve los valores nuevos
+        previous = (
+            select(
+                UserCharacterRelationship.id,
+                UserCharacterRelationship.relationship_status,
+                UserCharacterRelationship.relationship_level
+            )
+            .where(
+                and_(
+                    UserCharacterRelationship.user_id == user_id,
+                    UserCharacterRelationship.character_id == character_id
+                )
+            )
+            .with_for_update()
+            .subquery("previous")
+        )
+        
+        relationship = (
+            update(UserCharacterRelationship)
+            .where(UserCharacterRelationship.id == previous.c.id)
+            .values(
+                interaction_count=UserCharacterRelationship.interaction_count + 1,
+                last_interaction_at=func.now(),
+                **relationship_progression.sql_values(emotional_impact)
+            )
+            .returning(
+                UserCharacterRelationship.id,
+                UserCharacterRelationship.relationship_status,
+                UserCharacterRelationship.relationship_level,
+                UserCharacterRelationship.trust_level,
+                UserCharacterRelationship.familiarity,
+                UserCharacterRelationship.rapport,
+                previous.c.relationship_status.label("previous_status"),
+                previous.c.relationship_level.label("previous_level")
+            )
+            .cte("relationship")
+        )
+        
+        relationship_columns = (
+            relationship.c.relationship_status,
+            relationship.c.relationship_level,
+            relationship.c.trust_level,
+            relationship.c.familiarity,
+            relationship.c.rapport,
+            relationship.c.previous_status,
+            relationship.c.previous_level
+        )
+        
+        state_update = self._impact_update(emotional_impact, baseline, relationship.c.id)
+        if state_update is not None:
+            query = (
+                state_update
+                .returning(UserCharacterEmotionalState, *relationship_columns)
+                .execution_options(synchronize_session=False)
+            )
+        else:
+            # Sin impacto la fila no se escribe; el decaimiento se calcula al leer
+            query = select(UserCharacterEmotionalState, *relationship_columns).where(
+                UserCharacterEmotionalState.relationship_id == relationship.c.id
+            )
+        
+        result = await session.execute(
+            query, execution_options={"populate_existing": True}
+        )
+        row = result.first()
+        if row is None:
+            return None
+        
+        return row[0], row
+    
+    def _impact_update(
+        self,
+        emotional_impact: EmotionVector,
+        baseline: Optional[EmotionVector],
+        relationship_id: Any
+    ) -> Optional[Update]:
+        """
+        Construye el UPDATE del impacto emocional sobre el estado de la relación.
+        
+        Cada emoción se escala y se acota con ``LEAST(100, GREATEST(0, col + :d))``,
+        donde ``col`` es el valor decaído hacia ``baseline`` si se indica (en
+        ese caso se reescriben todas las emociones). Los valores nuevos se
+        calculan una sola vez en la subconsulta ``impact``, que bloquea la
+        fila para leer su última versión; la emoción dominante se calcula
+        sobre sus columnas con el mismo criterio que ``EmotionVector.dominant``:
+        la primera con el valor máximo o ``neutral`` si el máximo es menor que 30.
+        """
+        if not emotional_impact:
+            return None
+        
+        state = UserCharacterEmotionalState
+        deltas = dict(zip(EMOTION_TYPES, emotional_impact.scale(10)))  # Escalar impacto
+        
+        current = emotional_decay.sql_values(state, baseline)
+        decayed = emotional_decay.enabled and baseline is not None
+        
+        impact = (
+            select(
+                state.id,
+                *[
+                    (func.least(100.0, func.greatest(0.0, current[emotion] + delta)) if delta else current[emotion])
+                    .label(emotion)
+                    for emotion, delta in deltas.items()
+                ]
+            )
+            .where(state.relationship_id == relationship_id)
+            .with_for_update(of=state)
+            .subquery("impact")
+        )
+        
+        peak = func.greatest(*(impact.c[emotion] for emotion in EMOTION_TYPES))
+        dominant = case(
+            (peak < NEUTRAL_THRESHOLD, "neutral"),
+            *[(impact.c[emotion] == peak, emotion) for emotion in EMOTION_TYPES],
+            else_="neutral"
+        )
+        
+        values = {
+            emotion: impact.c[emotion] for emotion in EMOTION_TYPES if decayed or deltas[emotion]
+        }
+        values["dominant_emotion"] = dominant
+        
+        return (
+            update(state)
+            .where(and_(state.id == impact.c.id, state.relationship_id == relationship_id))
+            .values(**values)
+        )
+    
     async def _calculate_dominant_emotion(
         self, state: UserCharacterEmotionalState
     ) -> str:
         """Calcula la emoción dominante en un estado emocional."""
-        emotions = {
-            "joy": state.joy,
-            "trust": state.trust,
-            "fear": state.fear,
-            "sadness": state.sadness,
-            "anger": state.anger,
-            "surprise": state.surprise,
-            "anticipation": state.anticipation,
-            "disgust": state.disgust
-        }
-        
-        # Encontrar la emoción con mayor valor
-        dominant_emotion, max_value = max(emotions.items(), key=lambda x: x[1])
-        
-        # Si el valor máximo es bajo, la emoción dominante es neutral
-        if max_value < 30:
-            return "neutral"
-        
-        return dominant_emotion
+        return EmotionVector.from_row(state).dominant()
 
 
 class EmotionalMemoryService(BaseService[EmotionalMemory]):
@@ -563,7 +695,7 @@ class EmotionalMemoryService(BaseService[EmotionalMemory]):
     async def get_important_memories(
         self, session: AsyncSession, relationship_id: int, limit: int = 5
     ) -> List[EmotionalMemory]:
-        """Obtiene las memorias más importantes de una relación."""
+        """Obtiene las memorias más importantes de una relación (sin resúmenes diarios)."""
         self.logger.debug(
             "Obteniendo memorias importantes", 
             relationship_id=relationship_id, 
@@ -575,7 +707,8 @@ class EmotionalMemoryService(BaseService[EmotionalMemory]):
             .where(
                 and_(
                     EmotionalMemory.relationship_id == relationship_id,
-                    EmotionalMemory.is_forgotten == False
+                    EmotionalMemory.is_forgotten == False,
+                    EmotionalMemory.memory_type != DAILY_SUMMARY_TYPE
                 )
             )
             .order_by(desc(EmotionalMemory.importance_score))
@@ -588,7 +721,7 @@ class EmotionalMemoryService(BaseService[EmotionalMemory]):
     async def get_recent_memories(
         self, session: AsyncSession, relationship_id: int, limit: int = 5
     ) -> List[EmotionalMemory]:
-        """Obtiene las memorias más recientes de una relación."""
+        """Obtiene las memorias más recientes de una relación (sin resúmenes diarios)."""
         self.logger.debug(
             "Obteniendo memorias recientes", 
             relationship_id=relationship_id, 
@@ -600,7 +733,8 @@ class EmotionalMemoryService(BaseService[EmotionalMemory]):
             .where(
                 and_(
                     EmotionalMemory.relationship_id == relationship_id,
-                    EmotionalMemory.is_forgotten == False
+                    EmotionalMemory.is_forgotten == False,
+                    EmotionalMemory.memory_type != DAILY_SUMMARY_TYPE
                 )
             )
             .order_by(desc(EmotionalMemory.created_at))
@@ -0,0 +1,103 @@
+"""Decaimiento de las emociones hacia la base del personaje."""
+
+import math
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+import structlog
+from sqlalchemy import func
+
+from .emotion_vector import EmotionVector
+from ..config import settings
+from ..config.constants import EMOTION_TYPES
+
+logger = structlog.get_logger()
+
+class EmotionalDecay:
+    """
+    Decaimiento exponencial evaluado bajo demanda.
+
+    Una emoción se acerca a la base del personaje con el tiempo transcurrido
+    desde la última escritura del estado (``updated_at``)::
+
+        valor(t) = base + (valor - base) * exp(-λ * t)
+
+    Nada se reescribe en segundo plano: al leer se calcula el valor actual y
+    al aplicar un impacto el UPDATE parte del valor ya decaído, con lo que la
+    fila solo se escribe cuando hay impacto.
+    """
+
+    def __init__(self, half_life: float = 86400.0):
+        """
+        Inicializa el decaimiento.
+
+        Args:
+            half_life: Segundos en que una emoción recorre la mitad de la
+                distancia hasta su base; 0 lo desactiva.
+        """
+        self.half_life = half_life
+        self.rate = math.log(2) / half_life if half_life > 0 else 0.0
+
+    @property
+    def enabled(self) -> bool:
+        """Indica si el decaimiento está activo."""
+        return self.rate > 0
+
+    def factor(self, elapsed: float) -> float:
+        """Fracción de la distancia a la base que se conserva tras ``elapsed`` segundos."""
+        if not self.enabled or elapsed <= 0:
+            return 1.0
+        return math.exp(-self.rate * elapsed)
+
+    def decay(self, value: float, base: float, elapsed: float) -> float:
+        """Valor de una emoción tras ``elapsed`` segundos."""
+        return base + (value - base) * self.factor(elapsed)
+
+    def current_values(
+        self,
+        state: Any,
+        baseline: Optional[EmotionVector],
+        now: Optional[datetime] = None
+    ) -> EmotionVector:
+        """
+        Valores actuales de las emociones de un estado.
+
+        Sin base (o sin ``updated_at``) se devuelven los valores guardados.
+        """
+        values = EmotionVector.from_row(state)
+        updated_at = getattr(state, "updated_at", None)
+        if not self.enabled or baseline is None or updated_at is None:
+            return values
+
+        elapsed = ((now or datetime.now(timezone.utc)) - updated_at).total_seconds()
+        factor = self.factor(elapsed)
+        if factor == 1.0:
+            return values
+
+        return values.toward(baseline, factor)
+
+    def sql_values(self, model: Any, baseline: Optional[EmotionVector]) -> Dict[str, Any]:
+        """
+        Expresiones SQL con el valor actual de cada emoción de ``model``.
+
+        El tiempo transcurrido se mide en el servidor desde ``updated_at``.
+        """
+        columns = {emotion: getattr(model, emotion) for emotion in EMOTION_TYPES}
+        if not self.enabled or baseline is None:
+            return columns
+
+        elapsed = func.greatest(0.0, func.extract("epoch", func.now() - model.updated_at))
+        factor = func.exp(-self.rate * elapsed)
+        return {
+            emotion: base + (columns[emotion] - base) * factor
+            for emotion, base in zip(EMOTION_TYPES, baseline)
+        }
+
+def profile_baseline(profile: Any) -> Optional[EmotionVector]:
+    """Valores base de un perfil de personaje."""
+    if profile is None:
+        return None
+    return EmotionVector.from_row(profile, prefix="base_")
+
+
+# Singleton instance
+emotional_decay = EmotionalDecay(half_life=settings.EMOTIONAL_DECAY_HALF_LIFE)
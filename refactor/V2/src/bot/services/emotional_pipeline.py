@@ -0,0 +1,158 @@
+"""Pipeline emocional asíncrono desacoplado de la respuesta al usuario."""
+
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import structlog
+from cachetools import TTLCache
+
+from .emotional import EmotionalService
+from .analysis_executor import AnalysisExecutor, analysis_executor
+from ..config import settings
+from ..metrics import metrics, LATENCY_BUCKETS
+from ..database.engine import async_session
+
+logger = structlog.get_logger()
+
+# Métricas de las colas
+queue_depth = metrics.gauge(
+    "bot_emotional_queue_depth", "Mensajes pendientes por shard del pipeline emocional", ["shard"]
+)
+queue_lag = metrics.histogram(
+    "bot_emotional_queue_lag_seconds",
+    "Tiempo desde que se encola un mensaje hasta que se persiste su estado emocional",
+    buckets=LATENCY_BUCKETS + (30.0, 60.0)
+)
+
+# Elemento de la cola: usuario, personaje, texto, idioma y momento de encolado
+_Item = Tuple[int, str, str, Optional[str], float]
+
+class EmotionalPipeline:
+    """
+    Procesa los mensajes del sistema emocional fuera del camino de respuesta.
+
+    Las colas se reparten por ``user_id`` (un worker por shard), de modo que
+    los mensajes de un mismo usuario se aplican en orden. Cada worker escribe
+    con su propia sesión y guarda el último estado conocido en un caché que
+    los manejadores leen sin esperar a la base de datos.
+    """
+
+    def __init__(
+        self,
+        shards: int = 4,
+        queue_size: int = 1000,
+        state_cache_size: int = 10000,
+        state_cache_ttl: int = 600,
+        executor: Optional[AnalysisExecutor] = None
+    ):
+        """
+        Inicializa el pipeline.
+
+        Args:
+            shards: Número de colas y workers.
+            queue_size: Mensajes máximos por cola.
+            state_cache_size: Estados emocionales máximos en caché.
+            state_cache_ttl: Segundos que se conserva un estado en caché.
+            executor: Ejecutor del análisis emocional.
+        """
+        self.shards = shards
+        self.queue_size = queue_size
+        self.executor = executor or analysis_executor
+        self.emotional_service = EmotionalService()
+        self.logger = structlog.get_logger(service="EmotionalPipeline")
+        self._queues: List[asyncio.Queue] = []
+        self._workers: List[asyncio.Task] = []
+        self._states: TTLCache = TTLCache(maxsize=state_cache_size, ttl=state_cache_ttl)
+
+    @property
+    def running(self) -> bool:
+        """Indica si los workers están en marcha."""
+        return bool(self._workers)
+
+    async def start(self) -> None:
+        """Crea las colas y arranca un worker por shard."""
+        if self.running:
+            return
+
+        self._queues = [asyncio.Queue(maxsize=self.queue_size) for _ in range(self.shards)]
+        self._workers = [
+            asyncio.create_task(self._worker(shard)) for shard in range(self.shards)
+        ]
+        self.logger.info("Pipeline emocional iniciado", shards=self.shards)
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Espera a que se vacíen las colas y detiene los workers."""
+        if not self.running:
+            return
+
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(queue.join() for queue in self._queues)), timeout
+            )
+        except asyncio.TimeoutError:
+            self.logger.warning("Mensajes emocionales sin procesar al detener", pending=self.depth)
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self.logger.info("Pipeline emocional detenido")
+
+    async def submit(
+        self, user_id: int, character_name: str, text: str, language: Optional[str] = None
+    ) -> None:
+        """Encola un mensaje; espera si la cola del shard está llena."""
+        shard = user_id % self.shards
+        queue = self._queues[shard]
+        await queue.put((user_id, character_name, text, language, time.monotonic()))
+        queue_depth.set(queue.qsize(), str(shard))
+
+    def last_state(self, user_id: int, character_name: str) -> Optional[Dict[str, Any]]:
+        """Devuelve el último estado emocional conocido (puede ir por detrás)."""
+        return self._states.get((user_id, character_name))
+
+    def remember(self, user_id: int, character_name: str, state: Dict[str, Any]) -> None:
+        """Guarda el último estado emocional conocido."""
+        self._states[(user_id, character_name)] = state
+
+    @property
+    def depth(self) -> int:
+        """Mensajes pendientes en todas las colas."""
+        return sum(queue.qsize() for queue in self._queues)
+
+    async def _worker(self, shard: int) -> None:
+        """Procesa en orden los mensajes de un shard."""
+        queue = self._queues[shard]
+        while True:
+            item = await queue.get()
+            try:
+                await self._process(item)
+            except Exception as e:
+                self.logger.error(
+                    "Error en el pipeline emocional", shard=shard, user_id=item[0], error=str(e)
+                )
+            finally:
+                queue.task_done()
+                queue_depth.set(queue.qsize(), str(shard))
+
+    async def _process(self, item: _Item) -> None:
+        """Analiza un mensaje y persiste su impacto emocional."""
+        user_id, character_name, text, language, enqueued_at = item
+        impacts = await self.executor.analyze(text, language)
+
+        async with async_session() as session:
+            state = await self.emotional_service.process_message(
+                session, user_id, character_name, text, language=language, impacts=impacts
+            )
+            await session.commit()
+
+        self.remember(user_id, character_name, state)
+        queue_lag.observe(time.monotonic() - enqueued_at)
+
+
+# Singleton instance
+emotional_pipeline = EmotionalPipeline(
+    shards=settings.EMOTIONAL_PIPELINE_SHARDS,
+    queue_size=settings.EMOTIONAL_PIPELINE_QUEUE_SIZE,
+    state_cache_ttl=settings.EMOTIONAL_STATE_CACHE_TTL,
+)
@@ -0,0 +1,275 @@
+"""Recálculo masivo de los estados emocionales de un personaje."""
+
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import structlog
+from sqlalchemy import Integer, and_, any_, bindparam, case, func, or_, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from .character_registry import mark_profiles_changed
+from .emotional_decay import EmotionalDecay, emotional_decay, profile_baseline
+from .emotion_vector import NEUTRAL_THRESHOLD
+from ..config.constants import EMOTION_TYPES
+from ..database.engine import async_session
+from ..database.models.emotional import CharacterEmotionalProfile, UserCharacterEmotionalState
+
+logger = structlog.get_logger()
+
+_EMOTION_NAMES = np.array(EMOTION_TYPES + ["neutral"], dtype=object)
+
+class EmotionalStateRebaser:
+    """
+    Rebasa los estados emocionales de un personaje tras cambiar sus valores
+    base o los parámetros de decaimiento.
+
+    Cada estado se lleva primero a su valor actual con el decaimiento vigente
+    (desde ``updated_at`` hasta el inicio del recálculo) y después se desplaza
+    la diferencia entre la base nueva y la anterior, conservando la desviación
+    de cada usuario respecto a la base. Los estados se leen por bloques con
+    un cursor de servidor, se transforman como una matriz de 8 emociones con
+    NumPy y se escriben con ``executemany`` en una transacción por bloque.
+
+    Cada fila solo se escribe si su ``updated_at`` sigue siendo el leído
+    (control optimista): el bot escribe ``now()``, la hora de inicio de su
+    transacción, que puede ser anterior al recálculo aunque confirme después.
+    No se rebasan las filas que el bot modificó entre la lectura y la
+    escritura, las leídas con ``updated_at`` posterior al inicio ni las
+    creadas después de la lectura (``id`` mayor que el último leído, pues se
+    leen por ``id``). En la misma transacción que guarda la base nueva se
+    les suma en SQL la diferencia de bases, sin decaimiento (ya parten de su
+    valor actual).
+    """
+
+    def __init__(self, chunk_size: int = 10000, decay: Optional[EmotionalDecay] = None):
+        """
+        Inicializa el recálculo.
+
+        Args:
+            chunk_size: Estados por bloque de lectura y escritura.
+            decay: Decaimiento con el que se calcularon los valores guardados.
+        """
+        self.chunk_size = chunk_size
+        self.decay = decay or emotional_decay
+        self.logger = structlog.get_logger(service="EmotionalStateRebaser")
+        self._value_keys = [f"new_{emotion}" for emotion in EMOTION_TYPES]
+
+    def transform(
+        self,
+        values: np.ndarray,
+        elapsed: np.ndarray,
+        old_base: np.ndarray,
+        new_base: np.ndarray
+    ) -> np.ndarray:
+        """
+        Aplica el decaimiento y el cambio de base a una matriz ``n x 8``.
+
+        Devuelve los valores nuevos acotados a 0-100.
+        """
+        factor = np.exp(-self.decay.rate * np.maximum(elapsed, 0.0))
+        result = old_base + (values - old_base) * factor[:, np.newaxis] + (new_base - old_base)
+        return np.clip(result, 0.0, 100.0, out=result)
+
+    def dominant(self, values: np.ndarray) -> np.ndarray:
+        """Emoción dominante por fila: la primera con el valor máximo o ``neutral`` bajo el umbral."""
+        index = np.argmax(values, axis=1)
+        peak = values[np.arange(len(values)), index]
+        index[peak < NEUTRAL_THRESHOLD] = len(EMOTION_TYPES)
+        return _EMOTION_NAMES[index]
+
+    async def rebase(
+        self, character_name: str, new_base: Optional[Dict[str, float]] = None
+    ) -> int:
+        """
+        Rebasa todos los estados de un personaje y guarda su nueva base.
+
+        Sin ``new_base`` solo se consolida el decaimiento (útil antes de
+        cambiar ``EMOTIONAL_DECAY_HALF_LIFE``). Devuelve los estados escritos.
+        """
+        new_base = new_base or {}
+        unknown = set(new_base) - set(EMOTION_TYPES)
+        if unknown:
+            raise ValueError(f"Emociones desconocidas: {', '.join(sorted(unknown))}")
+
+        async with async_session() as session:
+            result = await session.execute(
+                select(CharacterEmotionalProfile).where(
+                    CharacterEmotionalProfile.character_name == character_name
+                )
+            )
+            profile = result.scalars().first()
+        if profile is None:
+            raise ValueError(f"Personaje {character_name} no encontrado")
+
+        old = np.array(profile_baseline(profile).values, dtype=np.float64)
+        new = np.array(
+            [new_base.get(emotion, base) for emotion, base in zip(EMOTION_TYPES, old)],
+            dtype=np.float64
+        )
+        reference = datetime.now(timezone.utc)
+
+        self.logger.info(
+            "Recalculando estados emocionales",
+            character=character_name,
+            old_base=old.tolist(),
+            new_base=new.tolist()
+        )
+
+        written = 0
+        missed: List[int] = []
+        last_id = 0
+        columns = [getattr(UserCharacterEmotionalState, emotion) for emotion in EMOTION_TYPES]
+        query = (
+            select(
+                UserCharacterEmotionalState.id,
+                func.extract("epoch", reference - UserCharacterEmotionalState.updated_at),
+                *columns,
+                UserCharacterEmotionalState.updated_at
+            )
+            .where(UserCharacterEmotionalState.character_id == profile.id)
+            .order_by(UserCharacterEmotionalState.id)
+            .execution_options(yield_per=self.chunk_size)
+        )
+
+        async with async_session() as reader, async_session() as writer:
+            stream = await reader.stream(query)
+            async for rows in stream.partitions():
+                read_at = np.array([row[-1] for row in rows], dtype=object)
+                matrix = np.array([tuple(row)[:-1] for row in rows], dtype=np.float64)
+                ids = matrix[:, 0].astype(np.int64)
+                last_id = int(ids[-1])
+
+                # Escritas por el bot después del inicio: solo se desplazan
+                recent = matrix[:, 1] < 0
+                missed.extend(ids[recent].tolist())
+                current = ~recent
+
+                values = self.transform(matrix[current, 2:], matrix[current, 1], old, new)
+                count, lost = await self._write(
+                    writer, ids[current], read_at[current], values, self.dominant(values), reference
+                )
+                written += count
+                missed.extend(lost)
+                await writer.commit()
+
+            # Estados que no se rebasaron: solo el cambio de base
+            shifted = await self._shift_recent(writer, profile.id, new - old, missed, last_id)
+
+            # La base nueva se guarda al final; el registro se recarga al confirmar
+            await writer.execute(
+                update(CharacterEmotionalProfile)
+                .where(CharacterEmotionalProfile.id == profile.id)
+                .values({f"base_{emotion}": float(value) for emotion, value in zip(EMOTION_TYPES, new)})
+            )
+            mark_profiles_changed(writer)
+            await writer.commit()
+
+        self.logger.info(
+            "Estados emocionales recalculados",
+            character=character_name,
+            states=written,
+            missed=len(missed),
+            shifted=shifted
+        )
+        return written + shifted
+
+    async def _shift_recent(
+        self,
+        session: AsyncSession,
+        character_id: int,
+        delta: np.ndarray,
+        missed: List[int],
+        last_id: int
+    ) -> int:
+        """
+        Suma el cambio de base a los estados no rebasados (``missed`` y los
+        creados tras la lectura, con ``id`` mayor que ``last_id``) y
+        recalcula su emoción dominante.
+        """
+        if not delta.any():
+            return 0
+
+        table = UserCharacterEmotionalState.__table__
+        values = {
+            emotion: func.least(100.0, func.greatest(0.0, table.c[emotion] + float(change)))
+            for emotion, change in zip(EMOTION_TYPES, delta)
+        }
+        peak = func.greatest(*values.values())
+        dominant = case(
+            (peak < NEUTRAL_THRESHOLD, "neutral"),
+            *[(value == peak, emotion) for emotion, value in values.items()]
+        )
+
+        result = await session.execute(
+            update(table)
+            .where(
+                and_(
+                    table.c.character_id == character_id,
+                    or_(
+                        table.c.id > last_id,
+                        table.c.id == any_(bindparam("missed", missed, type_=ARRAY(Integer)))
+                    )
+                )
+            )
+            # updated_at se conserva: el decaimiento sigue contando desde la última escritura
+            .values({**values, "dominant_emotion": dominant, "updated_at": table.c.updated_at})
+        )
+        return max(result.rowcount, 0)
+
+    async def _write(
+        self,
+        session: AsyncSession,
+        ids: np.ndarray,
+        read_at: np.ndarray,
+        values: np.ndarray,
+        dominant: np.ndarray,
+        reference: datetime
+    ) -> Tuple[int, List[int]]:
+        """
+        Escribe un bloque con una sola sentencia ejecutada por lotes, solo en
+        las filas cuyo ``updated_at`` no cambió desde la lectura.
+
+        Devuelve las filas escritas y los ids de las que no se escribieron.
+        """
+        if not len(ids):
+            return 0, []
+
+        table = UserCharacterEmotionalState.__table__
+        statement = (
+            update(table)
+            .where(and_(table.c.id == bindparam("state_id"), table.c.updated_at == bindparam("read_at")))
+            .values(
+                {
+                    **{emotion: bindparam(f"new_{emotion}") for emotion in EMOTION_TYPES},
+                    "dominant_emotion": bindparam("dominant"),
+                    "updated_at": reference,
+                }
+            )
+        )
+
+        params: List[Dict[str, object]] = [
+            {"state_id": state_id, "read_at": updated_at, "dominant": name, **dict(zip(self._value_keys, row))}
+            for state_id, updated_at, name, row in zip(
+                ids.tolist(), read_at.tolist(), dominant.tolist(), values.tolist()
+            )
+        ]
+        await session.execute(statement, params)
+
+        # executemany no devuelve filas por parámetro: las escritas llevan
+        # ``reference`` y siguen bloqueadas por esta transacción
+        result = await session.execute(
+            select(table.c.id).where(
+                and_(
+                    table.c.id == any_(bindparam("ids", ids.tolist(), type_=ARRAY(Integer))),
+                    table.c.updated_at != reference
+                )
+            )
+        )
+        missed = list(result.scalars())
+        return len(params) - len(missed), missed
+
+
+# Singleton instance
+emotional_state_rebaser = EmotionalStateRebaser()
@@ -0,0 +1,54 @@
+"""Mapas de bits de fragmentos visitados."""
+
+from typing import Any, Iterable, Iterator, Optional, Union
+from sqlalchemy import func
+from sqlalchemy.sql.elements import ColumnElement
+
+# Cada fragmento ocupa el bit ``ordinal``: byte ``ordinal // 8``, bit
+# ``ordinal % 8`` contando desde el menos significativo, igual que
+# ``get_bit``/``set_bit`` de PostgreSQL.
+
+def has_bit(bitmap: Optional[bytes], ordinal: int) -> bool:
+    """Indica si el fragmento ``ordinal`` está marcado."""
+    if not bitmap:
+        return False
+    index = ordinal >> 3
+    return index < len(bitmap) and bool(bitmap[index] & (1 << (ordinal & 7)))
+
+def with_bit(bitmap: Optional[bytes], ordinal: int) -> bytes:
+    """Copia del mapa con el fragmento ``ordinal`` marcado (ampliándolo si hace falta)."""
+    index = ordinal >> 3
+    data = bytearray(bitmap or b"")
+    if len(data) <= index:
+        data.extend(bytes(index + 1 - len(data)))
+    data[index] |= 1 << (ordinal & 7)
+    return bytes(data)
+
+def from_ordinals(ordinals: Iterable[int]) -> bytes:
+    """Mapa con los fragmentos indicados marcados."""
+    value = 0
+    for ordinal in ordinals:
+        value |= 1 << ordinal
+    return value.to_bytes((value.bit_length() + 7) // 8, "little")
+
+def ordinals(bitmap: Optional[bytes]) -> Iterator[int]:
+    """Ordinales marcados, en orden ascendente."""
+    for index, byte in enumerate(bitmap or b""):
+        while byte:
+            low = byte & -byte
+            yield (index << 3) + low.bit_length() - 1
+            byte ^= low
+
+def popcount(bitmap: Optional[bytes]) -> int:
+    """Número de fragmentos marcados."""
+    return int.from_bytes(bitmap, "little").bit_count() if bitmap else 0
+
+def sql_with_bit(column: Any, ordinal: Union[int, ColumnElement]) -> ColumnElement:
+    """
+    Expresión SQL equivalente a ``with_bit``: rellena el ``bytea`` con ceros
+    hasta el byte del ordinal (``set_bit`` no amplía) y marca el bit.
+    """
+    current = func.coalesce(column, b"")
+    index = ordinal >> 3 if isinstance(ordinal, int) else ordinal // 8
+    padding = func.decode(func.repeat("00", func.greatest(0, index + 1 - func.length(current))), "hex")
+    return func.set_bit(current.op("||")(padding), ordinal, 1)
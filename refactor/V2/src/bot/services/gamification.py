@@ -6,6 +6,7 @@ from datetime import datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import update, and_, or_, desc, func, text
+from sqlalchemy.dialects.postgresql import insert
 
 from .base import BaseService
 from ..database.models.gamification import (
@@ -21,6 +22,16 @@ from ..config.constants import USER_LEVELS
 
 logger = structlog.get_logger()
 
+# Columna de estadísticas que acumula los puntos de cada fuente
+POINTS_SOURCE_COLUMNS = {
+    "message": "points_from_messages",
+    "reaction": "points_from_reactions",
+    "mission": "points_from_missions",
+    "dailygift": "points_from_dailygift",
+    "minigame": "points_from_minigames",
+    "narrative": "points_from_narrative",
+}
+
 class GamificationService:
     """Servicio para gestionar el sistema de gamificación."""
     
@@ -111,34 +122,13 @@ class GamificationService:
             self.logger.warning("Intento de otorgar puntos negativos o cero", amount=amount)
             raise ValueError("La cantidad de puntos debe ser positiva")
         
-        # Obtener puntos actuales
-        points = await self.points_service.get_or_create_points(session, user_id)
-        
-        # Actualizar puntos según la fuente
-        update_data = {
-            "current_points": points.current_points + amount,
-            "total_earned": points.total_earned + amount
-        }
-        
-        # Actualizar estadísticas específicas por fuente
-        if source == "message":
-            update_data["points_from_messages"] = points.points_from_messages + amount
-        elif source == "reaction":
-            update_data["points_from_reactions"] = points.points_from_reactions + amount
-        elif source == "mission":
-            update_data["points_from_missions"] = points.points_from_missions + amount
-        elif source == "dailygift":
-            update_data["points_from_dailygift"] = points.points_from_dailygift + amount
-        elif source == "minigame":
-            update_data["points_from_minigames"] = points.points_from_minigames + amount
-        elif source == "narrative":
-            update_data["points_from_narrative"] = points.points_from_narrative + amount
-        
-        # Actualizar puntos
-        updated_points = await self.points_service.update(session, points.id, update_data)
+        # Incrementar puntos de forma atómica (crea el registro si no existe)
+        updated_points = await self.points_service.increment_points(
+            session, user_id, amount, POINTS_SOURCE_COLUMNS.get(source)
+        )
         
         # Obtener nivel antes y después
-        old_level = self.calculate_level(points.current_points)["current_level"]
+        old_level = self.calculate_level(updated_points.current_points - amount)["current_level"]
         new_level = self.calculate_level(updated_points.current_points)["current_level"]
         
         # Verificar si subió de nivel
@@ -174,26 +164,17 @@ class GamificationService:
             self.logger.warning("Intento de gastar puntos negativos o cero", amount=amount)
             raise ValueError("La cantidad de puntos debe ser positiva")
         
-        # Obtener puntos actuales
-        points = await self.points_service.get_or_create_points(session, user_id)
+        # Descontar puntos de forma atómica solo si el saldo alcanza
+        updated_points = await self.points_service.decrement_points(session, user_id, amount)
         
-        # Verificar si tiene suficientes puntos
-        if points.current_points < amount:
+        if not updated_points:
             self.logger.warning(
                 "Puntos insuficientes", 
-                current=points.current_points, 
+                user_id=user_id, 
                 requested=amount
             )
             raise ValueError("Puntos insuficientes")
         
-        # Actualizar puntos
-        update_data = {
-            "current_points": points.current_points - amount,
-            "total_spent": points.total_spent + amount
-        }
-        
-        updated_points = await self.points_service.update(session, points.id, update_data)
-        
         # Formatear respuesta
         result = {
             "user_id": user_id,
@@ -771,6 +752,110 @@ class PointsService(BaseService[UserPoints]):
         
         return points
     
+    async def increment_points(
+        self, session: AsyncSession, user_id: int, amount: float,
+        source_column: Optional[str] = None
+    ) -> UserPoints:
+        """
+        Incrementa los puntos de un usuario en una sola sentencia.
+        
+        Usa ``INSERT ... ON CONFLICT DO UPDATE ... RETURNING`` para crear el
+        registro si no existe y sumar en el servidor, sin perder incrementos
+        concurrentes.
+        """
+        self.logger.debug("Incrementando puntos", user_id=user_id, amount=amount)
+        
+        updated = await self.increment_points_bulk(
+            session, {user_id: self._build_deltas(amount, source_column)}, returning_entity=True
+        )
+        return updated[user_id]
+    
+    async def increment_points_bulk(
+        self, session: AsyncSession, deltas: Dict[int, Dict[str, float]],
+        returning_entity: bool = False
+    ) -> Dict[int, Any]:
+        """
+        Incrementa los puntos de varios usuarios en una sola sentencia.
+        
+        ``deltas`` asocia cada usuario con los incrementos por columna. Devuelve
+        el registro actualizado (o su ``current_points``) por usuario.
+        """
+        self.logger.debug("Incrementando puntos en lote", users=len(deltas))
+        
+        rows = [
+            {"user_id": user_id, "active_multipliers": {}, **user_deltas}
+            for user_id, user_deltas in deltas.items()
+        ]
+        columns = {name for user_deltas in deltas.values() for name in user_deltas}
+        
+        query = insert(UserPoints).values(rows)
+        query = query.on_conflict_do_update(
+            index_elements=[UserPoints.user_id],
+            set_={
+                **{
+                    name: getattr(UserPoints, name) + getattr(query.excluded, name)
+                    for name in columns
+                },
+                "last_points_update": func.now(),
+                "updated_at": func.now()
+            }
+        )
+        
+        if returning_entity:
+            result = await session.scalars(
+                query.returning(UserPoints),
+                execution_options={"populate_existing": True}
+            )
+            return {points.user_id: points for points in result}
+        
+        result = await session.execute(
+            query.returning(UserPoints.user_id, UserPoints.current_points)
+        )
+        return {row.user_id: row.current_points for row in result}
+    
+    async def decrement_points(
+        self, session: AsyncSession, user_id: int, amount: float
+    ) -> Optional[UserPoints]:
+        """
+        Descuenta puntos de un usuario en una sola sentencia.
+        
+        La condición ``current_points >= amount`` se evalúa en el servidor;
+        devuelve None si el saldo es insuficiente o el registro no existe.
+        """
+        self.logger.debug("Descontando puntos", user_id=user_id, amount=amount)
+        
+        query = (
+            update(UserPoints)
+            .where(
+                and_(
+                    UserPoints.user_id == user_id,
+                    UserPoints.current_points >= amount
+                )
+            )
+            .values(
+                current_points=UserPoints.current_points - amount,
+                total_spent=UserPoints.total_spent + amount,
+                last_points_update=func.now()
+            )
+            .returning(UserPoints)
+        )
+        
+        result = await session.scalars(
+            query, execution_options={"populate_existing": True}
+        )
+        return result.first()
+    
+    def _build_deltas(self, amount: float, source_column: Optional[str]) -> Dict[str, float]:
+        """Construye los incrementos por columna para una cantidad de puntos."""
+        deltas = {
+            "current_points": amount,
+            "total_earned": amount,
+            **dict.fromkeys(POINTS_SOURCE_COLUMNS.values(), 0.0)
+        }
+        if source_column:
+            deltas[source_column] = amount
+        return deltas
+    
     async def get_top_users(
         self, session: AsyncSession, limit: int = 10
     ) -> List[Dict[str, Any]]:
@@ -1084,32 +1169,38 @@ class MissionService(BaseService[Mission]):
         """Obtiene las misiones activas de un usuario."""
         self.logger.debug("Obteniendo misiones activas", user_id=user_id)
         
-        # Obtener misiones del usuario que estén en progreso
-        user_missions = await self.user_mission_service.get_active_missions(
-            session, user_id
+        # Misiones del usuario en curso junto con su misión, en una sola consulta
+        query = (
+            select(UserMission, Mission)
+            .join(Mission, Mission.id == UserMission.mission_id)
+            .where(
+                and_(
+                    UserMission.user_id == user_id,
+                    UserMission.status.in_([
+                        MissionStatusEnum.AVAILABLE,
+                        MissionStatusEnum.IN_PROGRESS
+                    ])
+                )
+            )
         )
+        rows = (await session.execute(query)).all()
         
         # Formatear resultado
         result = []
-        for um in user_missions:
-            # En una implementación real, haríamos join con la tabla de misiones
-            # Por ahora, simulamos el resultado
-            mission = await self.get_by_id(session, um.mission_id)
-            
-            if mission:
-                result.append({
-                    "id": um.id,
-                    "mission_id": mission.id,
-                    "key": mission.key,
-                    "title": mission.title,
-                    "description": mission.description,
-                    "mission_type": mission.mission_type.value,
-                    "category": mission.category,
-                    "status": um.status.value,
-                    "progress_percentage": um.progress_percentage,
-                    "started_at": um.started_at.isoformat() if um.started_at else None,
-                    "expires_at": um.expires_at.isoformat() if um.expires_at else None
-                })
+        for um, mission in rows:
+            result.append({
+                "id": um.id,
+                "mission_id": mission.id,
+                "key": mission.key,
+                "title": mission.title,
+                "description": mission.description,
+                "mission_type": mission.mission_type.value,
+                "category": mission.category,
+                "status": um.status.value,
+                "progress_percentage": um.progress_percentage,
+                "started_at": um.started_at.isoformat() if um.started_at else None,
+                "expires_at": um.expires_at.isoformat() if um.expires_at else None
+            })
         
         return result
 
@@ -0,0 +1,260 @@
+"""Retención de memorias emocionales."""
+
+from typing import Any
+import structlog
+from sqlalchemy import (
+    Integer, String, and_, cast, delete, func, literal, literal_column, select, text
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .emotion_vector import EmotionVector
+from ..config import settings
+from ..database.engine import async_session, engine
+from ..database.models.emotional import EmotionalMemory
+
+logger = structlog.get_logger()
+
+# Tipo de las memorias que agregan los mensajes sin carga emocional de un día
+DAILY_SUMMARY_TYPE = "daily_summary"
+DAILY_SUMMARY_TEXT = "Mensajes sin carga emocional: "
+
+# Destino del ON CONFLICT: índice único parcial ``uix_emotional_memories_daily_summary``.
+# Se escribe literal para que PostgreSQL lo infiera (sin parámetros).
+DAILY_SUMMARY_CONFLICT = [
+    EmotionalMemory.relationship_id,
+    literal_column("date(timezone('UTC', created_at))"),
+]
+DAILY_SUMMARY_WHERE = text("memory_type = 'daily_summary'")
+
+# Fusiona los resúmenes duplicados y crea el índice único (idempotente; no hay Alembic)
+SCHEMA_CHANGES = (
+    """
+    UPDATE emotional_memories AS m
+    SET emotional_context = json_build_object('messages', t.total),
+        summary = 'Mensajes sin carga emocional: ' || t.total
+    FROM (
+        SELECT min(id) AS id, sum(coalesce((emotional_context ->> 'messages')::int, 0)) AS total
+        FROM emotional_memories
+        WHERE memory_type = 'daily_summary'
+        GROUP BY relationship_id, date(timezone('UTC', created_at))
+        HAVING count(*) > 1
+    ) AS t
+    WHERE m.id = t.id
+    """,
+    """
+    DELETE FROM emotional_memories AS m
+    USING emotional_memories AS k
+    WHERE m.memory_type = 'daily_summary' AND k.memory_type = 'daily_summary'
+      AND m.relationship_id = k.relationship_id
+      AND date(timezone('UTC', m.created_at)) = date(timezone('UTC', k.created_at))
+      AND m.id > k.id
+    """,
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS uix_emotional_memories_daily_summary
+    ON emotional_memories (relationship_id, date(timezone('UTC', created_at)))
+    WHERE memory_type = 'daily_summary'
+    """,
+)
+
+def _utc_day(value: Any) -> Any:
+    """Día UTC de un instante, como en el índice de resúmenes."""
+    return func.date(func.timezone("UTC", value))
+
+def _summary_messages(context: Any) -> Any:
+    """Mensajes contados en el ``emotional_context`` de un resumen."""
+    return func.coalesce(cast(context.op("->>")("messages"), Integer), 0)
+
+class MemoryRetention:
+    """
+    Controla el crecimiento de ``emotional_memories``.
+
+    - Cada mensaje crea su memoria como hasta ahora. La compactación
+      periódica sustituye los mensajes de importancia mínima de días
+      anteriores (día UTC) por un resumen diario por relación. Un índice
+      único parcial garantiza un solo resumen por relación y día, y las
+      escrituras concurrentes se combinan con ``ON CONFLICT DO UPDATE``.
+    - La compactación limita también las memorias por relación, eliminando
+      primero las olvidadas, después las de menor importancia y, a igualdad,
+      las más antiguas.
+
+    ``get_important_memories`` y ``get_recent_memories`` excluyen los
+    resúmenes. Sus resultados solo cambian cuando la compactación retira
+    mensajes de importancia mínima de días anteriores (p. ej. en relaciones
+    con menos de ``limit`` memorias por encima del mínimo); las memorias más
+    importantes nunca se eliminan mientras el límite sea mayor que ``limit``.
+    """
+
+    def __init__(self, min_importance: float = 0.1, cap: int = 200):
+        """
+        Inicializa la retención.
+
+        Args:
+            min_importance: Importancia igual o inferior a la que un mensaje se agrega al compactar.
+            cap: Memorias máximas por relación.
+        """
+        self.min_importance = min_importance
+        self.cap = cap
+        self.logger = structlog.get_logger(service="MemoryRetention")
+
+    async def record(
+        self,
+        session: AsyncSession,
+        user_id: int,
+        character_id: int,
+        relationship_id: int,
+        message_text: str,
+        emotional_impact: EmotionVector,
+        importance: float
+    ) -> None:
+        """Guarda la memoria de un mensaje; la compactación agrega después las de importancia mínima."""
+        await session.execute(
+            insert(EmotionalMemory).values(
+                user_id=user_id,
+                character_id=character_id,
+                relationship_id=relationship_id,
+                memory_type="message",
+                summary=f"El usuario dijo: {message_text[:50]}{'...' if len(message_text) > 50 else ''}",
+                details=message_text,
+                emotional_context=emotional_impact.to_dict(),
+                importance_score=importance
+            )
+        )
+
+    def _upsert_daily_summaries(self, statement: Any) -> Any:
+        """Añade a un INSERT de resúmenes la suma de mensajes con el resumen existente."""
+        messages = (
+            _summary_messages(EmotionalMemory.emotional_context)
+            + _summary_messages(statement.excluded.emotional_context)
+        )
+        return statement.on_conflict_do_update(
+            index_elements=DAILY_SUMMARY_CONFLICT,
+            index_where=DAILY_SUMMARY_WHERE,
+            set_={
+                "emotional_context": func.json_build_object("messages", messages),
+                "summary": DAILY_SUMMARY_TEXT + cast(messages, String),
+                "updated_at": func.now()
+            }
+        )
+
+    async def migrate_schema(self) -> None:
+        """Prepara una base existente para el índice único de resúmenes diarios."""
+        async with engine.begin() as conn:
+            for statement in SCHEMA_CHANGES:
+                await conn.execute(text(statement))
+        self.logger.info("Índice de resúmenes diarios creado")
+
+    async def compact(self) -> int:
+        """
+        Agrega las memorias antiguas de importancia mínima en resúmenes diarios
+        y aplica el límite por relación. Devuelve las memorias eliminadas
+        (mensajes agregados más memorias por encima del límite).
+        """
+        async with async_session() as session:
+            aggregated = await self._aggregate_old_messages(session)
+            evicted = await self._evict_over_cap(session)
+            await session.commit()
+
+        if aggregated or evicted:
+            self.logger.info(
+                "Memorias emocionales compactadas", aggregated=aggregated, evicted=evicted
+            )
+        return aggregated + evicted
+
+    async def _aggregate_old_messages(self, session: AsyncSession) -> int:
+        """
+        Sustituye los mensajes de días anteriores sin carga emocional por
+        resúmenes diarios. Devuelve los mensajes eliminados.
+        """
+        moved = (
+            delete(EmotionalMemory)
+            .where(
+                and_(
+                    EmotionalMemory.memory_type == "message",
+                    EmotionalMemory.importance_score <= self.min_importance,
+                    _utc_day(EmotionalMemory.created_at) < _utc_day(func.now())
+                )
+            )
+            .returning(
+                EmotionalMemory.user_id,
+                EmotionalMemory.character_id,
+                EmotionalMemory.relationship_id,
+                EmotionalMemory.created_at
+            )
+            .cte("moved")
+        )
+
+        day = _utc_day(moved.c.created_at)
+        count = func.count()
+        summaries = (
+            select(
+                moved.c.user_id,
+                moved.c.character_id,
+                moved.c.relationship_id,
+                literal(DAILY_SUMMARY_TYPE),
+                literal(DAILY_SUMMARY_TEXT) + cast(count, String),
+                func.json_build_object("messages", count),
+                literal(self.min_importance),
+                func.min(moved.c.created_at)
+            )
+            .group_by(moved.c.user_id, moved.c.character_id, moved.c.relationship_id, day)
+        )
+
+        inserted = self._upsert_daily_summaries(
+            insert(EmotionalMemory).from_select(
+                [
+                    "user_id", "character_id", "relationship_id", "memory_type",
+                    "summary", "emotional_context", "importance_score", "created_at"
+                ],
+                summaries
+            )
+        ).cte("inserted")
+
+        # El INSERT se ejecuta como CTE; la sentencia cuenta las filas eliminadas
+        query = select(func.count()).select_from(moved).add_cte(inserted)
+        result = await session.execute(query)
+        return result.scalar_one()
+
+    async def _evict_over_cap(self, session: AsyncSession) -> int:
+        """Elimina las memorias que exceden el límite en cada relación."""
+        over_cap = (
+            select(EmotionalMemory.relationship_id)
+            .group_by(EmotionalMemory.relationship_id)
+            .having(func.count() > self.cap)
+        )
+
+        ranked = (
+            select(
+                EmotionalMemory.id,
+                func.row_number().over(
+                    partition_by=EmotionalMemory.relationship_id,
+                    order_by=(
+                        EmotionalMemory.is_forgotten.asc(),
+                        EmotionalMemory.importance_score.desc(),
+                        EmotionalMemory.created_at.desc()
+                    )
+                ).label("position")
+            )
+            .where(EmotionalMemory.relationship_id.in_(over_cap))
+            .subquery("ranked")
+        )
+
+        query = (
+            delete(EmotionalMemory)
+            .where(
+                and_(
+                    EmotionalMemory.id == ranked.c.id,
+                    ranked.c.position > self.cap
+                )
+            )
+            .execution_options(synchronize_session=False)
+        )
+        result = await session.execute(query)
+        return max(result.rowcount, 0)
+
+
+# Singleton instance
+memory_retention = MemoryRetention(
+    min_importance=settings.EMOTIONAL_MEMORY_MIN_IMPORTANCE,
+    cap=settings.EMOTIONAL_MEMORY_CAP,
+)
@@ -5,10 +5,15 @@ import structlog
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import update, and_, or_, desc, func
+from sqlalchemy import update, and_, or_, desc, func, cast, text
+from sqlalchemy.dialects.postgresql import JSON, JSONB
 
-from .base import BaseService
+from .base import BaseService, T
 from .emotional import EmotionalService
+from . import fragment_bitmap
+from .choice_requirements import ChoiceRequirement, requirement_engine
+from .story_graph import story_graph_store, mark_story_changed
+from ..database.engine import engine
 from ..database.models.narrative import (
     StoryFragment,
     NarrativeChoice, 
@@ -18,6 +23,11 @@ from ..database.models.narrative import (
 
 logger = structlog.get_logger()
 
+# Columna ``step`` del estado narrativo (idempotente; no hay Alembic en el proyecto)
+SCHEMA_CHANGES = (
+    "ALTER TABLE user_narrative_states ADD COLUMN IF NOT EXISTS step INTEGER NOT NULL DEFAULT 0",
+)
+
 class NarrativeService:
     """Servicio para gestionar el sistema narrativo."""
     
@@ -27,6 +37,8 @@ class NarrativeService:
         self.choice_service = NarrativeChoiceService()
         self.state_service = UserNarrativeStateService()
         self.trigger_service = NarrativeTriggerService()
+        self.graph_store = story_graph_store
+        self.requirements = requirement_engine
     
     async def get_current_fragment(
         self, session: AsyncSession, user_id: int
@@ -34,6 +46,9 @@ class NarrativeService:
         """Obtiene el fragmento narrativo actual del usuario."""
         self.logger.debug("Obteniendo fragmento actual", user_id=user_id)
         
+        # Contenido narrativo desde el grafo en memoria
+        graph = await self.graph_store.get(session)
+        
         # Obtener estado narrativo del usuario
         state = await self.state_service.get_by_user(session, user_id)
         
@@ -42,31 +57,24 @@ class NarrativeService:
             self.logger.info("Estado narrativo no encontrado, creando nuevo", user_id=user_id)
             
             # Obtener fragmento inicial
-            initial_fragment = await self.fragment_service.get_initial_fragment(session)
+            initial_fragment = graph.initial
             if not initial_fragment:
                 self.logger.error("No se encontró fragmento inicial")
                 raise ValueError("No se encontró fragmento inicial")
             
-            # Crear estado narrativo
+            # Crear estado narrativo (o reasignar el fragmento inicial)
             if not state:
                 state = await self.state_service.create_initial_state(
-                    session, user_id, initial_fragment.key
+                    session, user_id, initial_fragment.key, initial_fragment.ordinal
                 )
             else:
-                await self.state_service.update_current_fragment(
-                    session, state.id, initial_fragment.key
+                self.state_service.move_to_fragment(
+                    state, initial_fragment.key, initial_fragment.ordinal, graph.visited(state)
                 )
-                state = await self.state_service.get_by_user(session, user_id)
-            
-            # Marcar fragmento como visitado
-            await self.state_service.add_visited_fragment(
-                session, state.id, initial_fragment.key
-            )
+                await session.flush()
         
         # Obtener fragmento actual
-        fragment = await self.fragment_service.get_by_key(
-            session, state.current_fragment_key
-        )
+        fragment = graph.fragment(state.current_fragment_key)
         
         if not fragment:
             self.logger.error(
@@ -76,71 +84,48 @@ class NarrativeService:
             )
             raise ValueError(f"Fragmento {state.current_fragment_key} no encontrado")
         
-        # Obtener opciones disponibles
-        choices = await self.choice_service.get_by_fragment(
-            session, fragment.key, user_id
+        # Opciones cuyos requisitos cumple el usuario
+        choices = await self.requirements.available(
+            session, user_id, fragment.choices, lambda choice: choice.requirement
         )
         
         # Formatear respuesta
         result = {
-            "fragment": {
-                "key": fragment.key,
-                "title": fragment.title,
-                "character": fragment.character,
-                "text": fragment.text,
-                "tags": fragment.tags,
-                "reward_besitos": fragment.reward_besitos,
-                "reward_items": fragment.reward_items
-            },
-            "choices": [
-                {
-                    "id": choice.id,
-                    "text": choice.text,
-                    "target_fragment_key": choice.target_fragment_key,
-                    "points_change": choice.points_change,
-                    "relationship_change": choice.relationship_change
-                }
-                for choice in choices
-            ],
+            "fragment": fragment.to_dict(),
+            "choices": [choice.to_dict() for choice in choices],
             "state": {
-                "visited_fragments": state.visited_fragments,
-                "narrative_items": state.narrative_items
+                "visited_fragments": graph.visited_keys(graph.visited(state)),
+                "narrative_items": state.narrative_items,
+                "step": state.step
             }
         }
         
         return result
     
     async def make_choice(
-        self, session: AsyncSession, user_id: int, choice_id: int
+        self, session: AsyncSession, user_id: int, choice_id: int, step: Optional[int] = None
     ) -> Dict[str, Any]:
-        """Procesa la elección del usuario y avanza la narrativa."""
+        """
+        Procesa la elección del usuario y avanza la narrativa.
+        
+        ``step`` es el ``state.step`` con el que se mostraron las opciones
+        (devuelto en ``state`` de cada respuesta): con él, una segunda
+        pulsación del mismo botón se rechaza aunque la opción vuelva al
+        mismo fragmento.
+        """
         self.logger.debug("Procesando elección", user_id=user_id, choice_id=choice_id)
         
+        # Contenido narrativo desde el grafo en memoria
+        graph = await self.graph_store.get(session)
+        
         # Obtener la elección
-        choice = await self.choice_service.get_by_id(session, choice_id)
+        choice = graph.choice(choice_id)
         if not choice:
             self.logger.error("Elección no encontrada", choice_id=choice_id)
             raise ValueError(f"Elección {choice_id} no encontrada")
         
-        # Obtener estado narrativo del usuario
-        state = await self.state_service.get_by_user(session, user_id)
-        if not state:
-            self.logger.error("Estado narrativo no encontrado", user_id=user_id)
-            raise ValueError(f"Estado narrativo para usuario {user_id} no encontrado")
-        
-        # Verificar que la elección corresponde al fragmento actual
-        if choice.fragment_key != state.current_fragment_key:
-            self.logger.error(
-                "La elección no corresponde al fragmento actual",
-                choice_fragment=choice.fragment_key,
-                current_fragment=state.current_fragment_key
-            )
-            raise ValueError("La elección no corresponde al fragmento actual")
-        
         # Obtener fragmento destino
-        target_fragment = await self.fragment_service.get_by_key(
-            session, choice.target_fragment_key
-        )
+        target_fragment = graph.fragment(choice.target_fragment_key)
         if not target_fragment:
             self.logger.error(
                 "Fragmento destino no encontrado", 
@@ -148,22 +133,53 @@ class NarrativeService:
             )
             raise ValueError(f"Fragmento destino {choice.target_fragment_key} no encontrado")
         
-        # Registrar decisión
-        decisions = state.decisions_made.copy() if state.decisions_made else {}
-        decisions[choice.fragment_key] = choice.id
-        await self.state_service.update(
-            session, state.id, {"decisions_made": decisions}
+        # Datos del usuario para la elección y las opciones del destino (una consulta)
+        facts = await self.requirements.facts_for(
+            session, user_id, [choice.requirement, *(c.requirement for c in target_fragment.choices)]
         )
+        if not choice.requirement(facts):
+            self.logger.warning(
+                "Requisitos de la elección no cumplidos",
+                user_id=user_id,
+                choice_id=choice_id,
+                requirements=choice.requirement.description
+            )
+            raise ValueError("No cumples los requisitos de esta elección")
         
-        # Actualizar fragmento actual
-        await self.state_service.update_current_fragment(
-            session, state.id, target_fragment.key
+        # Registrar decisión, fragmento actual y visitados en una sola sentencia,
+        # solo si el usuario sigue en el fragmento de la elección
+        state = await self.state_service.apply_choice(
+            session, user_id, choice.fragment_key, choice.id,
+            target_fragment.key, target_fragment.ordinal, expected_step=step
         )
+        if not state:
+            # Sin estado, ya en otro fragmento (p. ej. doble pulsación del botón)
+            # o con la lista legada de visitados aún sin migrar
+            current = await self.state_service.get_by_user(session, user_id)
+            if not current:
+                self.logger.error("Estado narrativo no encontrado", user_id=user_id)
+                raise ValueError(f"Estado narrativo para usuario {user_id} no encontrado")
+            
+            if (
+                current.visited_bitmap is None
+                and current.current_fragment_key == choice.fragment_key
+                and (step is None or current.step == step)
+            ):
+                state = await self.state_service.apply_choice(
+                    session, user_id, choice.fragment_key, choice.id,
+                    target_fragment.key, target_fragment.ordinal,
+                    legacy_visited=graph.visited(current), expected_step=step
+                )
         
-        # Marcar fragmento como visitado
-        await self.state_service.add_visited_fragment(
-            session, state.id, target_fragment.key
-        )
+        if not state:
+            self.logger.error(
+                "La elección no corresponde al fragmento actual",
+                choice_fragment=choice.fragment_key,
+                current_fragment=current.current_fragment_key,
+                step=step,
+                current_step=current.step
+            )
+            raise ValueError("La elección no corresponde al fragmento actual")
         
         # Procesar efectos emocionales si los hay
         if choice.emotional_impacts:
@@ -171,43 +187,14 @@ class NarrativeService:
             # Esto sería implementado por el EmotionalSystem Agent
             pass
         
-        # Procesar disparadores emocionales del fragmento
-        triggers = await self.trigger_service.get_by_fragment(
-            session, target_fragment.key
-        )
-        
-        # Recargamos el estado después de las actualizaciones
-        state = await self.state_service.get_by_user(session, user_id)
-        
-        # Obtener elecciones para el nuevo fragmento
-        new_choices = await self.choice_service.get_by_fragment(
-            session, target_fragment.key, user_id
-        )
-        
-        # Formatear respuesta
+        # Formatear respuesta (opciones y disparadores del grafo, ya ordenados)
         result = {
-            "fragment": {
-                "key": target_fragment.key,
-                "title": target_fragment.title,
-                "character": target_fragment.character,
-                "text": target_fragment.text,
-                "tags": target_fragment.tags,
-                "reward_besitos": target_fragment.reward_besitos,
-                "reward_items": target_fragment.reward_items
-            },
-            "choices": [
-                {
-                    "id": c.id,
-                    "text": c.text,
-                    "target_fragment_key": c.target_fragment_key,
-                    "points_change": c.points_change,
-                    "relationship_change": c.relationship_change
-                }
-                for c in new_choices
-            ],
+            "fragment": target_fragment.to_dict(),
+            "choices": [c.to_dict() for c in target_fragment.choices if c.requirement(facts)],
             "state": {
-                "visited_fragments": state.visited_fragments,
-                "narrative_items": state.narrative_items
+                "visited_fragments": graph.visited_keys(graph.visited(state)),
+                "narrative_items": state.narrative_items,
+                "step": state.step
             },
             "triggers": [
                 {
@@ -215,7 +202,7 @@ class NarrativeService:
                     "character_name": t.character_name,
                     "trigger_type": t.trigger_type
                 }
-                for t in triggers
+                for t in target_fragment.triggers
             ]
         }
         
@@ -227,45 +214,48 @@ class NarrativeService:
         """Obtiene el progreso narrativo del usuario."""
         self.logger.debug("Obteniendo progreso narrativo", user_id=user_id)
         
+        # Contenido narrativo desde el grafo en memoria
+        graph = await self.graph_store.get(session)
+        
         # Obtener estado narrativo del usuario
         state = await self.state_service.get_by_user(session, user_id)
         if not state:
             self.logger.info("Estado narrativo no encontrado, creando nuevo", user_id=user_id)
             # Obtener fragmento inicial
-            initial_fragment = await self.fragment_service.get_initial_fragment(session)
+            initial_fragment = graph.initial
             if not initial_fragment:
                 self.logger.error("No se encontró fragmento inicial")
                 return {"progress": 0, "fragments_visited": 0, "total_fragments": 0}
             
             # Crear estado narrativo
             state = await self.state_service.create_initial_state(
-                session, user_id, initial_fragment.key
+                session, user_id, initial_fragment.key, initial_fragment.ordinal
             )
         
-        # Obtener total de fragmentos
-        total_fragments = await self.fragment_service.count_fragments(session)
-        
-        # Calcular progreso
-        fragments_visited = len(state.visited_fragments) if state.visited_fragments else 0
-        progress = (fragments_visited / total_fragments) * 100 if total_fragments > 0 else 0
+        # Progreso sobre los fragmentos vistos más los que aún puede alcanzar
+        visited = graph.visited(state)
+        fragments_visited, reachable_fragments = graph.analysis.progress(
+            visited, state.current_fragment_key
+        )
+        progress = (fragments_visited / reachable_fragments) * 100 if reachable_fragments > 0 else 0
         
         # Obtener datos adicionales
-        current_fragment = await self.fragment_service.get_by_key(
-            session, state.current_fragment_key
-        ) if state.current_fragment_key else None
+        current_fragment = graph.fragment(state.current_fragment_key)
         
         # Formatear respuesta
         result = {
             "progress": progress,
             "fragments_visited": fragments_visited,
-            "total_fragments": total_fragments,
+            "total_fragments": len(graph),
+            "reachable_fragments": reachable_fragments,
+            "remaining_steps": graph.analysis.remaining.get(state.current_fragment_key, 0),
             "current_fragment": {
                 "key": current_fragment.key,
                 "title": current_fragment.title,
                 "character": current_fragment.character
             } if current_fragment else None,
             "narrative_items": state.narrative_items or {},
-            "visited_fragments": state.visited_fragments or []
+            "visited_fragments": graph.visited_keys(visited)
         }
         
         return result
@@ -280,7 +270,8 @@ class NarrativeService:
         state = await self.state_service.get_by_user(session, user_id)
         
         # Obtener fragmento inicial
-        initial_fragment = await self.fragment_service.get_initial_fragment(session)
+        graph = await self.graph_store.get(session)
+        initial_fragment = graph.initial
         if not initial_fragment:
             self.logger.error("No se encontró fragmento inicial")
             raise ValueError("No se encontró fragmento inicial")
@@ -294,15 +285,17 @@ class NarrativeService:
             await self.state_service.update(
                 session, state.id, {
                     "current_fragment_key": initial_fragment.key,
-                    "visited_fragments": [initial_fragment.key],
+                    "visited_bitmap": self.state_service.initial_bitmap(initial_fragment.ordinal),
+                    "visited_fragments": None,
                     "decisions_made": {},
-                    "narrative_variables": {}
+                    "narrative_variables": {},
+                    "step": state.step + 1
                 }
             )
         else:
             # Crear nuevo estado
             state = await self.state_service.create_initial_state(
-                session, user_id, initial_fragment.key
+                session, user_id, initial_fragment.key, initial_fragment.ordinal
             )
             narrative_items = {}
         
@@ -316,7 +309,8 @@ class NarrativeService:
             },
             "state": {
                 "visited_fragments": [initial_fragment.key],
-                "narrative_items": narrative_items
+                "narrative_items": narrative_items,
+                "step": state.step
             },
             "message": "Narrativa reiniciada correctamente"
         }
@@ -355,12 +349,52 @@ class NarrativeService:
         return result
 
 
-class StoryFragmentService(BaseService[StoryFragment]):
+class StoryContentService(BaseService[T]):
+    """
+    Base de los servicios de contenido narrativo: cualquier escritura marca
+    la transacción para que el grafo en memoria se recargue al confirmarla.
+    """
+    
+    async def create(self, session: AsyncSession, data: Dict[str, Any]) -> T:
+        """Crea una entidad e invalida el grafo al confirmar la transacción."""
+        mark_story_changed(session)
+        return await super().create(session, data)
+    
+    async def update(self, session: AsyncSession, id: Any, data: Dict[str, Any]) -> Optional[T]:
+        """Actualiza una entidad e invalida el grafo al confirmar la transacción."""
+        mark_story_changed(session)
+        return await super().update(session, id, data)
+    
+    async def delete(self, session: AsyncSession, id: Any) -> bool:
+        """Elimina una entidad e invalida el grafo al confirmar la transacción."""
+        mark_story_changed(session)
+        return await super().delete(session, id)
+    
+    async def update_bulk(
+        self, session: AsyncSession, filter_dict: Dict[str, Any], data: Dict[str, Any]
+    ) -> int:
+        """Actualiza entidades e invalida el grafo al confirmar la transacción."""
+        mark_story_changed(session)
+        return await super().update_bulk(session, filter_dict, data)
+    
+    async def delete_bulk(self, session: AsyncSession, filter_dict: Dict[str, Any]) -> int:
+        """Elimina entidades e invalida el grafo al confirmar la transacción."""
+        mark_story_changed(session)
+        return await super().delete_bulk(session, filter_dict)
+
+
+class StoryFragmentService(StoryContentService[StoryFragment]):
     """Servicio para gestionar fragmentos de historia."""
     
     def __init__(self):
         super().__init__(StoryFragment)
     
+    async def create(self, session: AsyncSession, data: Dict[str, Any]) -> StoryFragment:
+        """Crea un fragmento; sin ``ordinal`` lo asigna la secuencia de la base de datos."""
+        if "ordinal" in data and data["ordinal"] is None:
+            data = {key: value for key, value in data.items() if key != "ordinal"}
+        return await super().create(session, data)
+    
     async def get_by_key(
         self, session: AsyncSession, fragment_key: str
     ) -> Optional[StoryFragment]:
@@ -380,15 +414,6 @@ class StoryFragmentService(BaseService[StoryFragment]):
         # Por convención, el fragmento inicial tiene la clave "start"
         return await self.get_by_key(session, "start")
     
-    async def count_fragments(
-        self, session: AsyncSession
-    ) -> int:
-        """Cuenta el número total de fragmentos."""
-        self.logger.debug("Contando fragmentos")
-        
-        result = await session.execute(select(func.count()).select_from(StoryFragment))
-        return result.scalar()
-    
     async def get_fragments_by_tag(
         self, session: AsyncSession, tag: str
     ) -> List[StoryFragment]:
@@ -416,7 +441,7 @@ class StoryFragmentService(BaseService[StoryFragment]):
         return list(result.scalars().all())
 
 
-class NarrativeChoiceService(BaseService[NarrativeChoice]):
+class NarrativeChoiceService(StoryContentService[NarrativeChoice]):
     """Servicio para gestionar elecciones narrativas."""
     
     def __init__(self):
@@ -428,17 +453,23 @@ class NarrativeChoiceService(BaseService[NarrativeChoice]):
         """Obtiene elecciones disponibles para un fragmento."""
         self.logger.debug("Obteniendo elecciones por fragmento", fragment_key=fragment_key)
         
-        query = select(NarrativeChoice).where(
-            NarrativeChoice.fragment_key == fragment_key
+        query = (
+            select(NarrativeChoice, StoryFragment.character)
+            .join(StoryFragment, StoryFragment.key == NarrativeChoice.fragment_key)
+            .where(NarrativeChoice.fragment_key == fragment_key)
         )
         
         result = await session.execute(query)
-        choices = list(result.scalars().all())
+        rows = result.all()
         
-        # Si se proporciona user_id, podríamos filtrar por requisitos
-        # Esto sería implementado por el NarrativeService Agent
+        # Si se proporciona user_id, filtrar por requisitos
+        if user_id is None:
+            return [choice for choice, _ in rows]
         
-        return choices
+        available = await requirement_engine.available(
+            session, user_id, rows, lambda row: ChoiceRequirement.for_choice(*row)
+        )
+        return [choice for choice, _ in available]
 
 
 class UserNarrativeStateService(BaseService[UserNarrativeState]):
@@ -447,6 +478,13 @@ class UserNarrativeStateService(BaseService[UserNarrativeState]):
     def __init__(self):
         super().__init__(UserNarrativeState)
     
+    async def migrate_schema(self) -> None:
+        """Añade a una base existente la columna ``step`` del estado narrativo."""
+        async with engine.begin() as conn:
+            for statement in SCHEMA_CHANGES:
+                await conn.execute(text(statement))
+        self.logger.info("Columna step del estado narrativo creada")
+    
     async def get_by_user(
         self, session: AsyncSession, user_id: int
     ) -> Optional[UserNarrativeState]:
@@ -460,8 +498,16 @@ class UserNarrativeStateService(BaseService[UserNarrativeState]):
         result = await session.execute(query)
         return result.scalars().first()
     
+    def initial_bitmap(self, ordinal: Optional[int]) -> Optional[bytes]:
+        """Mapa de visitados con solo el fragmento inicial."""
+        return fragment_bitmap.with_bit(None, ordinal) if ordinal is not None else None
+    
     async def create_initial_state(
-        self, session: AsyncSession, user_id: int, initial_fragment_key: str
+        self,
+        session: AsyncSession,
+        user_id: int,
+        initial_fragment_key: str,
+        initial_ordinal: Optional[int] = None
     ) -> UserNarrativeState:
         """Crea un estado narrativo inicial para un usuario."""
         self.logger.debug(
@@ -473,15 +519,102 @@ class UserNarrativeStateService(BaseService[UserNarrativeState]):
         state_data = {
             "user_id": user_id,
             "current_fragment_key": initial_fragment_key,
-            "visited_fragments": [initial_fragment_key],
+            "visited_bitmap": self.initial_bitmap(initial_ordinal),
             "decisions_made": {},
             "narrative_items": {},
-            "narrative_variables": {}
+            "narrative_variables": {},
+            "step": 0
         }
         
         state = await self.create(session, state_data)
         return state
     
+    def move_to_fragment(
+        self,
+        state: UserNarrativeState,
+        fragment_key: str,
+        ordinal: Optional[int],
+        visited: Optional[bytes]
+    ) -> None:
+        """
+        Cambia el fragmento actual de un estado cargado y lo marca en el mapa
+        de visitados ``visited`` (sin escribir).
+        """
+        state.current_fragment_key = fragment_key
+        state.visited_bitmap = fragment_bitmap.with_bit(visited, ordinal) if ordinal is not None else visited
+        state.visited_fragments = None
+        state.step += 1
+    
+    async def apply_choice(
+        self,
+        session: AsyncSession,
+        user_id: int,
+        fragment_key: str,
+        choice_id: int,
+        target_key: str,
+        target_ordinal: Optional[int] = None,
+        legacy_visited: Optional[bytes] = None,
+        expected_step: Optional[int] = None
+    ) -> Optional[UserNarrativeState]:
+        """
+        Aplica una elección en un único UPDATE ... RETURNING.
+        
+        Fija el fragmento actual, fusiona la decisión en ``decisions_made``
+        (``jsonb ||``), marca el bit del destino en ``visited_bitmap`` e
+        incrementa ``step``. Solo se aplica si el usuario sigue en
+        ``fragment_key`` y, con ``expected_step``, si ``step`` no cambió desde
+        que se mostraron las opciones: una segunda pulsación del mismo botón
+        no hace nada y devuelve None, también en opciones que vuelven al
+        mismo fragmento.
+        
+        Sin ``legacy_visited`` solo se aplica a estados con mapa de bits; con
+        él, solo a estados sin mapa, cuyo mapa pasa a ser ``legacy_visited``
+        (la lista legada convertida) más el destino.
+        """
+        self.logger.debug(
+            "Aplicando elección", 
+            user_id=user_id, 
+            choice_id=choice_id, 
+            target_key=target_key
+        )
+        
+        decisions = func.coalesce(cast(UserNarrativeState.decisions_made, JSONB), cast({}, JSONB))
+        values = {
+            "current_fragment_key": target_key,
+            "decisions_made": cast(
+                decisions.op("||")(func.jsonb_build_object(fragment_key, choice_id)), JSON
+            ),
+            "step": UserNarrativeState.step + 1,
+        }
+        if legacy_visited is None:
+            bitmap_state = UserNarrativeState.visited_bitmap.isnot(None)
+            if target_ordinal is not None:
+                values["visited_bitmap"] = fragment_bitmap.sql_with_bit(
+                    UserNarrativeState.visited_bitmap, target_ordinal
+                )
+        else:
+            bitmap_state = UserNarrativeState.visited_bitmap.is_(None)
+            values["visited_bitmap"] = (
+                fragment_bitmap.with_bit(legacy_visited, target_ordinal)
+                if target_ordinal is not None else legacy_visited
+            )
+            values["visited_fragments"] = None
+        
+        query = (
+            update(UserNarrativeState)
+            .where(
+                UserNarrativeState.user_id == user_id,
+                UserNarrativeState.current_fragment_key == fragment_key,
+                bitmap_state,
+                *([UserNarrativeState.step == expected_step] if expected_step is not None else [])
+            )
+            .values(values)
+            .returning(UserNarrativeState)
+            .execution_options(synchronize_session=False)
+        )
+        result = await session.execute(query, execution_options={"populate_existing": True})
+        return result.scalars().first()
+    
     async def update_current_fragment(
         self, session: AsyncSession, state_id: int, fragment_key: str
     ) -> None:
@@ -497,7 +630,10 @@ class UserNarrativeStateService(BaseService[UserNarrativeState]):
     async def add_visited_fragment(
         self, session: AsyncSession, state_id: int, fragment_key: str
     ) -> None:
-        """Añade un fragmento a la lista de fragmentos visitados."""
+        """
+        Marca un fragmento como visitado en el mapa de bits del estado. Un
+        estado aún con la lista legada se convierte antes de marcarlo.
+        """
         self.logger.debug(
             "Añadiendo fragmento visitado", 
             state_id=state_id, 
@@ -505,17 +641,41 @@ class UserNarrativeStateService(BaseService[UserNarrativeState]):
         )
         
         state = await self.get_by_id(session, state_id)
-        if not state:
-            self.logger.error("Estado narrativo no encontrado", state_id=state_id)
+        if state and state.visited_bitmap is None:
+            keys = [*(state.visited_fragments or ()), fragment_key]
+            rows = await session.execute(
+                select(StoryFragment.key, StoryFragment.ordinal).where(
+                    StoryFragment.key.in_(keys), StoryFragment.ordinal.isnot(None)
+                )
+            )
+            ordinals = dict(rows.all())
+            state.visited_bitmap = fragment_bitmap.from_ordinals(
+                ordinals[key] for key in keys if key in ordinals
+            )
+            state.visited_fragments = None
+            await session.flush()
             return
         
-        visited = state.visited_fragments.copy() if state.visited_fragments else []
-        if fragment_key not in visited:
-            visited.append(fragment_key)
-            await self.update(session, state_id, {"visited_fragments": visited})
+        ordinal = select(StoryFragment.ordinal).where(
+            StoryFragment.key == fragment_key
+        ).scalar_subquery()
+        
+        query = (
+            update(UserNarrativeState)
+            .where(
+                UserNarrativeState.id == state_id,
+                UserNarrativeState.visited_bitmap.isnot(None),
+                ordinal.isnot(None)
+            )
+            .values(
+                visited_bitmap=fragment_bitmap.sql_with_bit(UserNarrativeState.visited_bitmap, ordinal)
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await session.execute(query)
 
 
-class NarrativeTriggerService(BaseService[EmotionalNarrativeTrigger]):
+class NarrativeTriggerService(StoryContentService[EmotionalNarrativeTrigger]):
     """Servicio para gestionar disparadores emocionales narrativos."""
     
     def __init__(self):
@@ -0,0 +1,236 @@
+"""Libro de puntos con escritura diferida (write-behind)."""
+
+import asyncio
+from typing import Dict, List, Optional, Tuple
+import structlog
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .gamification import GamificationService, POINTS_SOURCE_COLUMNS
+from ..config import settings
+from ..database.engine import async_session
+
+logger = structlog.get_logger()
+
+# Columnas que acumulan deltas en cada volcado
+LEDGER_COLUMNS = ["current_points", "total_earned", *POINTS_SOURCE_COLUMNS.values()]
+
+class PointsLedger:
+    """
+    Acumula en memoria los puntos otorgados por usuario y fuente.
+
+    Los deltas se vuelcan periódicamente (o al superar un umbral de usuarios
+    pendientes) con un único ``INSERT ... ON CONFLICT DO UPDATE`` multi-fila
+    que incrementa las columnas en el servidor y crea los registros que falten.
+
+    Si el lote falla, se reintenta usuario a usuario en savepoints para que
+    una fila errónea no bloquee al resto; los deltas de un usuario que falla
+    ``max_attempts`` volcados seguidos se descartan. Los logros de nivel se
+    comprueban después de confirmar los puntos.
+    """
+
+    def __init__(self, flush_interval: float = 2.0, max_pending: int = 500, max_attempts: int = 5):
+        """
+        Inicializa el libro de puntos.
+
+        Args:
+            flush_interval: Segundos entre volcados periódicos.
+            max_pending: Número de usuarios pendientes que fuerza un volcado.
+            max_attempts: Volcados fallidos de un usuario antes de descartar sus deltas.
+        """
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.gamification_service = GamificationService()
+        self.logger = structlog.get_logger(service="PointsLedger")
+        self._pending: Dict[int, Dict[str, float]] = {}
+        self._failures: Dict[int, int] = {}
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def record(self, user_id: int, amount: float, source: str) -> None:
+        """Registra puntos otorgados a un usuario sin tocar la base de datos."""
+        if amount <= 0:
+            raise ValueError("La cantidad de puntos debe ser positiva")
+
+        deltas = self._pending.get(user_id)
+        if deltas is None:
+            deltas = self._pending[user_id] = dict.fromkeys(LEDGER_COLUMNS, 0.0)
+
+        deltas["current_points"] += amount
+        deltas["total_earned"] += amount
+
+        source_column = POINTS_SOURCE_COLUMNS.get(source)
+        if source_column:
+            deltas[source_column] += amount
+
+        # Forzar volcado si hay demasiados usuarios pendientes
+        if len(self._pending) >= self.max_pending:
+            self._schedule_flush()
+
+    def pending_points(self, user_id: int) -> float:
+        """Devuelve los puntos aún no volcados de un usuario."""
+        deltas = self._pending.get(user_id)
+        return deltas["current_points"] if deltas else 0.0
+
+    async def start(self) -> None:
+        """Inicia el volcado periódico."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            self.logger.info("Libro de puntos iniciado", interval=self.flush_interval)
+
+    async def stop(self) -> None:
+        """Detiene el volcado periódico y vuelca los deltas pendientes."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        await self._safe_flush()
+        self.logger.info("Libro de puntos detenido")
+
+    async def flush(self) -> int:
+        """Vuelca los deltas pendientes. Devuelve el número de usuarios actualizados."""
+        async with self._lock:
+            if not self._pending:
+                return 0
+
+            pending, self._pending = self._pending, {}
+
+            try:
+                async with async_session() as session:
+                    new_points = await self._apply(session, pending)
+                    await session.commit()
+            except Exception as e:
+                self.logger.warning(
+                    "Error al volcar el lote de puntos, reintentando por usuario",
+                    users=len(pending),
+                    error=str(e)
+                )
+                new_points = await self._apply_per_user(pending)
+
+            for user_id in new_points:
+                self._failures.pop(user_id, None)
+
+            self.logger.debug("Puntos volcados", users=len(new_points))
+
+        await self._check_level_ups(pending, new_points)
+        return len(new_points)
+
+    async def _apply(
+        self, session: AsyncSession, pending: Dict[int, Dict[str, float]]
+    ) -> Dict[int, float]:
+        """Aplica los deltas. Devuelve los puntos actuales por usuario."""
+        points_service = self.gamification_service.points_service
+        return await points_service.increment_points_bulk(session, pending)
+
+    async def _apply_per_user(self, pending: Dict[int, Dict[str, float]]) -> Dict[int, float]:
+        """Aplica los deltas de cada usuario en su propio savepoint."""
+        new_points: Dict[int, float] = {}
+        failed: List[Tuple[int, str]] = []
+
+        try:
+            async with async_session() as session:
+                for user_id, user_deltas in pending.items():
+                    try:
+                        async with session.begin_nested():
+                            new_points.update(await self._apply(session, {user_id: user_deltas}))
+                    except Exception as e:
+                        failed.append((user_id, str(e)))
+                await session.commit()
+        except Exception as e:
+            # Falló la conexión o el commit: nada se volcó
+            self.logger.error("Error al volcar los puntos por usuario", error=str(e))
+            failed = [(user_id, str(e)) for user_id in pending]
+            new_points = {}
+
+        retry = {}
+        for user_id, error in failed:
+            attempts = self._failures.get(user_id, 0) + 1
+            if attempts >= self.max_attempts:
+                self._failures.pop(user_id, None)
+                self.logger.error(
+                    "Deltas de puntos descartados tras varios intentos",
+                    user_id=user_id,
+                    attempts=attempts,
+                    deltas=pending[user_id],
+                    error=error
+                )
+            else:
+                self._failures[user_id] = attempts
+                retry[user_id] = pending[user_id]
+
+        # Reincorporar los deltas para el siguiente volcado
+        self._merge_back(retry)
+        return new_points
+
+    async def _check_level_ups(
+        self, pending: Dict[int, Dict[str, float]], new_points: Dict[int, float]
+    ) -> None:
+        """Detecta subidas de nivel y comprueba sus logros, ya confirmados los puntos."""
+        for user_id, current_points in new_points.items():
+            old_points = current_points - pending[user_id]["current_points"]
+            old_level = self.gamification_service.calculate_level(old_points)["current_level"]
+            new_level = self.gamification_service.calculate_level(current_points)["current_level"]
+
+            if new_level <= old_level:
+                continue
+
+            self.logger.info(
+                "Subida de nivel",
+                user_id=user_id,
+                old_level=old_level,
+                new_level=new_level
+            )
+            try:
+                async with async_session() as session:
+                    await self.gamification_service.check_level_achievements(
+                        session, user_id, new_level
+                    )
+                    await session.commit()
+            except Exception as e:
+                self.logger.error(
+                    "Error al comprobar logros de nivel",
+                    user_id=user_id,
+                    new_level=new_level,
+                    error=str(e)
+                )
+
+    def _merge_back(self, pending: Dict[int, Dict[str, float]]) -> None:
+        """Reincorpora deltas no volcados al libro."""
+        for user_id, user_deltas in pending.items():
+            current = self._pending.get(user_id)
+            if current is None:
+                self._pending[user_id] = user_deltas
+            else:
+                for name, delta in user_deltas.items():
+                    current[name] += delta
+
+    def _schedule_flush(self) -> None:
+        """Programa un volcado inmediato si no hay otro en curso."""
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(self._safe_flush())
+
+    async def _safe_flush(self) -> None:
+        """Vuelca los deltas registrando los errores en lugar de propagarlos."""
+        try:
+            await self.flush()
+        except Exception as e:
+            self.logger.error("Error al volcar el libro de puntos", error=str(e))
+
+    async def _run(self) -> None:
+        """Bucle de volcado periódico."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self._safe_flush()
+
+
+# Singleton instance
+points_ledger = PointsLedger(
+    flush_interval=settings.POINTS_LEDGER_FLUSH_INTERVAL,
+    max_pending=settings.POINTS_LEDGER_MAX_PENDING,
+    max_attempts=settings.POINTS_LEDGER_MAX_ATTEMPTS,
+)
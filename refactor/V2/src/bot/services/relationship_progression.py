@@ -0,0 +1,226 @@
+"""Progresión de las relaciones entre usuarios y personajes."""
+
+from bisect import bisect_right
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+import structlog
+from sqlalchemy import case, cast, func, or_
+from sqlalchemy.dialects.postgresql import array
+
+from .emotion_vector import EmotionVector
+from ..config.constants import RELATIONSHIP_LEVELS
+from ..database.models.emotional import RelationshipStatusEnum, UserCharacterRelationship
+
+logger = structlog.get_logger()
+
+# Emociones que acercan o alejan al personaje
+POSITIVE_EMOTIONS = ("joy", "trust", "surprise", "anticipation")
+NEGATIVE_EMOTIONS = ("fear", "sadness", "anger", "disgust")
+
+# Nivel mínimo de cada estado (de mayor a menor)
+STATUS_BY_LEVEL = (
+    (6, RelationshipStatusEnum.INTIMATE),
+    (5, RelationshipStatusEnum.CLOSE),
+    (3, RelationshipStatusEnum.FRIENDLY),
+    (2, RelationshipStatusEnum.ACQUAINTANCE),
+    (1, RelationshipStatusEnum.INITIAL),
+)
+
+# Estados que deriva el motor; el resto (``repaired``, ``distant``,
+# ``complex``) se fijan a mano y el motor no los sobrescribe
+DERIVED_STATUSES = frozenset(
+    [status for _, status in STATUS_BY_LEVEL] + [RelationshipStatusEnum.STRAINED]
+)
+
+class RelationshipTransition:
+    """Cambio de nivel o de estado de una relación."""
+
+    __slots__ = ("relationship_id", "old_level", "new_level", "old_status", "new_status")
+
+    def __init__(
+        self,
+        relationship_id: int,
+        old_level: int,
+        new_level: int,
+        old_status: RelationshipStatusEnum,
+        new_status: RelationshipStatusEnum
+    ):
+        self.relationship_id = relationship_id
+        self.old_level = old_level
+        self.new_level = new_level
+        self.old_status = old_status
+        self.new_status = new_status
+
+    @property
+    def level_up(self) -> bool:
+        """Indica si la relación subió de nivel."""
+        return self.new_level > self.old_level
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Diccionario para la respuesta del servicio."""
+        return {
+            "level_up": self.level_up,
+            "old_level": self.old_level,
+            "new_level": self.new_level,
+            "new_level_name": RELATIONSHIP_LEVELS[self.new_level]["name"],
+            "old_status": self.old_status.value,
+            "new_status": self.new_status.value,
+        }
+
+    def __repr__(self) -> str:
+        return (
+            f"<RelationshipTransition(relationship_id={self.relationship_id}, "
+            f"level={self.old_level}->{self.new_level}, "
+            f"status={self.old_status.value}->{self.new_status.value})>"
+        )
+
+class RelationshipProgression:
+    """
+    Deriva el nivel y el estado de una relación de sus métricas acumuladas.
+
+    Cada interacción suma familiaridad fija, sintonía (``rapport``) según el
+    balance entre emociones positivas y negativas del mensaje y confianza
+    según el impacto en ``trust``. La puntuación (familiaridad + sintonía) se
+    compara con los umbrales de ``RELATIONSHIP_LEVELS``, precalculados al
+    crear el motor: ``width_bucket`` en SQL y ``bisect`` en Python aplican el
+    mismo criterio. El estado se deriva del nivel, salvo ``strained`` cuando
+    la sintonía cae por debajo de ``strained_rapport``; los estados fijados a
+    mano (fuera de ``DERIVED_STATUSES``) se conservan.
+
+    ``sql_values`` se aplica en el mismo UPDATE que incrementa
+    ``interaction_count``; las transiciones se deducen de los valores previos
+    y nuevos que devuelve esa sentencia, sin consultas extra.
+    """
+
+    def __init__(
+        self,
+        levels: Mapping[int, Mapping[str, Any]] = RELATIONSHIP_LEVELS,
+        familiarity_per_interaction: float = 10.0,
+        rapport_per_impact: float = 20.0,
+        trust_per_impact: float = 0.02,
+        strained_rapport: float = -200.0
+    ):
+        """
+        Inicializa el motor.
+
+        Args:
+            levels: Niveles con su puntuación mínima (``points``), numerados desde 1.
+            familiarity_per_interaction: Familiaridad que suma cada interacción.
+            rapport_per_impact: Sintonía por unidad de impacto emocional neto.
+            trust_per_impact: Confianza (0-1) por unidad de impacto en ``trust``.
+            strained_rapport: Sintonía por debajo de la cual la relación se tensa.
+        """
+        numbers = sorted(levels)
+        if numbers != list(range(1, len(numbers) + 1)):
+            raise ValueError("Los niveles de relación deben numerarse de forma consecutiva desde 1")
+
+        self.thresholds: Tuple[float, ...] = tuple(float(levels[n]["points"]) for n in numbers)
+        self.familiarity_per_interaction = familiarity_per_interaction
+        self.rapport_per_impact = rapport_per_impact
+        self.trust_per_impact = trust_per_impact
+        self.strained_rapport = strained_rapport
+        self.logger = structlog.get_logger(service="RelationshipProgression")
+        self._listeners: List[Callable[[RelationshipTransition], None]] = []
+
+    def deltas(self, impact: EmotionVector) -> Tuple[float, float, float]:
+        """Aporte de una interacción a familiaridad, sintonía y confianza."""
+        balance = sum(impact[e] for e in POSITIVE_EMOTIONS) - sum(impact[e] for e in NEGATIVE_EMOTIONS)
+        return (
+            self.familiarity_per_interaction,
+            balance * self.rapport_per_impact,
+            impact["trust"] * self.trust_per_impact,
+        )
+
+    def level_for(self, score: float) -> int:
+        """Nivel correspondiente a una puntuación."""
+        return max(1, bisect_right(self.thresholds, score))
+
+    def status_for(self, level: int, rapport: float) -> RelationshipStatusEnum:
+        """Estado correspondiente a un nivel y una sintonía."""
+        if rapport < self.strained_rapport:
+            return RelationshipStatusEnum.STRAINED
+        for minimum, status in STATUS_BY_LEVEL:
+            if level >= minimum:
+                return status
+        return RelationshipStatusEnum.INITIAL
+
+    def sql_values(self, impact: EmotionVector) -> Dict[str, Any]:
+        """Expresiones SQL que aplican una interacción a ``UserCharacterRelationship``."""
+        familiarity_delta, rapport_delta, trust_delta = self.deltas(impact)
+        model = UserCharacterRelationship
+
+        familiarity = func.coalesce(model.familiarity, 0.0) + familiarity_delta
+        rapport = func.coalesce(model.rapport, 0.0) + rapport_delta
+        level = func.greatest(1, func.width_bucket(familiarity + rapport, array(self.thresholds)))
+
+        status_type = model.relationship_status.type
+        derived = cast(
+            case(
+                (rapport < self.strained_rapport, RelationshipStatusEnum.STRAINED.name),
+                *[(level >= minimum, level_status.name) for minimum, level_status in STATUS_BY_LEVEL],
+                else_=RelationshipStatusEnum.INITIAL.name
+            ),
+            status_type
+        )
+        status = case(
+            (
+                or_(
+                    model.relationship_status.is_(None),
+                    model.relationship_status.in_(sorted(DERIVED_STATUSES, key=lambda s: s.name))
+                ),
+                derived
+            ),
+            else_=model.relationship_status
+        )
+
+        values = {
+            "familiarity": familiarity,
+            "rapport": rapport,
+            "relationship_level": level,
+            "relationship_status": status,
+        }
+        if trust_delta:
+            values["trust_level"] = func.least(
+                1.0, func.greatest(0.0, func.coalesce(model.trust_level, 0.0) + trust_delta)
+            )
+        return values
+
+    def transition(self, relationship_id: int, row: Any) -> Optional[RelationshipTransition]:
+        """
+        Deduce la transición de una interacción a partir de los valores que
+        devuelve el UPDATE: ``previous_level`` y ``previous_status`` (leídos
+        de la fila antes de escribirla) y ``relationship_level`` y
+        ``relationship_status``.
+        """
+        old_level = row.previous_level
+        old_status = row.previous_status or RelationshipStatusEnum.INITIAL
+
+        if old_level == row.relationship_level and old_status == row.relationship_status:
+            return None
+
+        return RelationshipTransition(
+            relationship_id, old_level, row.relationship_level, old_status, row.relationship_status
+        )
+
+    def add_listener(self, listener: Callable[[RelationshipTransition], None]) -> None:
+        """Registra una función que recibe cada transición."""
+        self._listeners.append(listener)
+
+    def emit(self, transition: RelationshipTransition) -> None:
+        """Notifica una transición a los listeners."""
+        self.logger.info(
+            "Transición de relación",
+            relationship_id=transition.relationship_id,
+            old_level=transition.old_level,
+            new_level=transition.new_level,
+            old_status=transition.old_status.value,
+            new_status=transition.new_status.value
+        )
+        for listener in self._listeners:
+            try:
+                listener(transition)
+            except Exception as e:
+                self.logger.error("Error en listener de transición", error=str(e))
+
+
+# Singleton instance
+relationship_progression = RelationshipProgression()
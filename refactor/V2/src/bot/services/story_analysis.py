@@ -0,0 +1,227 @@
+"""Análisis estático del grafo narrativo."""
+
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+import structlog
+
+from . import fragment_bitmap
+
+logger = structlog.get_logger()
+
+def _strongly_connected(successors: Sequence[Sequence[int]]) -> Tuple[List[int], List[List[int]]]:
+    """
+    Componentes fuertemente conexas (Tarjan, iterativo).
+
+    Devuelve la componente de cada nodo y las componentes en orden
+    topológico inverso: cada componente aparece después de sus sucesoras.
+    """
+    size = len(successors)
+    index = [-1] * size
+    low = [0] * size
+    on_stack = [False] * size
+    component = [-1] * size
+    components: List[List[int]] = []
+    stack: List[int] = []
+    counter = 0
+
+    for root in range(size):
+        if index[root] != -1:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, iter(successors[root]))]
+
+        while work:
+            node, pending = work[-1]
+            for target in pending:
+                if index[target] == -1:
+                    index[target] = low[target] = counter
+                    counter += 1
+                    stack.append(target)
+                    on_stack[target] = True
+                    work.append((target, iter(successors[target])))
+                    break
+                if on_stack[target]:
+                    low[node] = min(low[node], index[target])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    members = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component[member] = len(components)
+                        members.append(member)
+                        if member == node:
+                            break
+                    components.append(members)
+
+    return component, components
+
+def _immediate_dominators(
+    successors: Sequence[Sequence[int]],
+    predecessors: Sequence[Sequence[int]],
+    start: int
+) -> List[Optional[int]]:
+    """
+    Dominador inmediato de cada nodo alcanzable desde ``start`` (Cooper,
+    Harvey y Kennedy). Los nodos no alcanzables quedan en None.
+    """
+    # Orden posterior de un recorrido en profundidad desde el inicio
+    postorder: List[int] = []
+    seen = {start}
+    work = [(start, iter(successors[start]))]
+    while work:
+        node, pending = work[-1]
+        for target in pending:
+            if target not in seen:
+                seen.add(target)
+                work.append((target, iter(successors[target])))
+                break
+        else:
+            work.pop()
+            postorder.append(node)
+
+    number = {node: position for position, node in enumerate(postorder)}
+    idom: List[Optional[int]] = [None] * len(successors)
+    idom[start] = start
+
+    def intersect(a: int, b: int) -> int:
+        while a != b:
+            while number[a] < number[b]:
+                a = idom[a]
+            while number[b] < number[a]:
+                b = idom[b]
+        return a
+
+    changed = True
+    while changed:
+        changed = False
+        for node in reversed(postorder):
+            if node == start:
+                continue
+            candidate = None
+            for predecessor in predecessors[node]:
+                if idom[predecessor] is not None:
+                    candidate = predecessor if candidate is None else intersect(predecessor, candidate)
+            if idom[node] != candidate:
+                idom[node] = candidate
+                changed = True
+
+    return idom
+
+class StoryAnalysis:
+    """
+    Tablas precalculadas sobre los fragmentos y sus opciones.
+
+    - ``reachable``: por fragmento, conjunto de fragmentos alcanzables desde
+      él (incluido él mismo) como entero de bits por ``ordinal``, el mismo
+      formato que ``visited_bitmap``. Se calcula sobre el grafo condensado
+      de componentes fuertemente conexas, en orden topológico inverso.
+    - ``remaining``: por fragmento, máximo de fragmentos que quedan por ver
+      en un camino hasta un final. En un ciclo cuenta una vez cada
+      fragmento de la componente (cota superior).
+    - ``idom``: dominador inmediato de cada fragmento alcanzable desde el
+      inicio; ``dominators`` da los fragmentos por los que pasa cualquier
+      camino hasta uno dado.
+    - ``dangling``: opciones cuyo destino no existe.
+    - ``unreachable``: fragmentos a los que no se llega desde el inicio.
+
+    Los fragmentos sin ``ordinal`` participan en el análisis pero no
+    aparecen en los conjuntos de bits.
+    """
+
+    __slots__ = ("reachable", "remaining", "idom", "dangling", "unreachable", "dead_ends")
+
+    def __init__(self, fragments: Mapping[str, Any], initial_key: str):
+        """
+        Analiza el grafo.
+
+        Args:
+            fragments: Nodos por clave con ``ordinal`` y ``choices``
+                (con ``id`` y ``target_fragment_key``).
+            initial_key: Clave del fragmento inicial.
+        """
+        keys = list(fragments)
+        position = {key: i for i, key in enumerate(keys)}
+        successors: List[List[int]] = [[] for _ in keys]
+        predecessors: List[List[int]] = [[] for _ in keys]
+        dangling = []
+
+        for i, key in enumerate(keys):
+            for choice in fragments[key].choices:
+                target = position.get(choice.target_fragment_key)
+                if target is None:
+                    dangling.append((choice.id, key, choice.target_fragment_key))
+                elif target not in successors[i]:
+                    successors[i].append(target)
+                    predecessors[target].append(i)
+
+        bits = [
+            1 << fragments[key].ordinal if fragments[key].ordinal is not None else 0
+            for key in keys
+        ]
+
+        # Alcanzables y camino restante sobre el grafo condensado
+        component, components = _strongly_connected(successors)
+        reach = [0] * len(components)
+        remaining = [0] * len(components)
+        for c, members in enumerate(components):
+            value = 0
+            longest = -1
+            for member in members:
+                value |= bits[member]
+                for target in successors[member]:
+                    other = component[target]
+                    if other != c:
+                        value |= reach[other]
+                        longest = max(longest, remaining[other])
+            reach[c] = value
+            remaining[c] = len(members) - 1 + (longest + 1 if longest >= 0 else 0)
+
+        start = position.get(initial_key)
+        idom = _immediate_dominators(successors, predecessors, start) if start is not None else [None] * len(keys)
+
+        self.reachable = MappingProxyType({key: reach[component[i]] for i, key in enumerate(keys)})
+        self.remaining = MappingProxyType({key: remaining[component[i]] for i, key in enumerate(keys)})
+        self.idom = MappingProxyType({
+            key: keys[idom[i]] for i, key in enumerate(keys) if idom[i] is not None and i != start
+        })
+        self.dangling: Tuple[Tuple[int, str, str], ...] = tuple(dangling)
+        self.unreachable: Tuple[str, ...] = tuple(
+            key for i, key in enumerate(keys) if idom[i] is None
+        )
+        self.dead_ends: Tuple[str, ...] = tuple(key for i, key in enumerate(keys) if not successors[i])
+
+    def dominators(self, key: str) -> List[str]:
+        """Fragmentos por los que pasa todo camino desde el inicio hasta ``key`` (sin incluirlo)."""
+        chain = []
+        while key in self.idom:
+            key = self.idom[key]
+            chain.append(key)
+        return chain[::-1]
+
+    def progress(self, visited: Optional[bytes], current_key: Optional[str]) -> Tuple[int, int]:
+        """
+        Fragmentos vistos y horizonte del usuario: los vistos más los que
+        aún puede alcanzar desde el fragmento actual.
+        """
+        seen = int.from_bytes(visited, "little") if visited else 0
+        horizon = seen | self.reachable.get(current_key, 0)
+        return fragment_bitmap.popcount(visited), horizon.bit_count()
+
+    def report(self) -> Dict[str, Any]:
+        """Resumen de los problemas detectados."""
+        return {
+            "dangling_choices": [
+                {"choice_id": choice_id, "fragment_key": key, "target_fragment_key": target}
+                for choice_id, key, target in self.dangling
+            ],
+            "unreachable_fragments": list(self.unreachable),
+            "dead_ends": list(self.dead_ends),
+        }
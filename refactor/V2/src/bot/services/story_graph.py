@@ -0,0 +1,352 @@
+"""Grafo narrativo compilado en memoria."""
+
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+import structlog
+from sqlalchemy import event, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session
+
+from . import fragment_bitmap
+from .choice_requirements import ChoiceRequirement
+from .story_analysis import StoryAnalysis
+from ..database.engine import async_session
+from ..database.models.narrative import StoryFragment, NarrativeChoice, EmotionalNarrativeTrigger
+
+logger = structlog.get_logger()
+
+# Por convención, el fragmento inicial tiene la clave "start"
+INITIAL_FRAGMENT_KEY = "start"
+
+# Marca en ``session.info`` de que la transacción modificó contenido narrativo
+STORY_CHANGED_KEY = "story_content_changed"
+
+def _frozen(value: Any) -> Any:
+    """Copia de solo lectura de un valor JSON o ARRAY."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _frozen(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_frozen(v) for v in value)
+    return value
+
+def _thawed(value: Any) -> Any:
+    """Copia mutable (serializable a JSON) de un valor congelado."""
+    if isinstance(value, MappingProxyType):
+        return {k: _thawed(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thawed(v) for v in value]
+    return value
+
+class _Frozen:
+    """Base de los nodos inmutables del grafo."""
+
+    __slots__ = ()
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("El grafo narrativo es de solo lectura")
+
+    def _set(self, **values: Any) -> None:
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+class ChoiceNode(_Frozen):
+    """Opción narrativa compilada."""
+
+    __slots__ = (
+        "id", "fragment_key", "text", "target_fragment_key", "required_items",
+        "required_relationship_level", "required_points", "points_change",
+        "relationship_change", "emotional_impacts", "requirement"
+    )
+
+    def __init__(self, choice: NarrativeChoice, character: Optional[str] = None):
+        self._set(
+            id=choice.id,
+            fragment_key=choice.fragment_key,
+            text=choice.text,
+            target_fragment_key=choice.target_fragment_key,
+            required_items=_frozen(choice.required_items or {}),
+            required_relationship_level=choice.required_relationship_level or 0,
+            required_points=choice.required_points or 0.0,
+            points_change=choice.points_change,
+            relationship_change=choice.relationship_change,
+            emotional_impacts=_frozen(choice.emotional_impacts or {}),
+            # El nivel de relación requerido se refiere al personaje del fragmento
+            requirement=ChoiceRequirement.for_choice(choice, character),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Diccionario para las respuestas del servicio narrativo."""
+        return {
+            "id": self.id,
+            "text": self.text,
+            "target_fragment_key": self.target_fragment_key,
+            "points_change": self.points_change,
+            "relationship_change": self.relationship_change
+        }
+
+    def __repr__(self) -> str:
+        return f"<ChoiceNode(id={self.id}, target='{self.target_fragment_key}')>"
+
+class TriggerNode(_Frozen):
+    """Disparador emocional compilado."""
+
+    __slots__ = (
+        "id", "fragment_key", "trigger_type", "character_name", "condition_type",
+        "condition_value", "emotional_response", "priority"
+    )
+
+    def __init__(self, trigger: EmotionalNarrativeTrigger):
+        self._set(
+            id=trigger.id,
+            fragment_key=trigger.fragment_key,
+            trigger_type=trigger.trigger_type,
+            character_name=trigger.character_name,
+            condition_type=trigger.condition_type,
+            condition_value=_frozen(trigger.condition_value),
+            emotional_response=_frozen(trigger.emotional_response),
+            priority=trigger.priority,
+        )
+
+    def __repr__(self) -> str:
+        return f"<TriggerNode(id={self.id}, trigger='{self.trigger_type}')>"
+
+class FragmentNode(_Frozen):
+    """Fragmento compilado con sus opciones y disparadores (por prioridad descendente)."""
+
+    __slots__ = (
+        "id", "key", "ordinal", "title", "character", "text", "tags", "level_required", "is_vip_only",
+        "reward_besitos", "reward_items", "unlock_achievements", "choices", "triggers"
+    )
+
+    def __init__(
+        self,
+        fragment: StoryFragment,
+        choices: Tuple[ChoiceNode, ...],
+        triggers: Tuple[TriggerNode, ...]
+    ):
+        self._set(
+            id=fragment.id,
+            key=fragment.key,
+            ordinal=fragment.ordinal,
+            title=fragment.title,
+            character=fragment.character,
+            text=fragment.text,
+            tags=_frozen(fragment.tags or []),
+            level_required=fragment.level_required,
+            is_vip_only=fragment.is_vip_only,
+            reward_besitos=fragment.reward_besitos,
+            reward_items=_frozen(fragment.reward_items or {}),
+            unlock_achievements=_frozen(fragment.unlock_achievements or []),
+            choices=choices,
+            triggers=triggers,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Diccionario para las respuestas del servicio narrativo."""
+        return {
+            "key": self.key,
+            "title": self.title,
+            "character": self.character,
+            "text": self.text,
+            "tags": _thawed(self.tags),
+            "reward_besitos": self.reward_besitos,
+            "reward_items": _thawed(self.reward_items)
+        }
+
+    def __repr__(self) -> str:
+        return f"<FragmentNode(key='{self.key}', choices={len(self.choices)})>"
+
+class StoryGraph:
+    """
+    Grafo narrativo inmutable: fragmentos por clave con sus opciones
+    salientes y sus disparadores ya ordenados, y opciones por id.
+
+    Los fragmentos visitados se guardan como mapas de bits por ``ordinal``;
+    el grafo traduce entre claves y bits. ``analysis`` guarda las tablas de
+    alcance y progreso calculadas al compilar.
+    """
+
+    __slots__ = ("fragments", "choices", "version", "keys_by_ordinal", "analysis")
+
+    def __init__(
+        self,
+        fragments: Mapping[str, FragmentNode],
+        choices: Mapping[int, ChoiceNode],
+        version: Tuple[Any, ...]
+    ):
+        object.__setattr__(self, "fragments", MappingProxyType(dict(fragments)))
+        object.__setattr__(self, "choices", MappingProxyType(dict(choices)))
+        object.__setattr__(self, "version", version)
+        object.__setattr__(self, "keys_by_ordinal", MappingProxyType({
+            node.ordinal: key for key, node in fragments.items() if node.ordinal is not None
+        }))
+        object.__setattr__(self, "analysis", StoryAnalysis(self.fragments, INITIAL_FRAGMENT_KEY))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("El grafo narrativo es de solo lectura")
+
+    @classmethod
+    def compile(
+        cls,
+        fragments: List[StoryFragment],
+        choices: List[NarrativeChoice],
+        triggers: List[EmotionalNarrativeTrigger],
+        version: Tuple[Any, ...] = ()
+    ) -> "StoryGraph":
+        """Compila el grafo a partir de las filas de las tres tablas."""
+        characters = {fragment.key: fragment.character for fragment in fragments}
+        choices_by_fragment: Dict[str, List[ChoiceNode]] = {}
+        choice_nodes: Dict[int, ChoiceNode] = {}
+        for choice in sorted(choices, key=lambda c: c.id):
+            node = ChoiceNode(choice, characters.get(choice.fragment_key))
+            choice_nodes[node.id] = node
+            choices_by_fragment.setdefault(node.fragment_key, []).append(node)
+
+        triggers_by_fragment: Dict[str, List[TriggerNode]] = {}
+        for trigger in sorted(triggers, key=lambda t: (-(t.priority or 0), t.id)):
+            triggers_by_fragment.setdefault(trigger.fragment_key, []).append(TriggerNode(trigger))
+
+        fragment_nodes = {
+            fragment.key: FragmentNode(
+                fragment,
+                tuple(choices_by_fragment.get(fragment.key, ())),
+                tuple(triggers_by_fragment.get(fragment.key, ()))
+            )
+            for fragment in fragments
+        }
+        return cls(fragment_nodes, choice_nodes, version)
+
+    @property
+    def initial(self) -> Optional[FragmentNode]:
+        """Fragmento inicial de la narrativa."""
+        return self.fragments.get(INITIAL_FRAGMENT_KEY)
+
+    def fragment(self, key: Optional[str]) -> Optional[FragmentNode]:
+        """Obtiene un fragmento por clave."""
+        return self.fragments.get(key) if key else None
+
+    def choice(self, choice_id: int) -> Optional[ChoiceNode]:
+        """Obtiene una opción por id."""
+        return self.choices.get(choice_id)
+
+    def bitmap_for(self, keys: Iterable[str]) -> bytes:
+        """Mapa de bits de una lista de claves (se ignoran las desconocidas)."""
+        nodes = (self.fragments.get(key) for key in keys)
+        return fragment_bitmap.from_ordinals(
+            node.ordinal for node in nodes if node is not None and node.ordinal is not None
+        )
+
+    def visited(self, state: Any) -> bytes:
+        """Mapa de visitados de un estado, convirtiendo la lista legada si aún no se migró."""
+        if state.visited_bitmap is not None:
+            return state.visited_bitmap
+        return self.bitmap_for(state.visited_fragments or ())
+
+    def visited_keys(self, bitmap: Optional[bytes]) -> List[str]:
+        """Claves de los fragmentos marcados en un mapa, por ordinal."""
+        return [
+            self.keys_by_ordinal[ordinal]
+            for ordinal in fragment_bitmap.ordinals(bitmap)
+            if ordinal in self.keys_by_ordinal
+        ]
+
+    def __len__(self) -> int:
+        return len(self.fragments)
+
+class StoryGraphStore:
+    """
+    Mantiene el grafo narrativo vigente.
+
+    El grafo se carga al arrancar y se sustituye entero (hot-swap) cuando
+    cambia la versión del contenido: en este proceso, al confirmarse una
+    transacción que editó contenido narrativo; desde otros procesos, al
+    detectarlo ``refresh`` (recuento y última modificación de las tablas).
+    Los lectores que ya tienen una referencia al grafo anterior la siguen
+    usando sin bloqueos.
+    """
+
+    def __init__(self):
+        self.logger = structlog.get_logger(service="StoryGraphStore")
+        self.graph = StoryGraph({}, {}, ())
+        self.version = 0
+        self._loaded_version = -1
+
+    @property
+    def is_stale(self) -> bool:
+        """Indica si el grafo debe recargarse."""
+        return self._loaded_version != self.version
+
+    async def content_version(self, session: AsyncSession) -> Tuple[Any, ...]:
+        """Huella del contenido narrativo en una sola consulta."""
+        parts = []
+        for model in (StoryFragment, NarrativeChoice, EmotionalNarrativeTrigger):
+            parts.append(select(func.count()).select_from(model).scalar_subquery())
+            parts.append(select(func.max(model.updated_at)).scalar_subquery())
+
+        result = await session.execute(select(*parts))
+        return tuple(result.one())
+
+    async def load(self, session: AsyncSession) -> StoryGraph:
+        """Carga el contenido narrativo y sustituye el grafo."""
+        version = self.version
+        content_version = await self.content_version(session)
+
+        fragments = (await session.execute(select(StoryFragment))).scalars().all()
+        choices = (await session.execute(select(NarrativeChoice))).scalars().all()
+        triggers = (await session.execute(select(EmotionalNarrativeTrigger))).scalars().all()
+
+        # Sustitución atómica del grafo
+        self.graph = StoryGraph.compile(list(fragments), list(choices), list(triggers), content_version)
+        self._loaded_version = version
+
+        self.logger.info(
+            "Grafo narrativo cargado",
+            fragments=len(self.graph),
+            choices=len(self.graph.choices),
+            version=version
+        )
+        analysis = self.graph.analysis
+        if analysis.dangling or analysis.unreachable:
+            self.logger.warning(
+                "Problemas en el grafo narrativo",
+                dangling_choices=[choice_id for choice_id, _, _ in analysis.dangling],
+                unreachable_fragments=list(analysis.unreachable)
+            )
+        return self.graph
+
+    async def get(self, session: AsyncSession) -> StoryGraph:
+        """Devuelve el grafo vigente, recargándolo si fue invalidado."""
+        if self.is_stale:
+            await self.load(session)
+        return self.graph
+
+    async def refresh(self) -> None:
+        """Recarga el grafo si el contenido cambió en la base de datos."""
+        async with async_session() as session:
+            if await self.content_version(session) != self.graph.version:
+                self.invalidate()
+                await self.load(session)
+
+    def invalidate(self) -> None:
+        """Marca el grafo para recargarlo en la siguiente consulta."""
+        self.version += 1
+
+def mark_story_changed(session: AsyncSession) -> None:
+    """Indica que la transacción de la sesión modifica contenido narrativo."""
+    session.info[STORY_CHANGED_KEY] = True
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    """Invalida el grafo cuando se confirma una edición del contenido."""
+    if session.info.pop(STORY_CHANGED_KEY, False):
+        story_graph_store.invalidate()
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    """Descarta la marca si la edición se revierte."""
+    session.info.pop(STORY_CHANGED_KEY, None)
+
+
+# Singleton instance
+story_graph_store = StoryGraphStore()
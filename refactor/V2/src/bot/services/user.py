@@ -1,17 +1,134 @@
 """Servicio de gestión de usuarios."""
 
-from typing import Optional, Dict, Any, List
+import time
+from typing import Optional, Dict, Any, List, Set, Tuple
 import structlog
+from cachetools import TTLCache
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import update, and_, or_
+from sqlalchemy import event, update, and_, or_, func, literal_column
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
 
 from .base import BaseService
+from ..config import settings
 from ..database.models.user import User
 from ..database.models.gamification import UserPoints
 
 logger = structlog.get_logger()
 
+# Campos de perfil que provienen de Telegram
+PROFILE_FIELDS = ("username", "first_name", "last_name", "language_code")
+
+# Marca en ``session.info`` con los usuarios modificados por la transacción
+# (None: cualquier usuario)
+USERS_CHANGED_KEY = "users_changed"
+
+class UserSnapshot:
+    """
+    Copia inmutable de los campos de un usuario que lee el pipeline de
+    middlewares; es lo que se guarda en caché y en ``data["db_user"]``.
+    """
+    
+    __slots__ = ("id", "is_banned", "is_vip", "is_admin")
+    
+    def __init__(self, user: User):
+        set_ = object.__setattr__
+        set_(self, "id", user.id)
+        set_(self, "is_banned", bool(user.is_banned))
+        set_(self, "is_vip", bool(user.is_vip))
+        set_(self, "is_admin", bool(user.is_admin))
+    
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("Las copias de usuario son de solo lectura")
+    
+    def __repr__(self) -> str:
+        return f"<UserSnapshot(id={self.id}, is_vip={self.is_vip}, is_banned={self.is_banned})>"
+
+class CachedIdentity:
+    """Entrada del caché de identidad de usuarios."""
+    
+    __slots__ = ("fingerprint", "user", "activity_written_at")
+    
+    def __init__(self, fingerprint: Tuple[Any, ...], user: UserSnapshot):
+        self.fingerprint = fingerprint
+        self.user = user
+        self.activity_written_at = time.monotonic()
+
+class UserIdentityCache:
+    """
+    Caché local al proceso de la identidad de usuarios.
+    
+    Guarda la huella de los campos de perfil y una copia inmutable del
+    usuario (``UserSnapshot``), con expiración por TTL y desalojo LRU, para
+    escribir en la base de datos solo cuando el perfil cambia. Las escrituras
+    de ``UserService`` sobre rol o baneo invalidan la entrada al confirmarse.
+    """
+    
+    def __init__(self, maxsize: int = 10000, ttl: int = 300):
+        """
+        Inicializa el caché.
+        
+        Args:
+            maxsize: Número máximo de usuarios en caché.
+            ttl: Segundos que una entrada permanece válida.
+        """
+        self._entries: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+    
+    @staticmethod
+    def fingerprint(user_data: Dict[str, Any]) -> Tuple[Any, ...]:
+        """Calcula la huella de los campos de perfil."""
+        return tuple(user_data.get(field) for field in PROFILE_FIELDS)
+    
+    def get(self, user_id: int) -> Optional[CachedIdentity]:
+        """Obtiene la entrada de un usuario si sigue vigente."""
+        return self._entries.get(user_id)
+    
+    def put(self, user_id: int, fingerprint: Tuple[Any, ...], user: UserSnapshot) -> CachedIdentity:
+        """Guarda la identidad de un usuario."""
+        entry = CachedIdentity(fingerprint, user)
+        self._entries[user_id] = entry
+        return entry
+    
+    def invalidate(self, user_id: int) -> None:
+        """Elimina un usuario del caché (p. ej. tras cambiar su rol o baneo)."""
+        self._entries.pop(user_id, None)
+    
+    def clear(self) -> None:
+        """Vacía el caché."""
+        self._entries.clear()
+
+def mark_user_changed(session: AsyncSession, user_id: Optional[int]) -> None:
+    """
+    Indica que la transacción de la sesión modifica un usuario (None: uno o
+    varios sin identificar) para invalidar su identidad en caché al confirmarla.
+    """
+    changed: Set[Optional[int]] = session.info.setdefault(USERS_CHANGED_KEY, set())
+    changed.add(user_id)
+
+def _invalidate_changed(session: Session) -> None:
+    changed = session.info.pop(USERS_CHANGED_KEY, None)
+    if not changed:
+        return
+    if None in changed:
+        user_identity_cache.clear()
+        return
+    for user_id in changed:
+        user_identity_cache.invalidate(user_id)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    """Invalida las identidades de los usuarios modificados al confirmar."""
+    _invalidate_changed(session)
+
+@event.listens_for(Session, "after_rollback")
+def _invalidate_after_rollback(session: Session) -> None:
+    """
+    También se invalida si la transacción se revierte: parte del trabajo
+    pudo confirmarse antes y un fallo de caché no tiene coste de corrección.
+    """
+    _invalidate_changed(session)
+
 class UserService(BaseService[User]):
     """Servicio para gestionar usuarios."""
     
@@ -22,6 +139,33 @@ class UserService(BaseService[User]):
         """Obtiene un usuario por su ID."""
         return await self.get_by_id(session, user_id)
     
+    async def create(self, session: AsyncSession, data: Dict[str, Any]) -> User:
+        """Crea un usuario e invalida su identidad en caché al confirmar."""
+        mark_user_changed(session, data.get("id"))
+        return await super().create(session, data)
+    
+    async def update(self, session: AsyncSession, id: Any, data: Dict[str, Any]) -> Optional[User]:
+        """Actualiza un usuario e invalida su identidad en caché al confirmar."""
+        mark_user_changed(session, id)
+        return await super().update(session, id, data)
+    
+    async def update_bulk(
+        self, session: AsyncSession, filter_dict: Dict[str, Any], data: Dict[str, Any]
+    ) -> int:
+        """Actualiza usuarios y vacía el caché de identidad al confirmar."""
+        mark_user_changed(session, None)
+        return await super().update_bulk(session, filter_dict, data)
+    
+    async def delete(self, session: AsyncSession, id: Any) -> bool:
+        """Elimina un usuario e invalida su identidad en caché al confirmar."""
+        mark_user_changed(session, id)
+        return await super().delete(session, id)
+    
+    async def delete_bulk(self, session: AsyncSession, filter_dict: Dict[str, Any]) -> int:
+        """Elimina usuarios y vacía el caché de identidad al confirmar."""
+        mark_user_changed(session, None)
+        return await super().delete_bulk(session, filter_dict)
+    
     async def get_users_by_role(self, session: AsyncSession, is_admin: bool = False, is_vip: bool = False) -> List[User]:
         """Obtiene usuarios por rol."""
         self.logger.debug("Obteniendo usuarios por rol", is_admin=is_admin, is_vip=is_vip)
@@ -60,31 +204,59 @@ class UserService(BaseService[User]):
         self, session: AsyncSession, user_id: int, user_data: Dict[str, Any]
     ) -> User:
         """Crea o actualiza un usuario."""
+        user, _ = await self.upsert_user(session, user_id, user_data)
+        return user
+    
+    async def upsert_user(
+        self, session: AsyncSession, user_id: int, user_data: Dict[str, Any]
+    ) -> Tuple[User, bool]:
+        """
+        Crea o actualiza un usuario con un único ``INSERT ... ON CONFLICT DO UPDATE``.
+        
+        Devuelve el usuario y si fue creado en esta llamada.
+        """
         self.logger.debug("Creando o actualizando usuario", user_id=user_id)
         
-        user = await self.get_user(session, user_id)
-        if user:
-            # Actualizar usuario existente
-            user = await self.update(session, user_id, user_data)
-            self.logger.info("Usuario actualizado", user_id=user_id)
-        else:
-            # Crear nuevo usuario
-            user_data["id"] = user_id
-            user = await self.create(session, user_data)
-            
-            # Crear registro de puntos para el usuario
-            points_data = {
-                "user_id": user_id,
-                "current_points": 0.0,
-                "total_earned": 0.0,
+        profile = {field: user_data.get(field) for field in PROFILE_FIELDS}
+        
+        query = insert(User).values(id=user_id, **profile)
+        query = query.on_conflict_do_update(
+            index_elements=[User.id],
+            set_={
+                **{field: getattr(query.excluded, field) for field in PROFILE_FIELDS},
+                "last_activity_at": func.now(),
+                "updated_at": func.now()
             }
-            
-            user_points = UserPoints(**points_data)
-            session.add(user_points)
-            
+        ).returning(User, literal_column("(xmax = 0)").label("inserted"))
+        
+        result = await session.execute(
+            query, execution_options={"populate_existing": True}
+        )
+        user, created = result.one()
+        
+        if created:
+            # Crear registro de puntos para el usuario
+            await session.execute(
+                insert(UserPoints)
+                .values(user_id=user_id, current_points=0.0, total_earned=0.0)
+                .on_conflict_do_nothing(index_elements=[UserPoints.user_id])
+            )
             self.logger.info("Nuevo usuario creado", user_id=user_id)
+        else:
+            self.logger.info("Usuario actualizado", user_id=user_id)
         
-        return user
+        return user, created
+    
+    async def touch_activity(self, session: AsyncSession, user_id: int) -> None:
+        """Actualiza la fecha de última actividad sin leer el usuario."""
+        self.logger.debug("Actualizando última actividad", user_id=user_id)
+        
+        await session.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(last_activity_at=func.now())
+            .execution_options(synchronize_session=False)
+        )
     
     async def set_vip_status(self, session: AsyncSession, user_id: int, is_vip: bool) -> Optional[User]:
         """Establece el estado VIP de un usuario."""
@@ -94,6 +266,7 @@ class UserService(BaseService[User]):
         if user:
             user.is_vip = is_vip
             await session.flush()
+            mark_user_changed(session, user_id)
             
             self.logger.info("Estado VIP actualizado", user_id=user_id, is_vip=is_vip)
             return user
@@ -108,12 +281,28 @@ class UserService(BaseService[User]):
         if user:
             user.is_admin = is_admin
             await session.flush()
+            mark_user_changed(session, user_id)
             
             self.logger.info("Estado de administrador actualizado", user_id=user_id, is_admin=is_admin)
             return user
         
         return None
     
+    async def set_ban_status(self, session: AsyncSession, user_id: int, is_banned: bool) -> Optional[User]:
+        """Banea o readmite a un usuario."""
+        self.logger.debug("Estableciendo baneo", user_id=user_id, is_banned=is_banned)
+        
+        user = await self.get_user(session, user_id)
+        if user:
+            user.is_banned = is_banned
+            await session.flush()
+            mark_user_changed(session, user_id)
+            
+            self.logger.info("Baneo actualizado", user_id=user_id, is_banned=is_banned)
+            return user
+        
+        return None
+    
     async def increment_stats(self, session: AsyncSession, user_id: int, messages: int = 0, reactions: int = 0) -> None:
         """Incrementa las estadísticas de un usuario."""
         self.logger.debug("Incrementando estadísticas", user_id=user_id, messages=messages, reactions=reactions)
@@ -136,4 +325,11 @@ class UserService(BaseService[User]):
     async def is_admin(self, session: AsyncSession, user_id: int) -> bool:
         """Verifica si un usuario es administrador."""
         user = await self.get_user(session, user_id)
-        return user is not None and user.is_admin
\ No newline at end of file
+        return user is not None and user.is_admin
+
+
+# Singleton instance
+user_identity_cache = UserIdentityCache(
+    maxsize=settings.USER_CACHE_SIZE,
+    ttl=settings.USER_CACHE_TTL,
+)
\ No newline at end of file
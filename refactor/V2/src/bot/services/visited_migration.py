@@ -0,0 +1,131 @@
+"""Migración de los fragmentos visitados a mapas de bits."""
+
+from typing import Dict, List
+import structlog
+from sqlalchemy import and_, bindparam, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from . import fragment_bitmap
+from ..database.engine import async_session, engine
+from ..database.models.narrative import ORDINAL_SEQUENCE, StoryFragment, UserNarrativeState
+
+logger = structlog.get_logger()
+
+# Columnas nuevas (idempotente; no hay Alembic en el proyecto)
+SCHEMA_CHANGES = (
+    "ALTER TABLE story_fragments ADD COLUMN IF NOT EXISTS ordinal INTEGER UNIQUE",
+    "ALTER TABLE user_narrative_states ADD COLUMN IF NOT EXISTS visited_bitmap BYTEA",
+    "ALTER TABLE user_narrative_states ALTER COLUMN visited_fragments DROP NOT NULL",
+    "CREATE SEQUENCE IF NOT EXISTS story_fragment_ordinal_seq MINVALUE 0 START 0",
+    # La secuencia no retrocede nunca por debajo del mayor ordinal asignado
+    "SELECT setval('story_fragment_ordinal_seq', "
+    "(SELECT max(ordinal) FROM story_fragments)) "
+    "WHERE (SELECT max(ordinal) FROM story_fragments) >= "
+    "(SELECT CASE WHEN is_called THEN last_value ELSE last_value - 1 END FROM story_fragment_ordinal_seq)",
+    "ALTER TABLE story_fragments ALTER COLUMN ordinal SET DEFAULT nextval('story_fragment_ordinal_seq')",
+)
+
+class VisitedFragmentsMigration:
+    """
+    Convierte ``visited_fragments`` (lista de claves) en ``visited_bitmap``.
+
+    1. Añade las columnas ``ordinal`` y ``visited_bitmap`` si no existen y
+       la secuencia ``story_fragment_ordinal_seq``, que da el valor por
+       defecto de ``ordinal``.
+    2. Numera con la secuencia los fragmentos sin ordinal, por ``id``. Los
+       ordinales asignados no cambian nunca ni se reutilizan: un fragmento
+       nuevo no hereda el bit de uno borrado.
+    3. Lee por bloques los estados sin mapa, construye el mapa en Python y lo
+       escribe con ``executemany`` vaciando la lista, una transacción por
+       bloque. Las claves de fragmentos que ya no existen se descartan.
+
+    Es idempotente y puede relanzarse; conviene ejecutarla antes de desplegar
+    el bot, que solo lee la lista legada de los estados aún sin migrar.
+    """
+
+    def __init__(self, chunk_size: int = 10000):
+        """
+        Inicializa la migración.
+
+        Args:
+            chunk_size: Estados por bloque de lectura y escritura.
+        """
+        self.chunk_size = chunk_size
+        self.logger = structlog.get_logger(service="VisitedFragmentsMigration")
+
+    async def migrate(self) -> int:
+        """Ejecuta la migración completa. Devuelve los estados convertidos."""
+        async with engine.begin() as conn:
+            for statement in SCHEMA_CHANGES:
+                await conn.execute(text(statement))
+
+        ordinals = await self.assign_ordinals()
+
+        written = 0
+        query = (
+            select(UserNarrativeState.id, UserNarrativeState.visited_fragments)
+            .where(UserNarrativeState.visited_bitmap.is_(None))
+            .execution_options(yield_per=self.chunk_size)
+        )
+
+        async with async_session() as reader, async_session() as writer:
+            stream = await reader.stream(query)
+            async for rows in stream.partitions():
+                written += await self._write(writer, rows, ordinals)
+                await writer.commit()
+
+        self.logger.info("Fragmentos visitados migrados", states=written)
+        return written
+
+    async def assign_ordinals(self) -> Dict[str, int]:
+        """Numera los fragmentos sin ordinal y devuelve el ordinal de cada clave."""
+        async with async_session() as session:
+            pending = (
+                select(StoryFragment.id)
+                .where(StoryFragment.ordinal.is_(None))
+                .order_by(StoryFragment.id)
+                .subquery()
+            )
+            # nextval se evalúa sobre la subconsulta ya ordenada
+            numbered = select(
+                pending.c.id, ORDINAL_SEQUENCE.next_value().label("ordinal")
+            ).subquery()
+            result = await session.execute(
+                update(StoryFragment)
+                .where(StoryFragment.id == numbered.c.id)
+                .values(ordinal=numbered.c.ordinal)
+                .execution_options(synchronize_session=False)
+            )
+            self.logger.info("Ordinales asignados", fragments=result.rowcount)
+
+            rows = await session.execute(select(StoryFragment.key, StoryFragment.ordinal))
+            ordinals = {key: ordinal for key, ordinal in rows}
+            await session.commit()
+        return ordinals
+
+    async def _write(self, session: AsyncSession, rows: List, ordinals: Dict[str, int]) -> int:
+        """Escribe los mapas de un bloque con una sola sentencia ejecutada por lotes."""
+        table = UserNarrativeState.__table__
+        statement = (
+            update(table)
+            .where(and_(table.c.id == bindparam("state_id"), table.c.visited_bitmap.is_(None)))
+            .values(visited_bitmap=bindparam("bitmap"), visited_fragments=None)
+        )
+
+        params = [
+            {
+                "state_id": state_id,
+                "bitmap": fragment_bitmap.from_ordinals(
+                    ordinals[key] for key in (visited or ()) if key in ordinals
+                ),
+            }
+            for state_id, visited in rows
+        ]
+        if params:
+            await session.execute(statement, params)
+        return len(params)
+
+
+# Singleton instance
+visited_fragments_migration = VisitedFragmentsMigration()
@@ -0,0 +1,97 @@
+"""Pruebas de los mapas de bits de fragmentos visitados."""
+
+import pytest
+from sqlalchemy import Column, Integer, LargeBinary, MetaData, Table, select
+from sqlalchemy.dialects import postgresql
+
+from src.bot.services.fragment_bitmap import (
+    from_ordinals,
+    has_bit,
+    ordinals,
+    popcount,
+    sql_with_bit,
+    with_bit,
+)
+
+def pg_set_bit(data: bytes, n: int) -> bytes:
+    """
+    ``set_bit(data, n, 1)`` de PostgreSQL: el bit 0 es el menos significativo
+    del primer byte. No amplía el valor (falla fuera de rango).
+    """
+    if n >= len(data) * 8:
+        raise IndexError(n)
+    result = bytearray(data)
+    result[n // 8] |= 1 << (n % 8)
+    return bytes(result)
+
+def sql_padded(data: bytes, n: int) -> bytes:
+    """Lo que concatena ``sql_with_bit`` antes de ``set_bit``."""
+    return data + bytes(max(0, n // 8 + 1 - len(data)))
+
+CASES = [
+    (None, 0, b"\x01"),
+    (None, 7, b"\x80"),
+    (None, 8, b"\x00\x01"),
+    (None, 15, b"\x00\x80"),
+    (b"\x01", 9, b"\x01\x02"),
+    (b"\xff\x00", 3, b"\xff\x00"),
+    (b"\x00\x00\x00", 17, b"\x00\x00\x02"),
+    (b"", 200, bytes(25) + b"\x01"),
+]
+
+@pytest.mark.parametrize("bitmap, ordinal, expected", CASES)
+def test_with_bit_matches_postgres_set_bit(bitmap, ordinal, expected):
+    assert with_bit(bitmap, ordinal) == expected
+    assert pg_set_bit(sql_padded(bitmap or b"", ordinal), ordinal) == expected
+
+@pytest.mark.parametrize("bitmap, ordinal, expected", CASES)
+def test_has_bit_after_with_bit(bitmap, ordinal, expected):
+    assert has_bit(expected, ordinal)
+    assert not has_bit(expected, ordinal + 8 * len(expected))
+
+@pytest.mark.parametrize("marked", [[], [0], [8], [7, 8], [3, 9, 17, 64], list(range(0, 100, 3))])
+def test_ordinals_round_trip(marked):
+    bitmap = from_ordinals(marked)
+
+    assert list(ordinals(bitmap)) == marked
+    assert popcount(bitmap) == len(marked)
+    assert all(has_bit(bitmap, ordinal) for ordinal in marked)
+
+    built = None
+    for ordinal in marked:
+        built = with_bit(built, ordinal)
+    assert (built or b"") == bitmap
+
+def test_empty_bitmaps():
+    assert not has_bit(None, 0)
+    assert popcount(None) == 0
+    assert list(ordinals(None)) == []
+    assert from_ordinals([]) == b""
+
+def _table() -> Table:
+    return Table(
+        "states",
+        MetaData(),
+        Column("visited_bitmap", LargeBinary),
+        Column("ordinal", Integer),
+    )
+
+def test_sql_with_bit_pads_to_ordinal_byte():
+    table = _table()
+
+    compiled = select(sql_with_bit(table.c.visited_bitmap, 17)).compile(dialect=postgresql.dialect())
+
+    sql = str(compiled)
+    assert "set_bit(coalesce(states.visited_bitmap" in sql
+    assert "decode(repeat(" in sql
+    # Byte del ordinal más uno y el propio ordinal
+    assert 3 in compiled.params.values()
+    assert 17 in compiled.params.values()
+
+def test_sql_with_bit_accepts_column_ordinal():
+    table = _table()
+
+    sql = str(select(sql_with_bit(table.c.visited_bitmap, table.c.ordinal)).compile(dialect=postgresql.dialect()))
+
+    assert "states.ordinal / " in sql
+    assert sql.count("states.ordinal") == 2
@@ -0,0 +1,32 @@
+"""Pruebas de la progresión de relaciones."""
+
+import pytest
+
+from src.bot.services.relationship_progression import RelationshipProgression
+
+def pg_width_bucket(operand: float, thresholds) -> int:
+    """``width_bucket(operand, thresholds)`` de PostgreSQL: límites inferiores ya ordenados."""
+    return sum(1 for threshold in thresholds if threshold <= operand)
+
+LEVELS = {1: {"points": 0}, 2: {"points": 100}, 3: {"points": 250}, 4: {"points": 500}}
+
+@pytest.mark.parametrize(
+    "score, level",
+    [(-500, 1), (-0.01, 1), (0, 1), (99.99, 1), (100, 2), (249, 2), (250, 3), (500, 4), (10_000, 4)],
+)
+def test_level_for_matches_width_bucket(score, level):
+    progression = RelationshipProgression(levels=LEVELS)
+
+    assert progression.level_for(score) == level
+    assert max(1, pg_width_bucket(score, progression.thresholds)) == level
+
+def test_level_for_matches_width_bucket_on_default_levels():
+    progression = RelationshipProgression()
+    scores = [t + d for t in progression.thresholds for d in (-1, -0.001, 0, 0.001, 1)] + [-1e6, 1e9]
+
+    for score in scores:
+        assert progression.level_for(score) == max(1, pg_width_bucket(score, progression.thresholds))
+
+def test_levels_must_be_consecutive():
+    with pytest.raises(ValueError):
+        RelationshipProgression(levels={1: {"points": 0}, 3: {"points": 100}})
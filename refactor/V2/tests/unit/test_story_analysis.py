@@ -0,0 +1,185 @@
+"""Pruebas del análisis estático del grafo narrativo."""
+
+import random
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import pytest
+
+from src.bot.services.fragment_bitmap import from_ordinals, with_bit
+from src.bot.services.story_analysis import (
+    StoryAnalysis,
+    _immediate_dominators,
+    _strongly_connected,
+)
+
+def story(graph: Dict[str, Tuple[Optional[int], Sequence[str]]]) -> Dict[str, SimpleNamespace]:
+    """Fragmentos falsos a partir de ``clave: (ordinal, destinos)``."""
+    choice_ids = iter(range(1, 10_000))
+    return {
+        key: SimpleNamespace(
+            ordinal=ordinal,
+            choices=[SimpleNamespace(id=next(choice_ids), target_fragment_key=t) for t in targets],
+        )
+        for key, (ordinal, targets) in graph.items()
+    }
+
+def brute_force_dominators(successors: Sequence[Sequence[int]], start: int) -> List[Optional[Set[int]]]:
+    """Dominadores por definición: ``d`` domina ``n`` si quitar ``d`` deja ``n`` inalcanzable."""
+    def reachable(skip: int) -> Set[int]:
+        if skip == start:
+            return set()
+        seen = {start}
+        work = [start]
+        while work:
+            for target in successors[work.pop()]:
+                if target != skip and target not in seen:
+                    seen.add(target)
+                    work.append(target)
+        return seen
+
+    everything = reachable(-1)
+    return [
+        {d for d in range(len(successors)) if d != n and n not in reachable(d)} if n in everything else None
+        for n in range(len(successors))
+    ]
+
+GRAPHS = {
+    "lineal": [[1], [2], []],
+    "ciclo": [[1], [2], [1, 3], []],
+    "rombo": [[1, 2], [3], [3], []],
+    "bucle_propio": [[0, 1], []],
+    "inalcanzable": [[1], [], [1]],
+    "ciclos_anidados": [[1], [2, 4], [3], [1, 2], [5], [4, 0]],
+}
+
+@pytest.mark.parametrize("successors", GRAPHS.values(), ids=GRAPHS.keys())
+def test_components_in_reverse_topological_order(successors):
+    component, components = _strongly_connected(successors)
+
+    assert sorted(n for members in components for n in members) == list(range(len(successors)))
+    for node, targets in enumerate(successors):
+        for target in targets:
+            # Las sucesoras aparecen antes (o en la misma componente)
+            assert component[target] <= component[node]
+
+def test_cycle_is_one_component():
+    component, components = _strongly_connected(GRAPHS["ciclo"])
+
+    assert component[1] == component[2]
+    assert len({component[0], component[1], component[3]}) == 3
+    assert len(components) == 3
+
+def test_components_of_long_chain_do_not_recurse():
+    size = 20_000
+    successors = [[i + 1] for i in range(size - 1)] + [[0]]
+
+    _, components = _strongly_connected(successors)
+
+    assert len(components) == 1
+
+@pytest.mark.parametrize("successors", GRAPHS.values(), ids=GRAPHS.keys())
+def test_dominators_match_definition(successors):
+    predecessors = [[] for _ in successors]
+    for node, targets in enumerate(successors):
+        for target in targets:
+            predecessors[target].append(node)
+
+    idom = _immediate_dominators(successors, predecessors, 0)
+    expected = brute_force_dominators(successors, 0)
+
+    for node in range(1, len(successors)):
+        chain = set()
+        current = node
+        while idom[current] is not None and current != 0:
+            current = idom[current]
+            chain.add(current)
+        assert (chain if idom[node] is not None else None) == expected[node]
+
+def test_dominators_match_definition_on_random_graphs():
+    rng = random.Random(20)
+    for _ in range(200):
+        size = rng.randint(2, 12)
+        successors = [rng.sample(range(size), rng.randint(0, min(size, 3))) for _ in range(size)]
+        predecessors = [[] for _ in successors]
+        for node, targets in enumerate(successors):
+            for target in targets:
+                predecessors[target].append(node)
+
+        idom = _immediate_dominators(successors, predecessors, 0)
+        expected = brute_force_dominators(successors, 0)
+
+        for node in range(1, size):
+            if expected[node] is None:
+                assert idom[node] is None
+            else:
+                # El dominador inmediato es el dominador estricto más cercano
+                assert expected[node] == {idom[node]} | expected[idom[node]]
+
+def test_linear_story():
+    analysis = StoryAnalysis(story({"a": (0, ["b"]), "b": (1, ["c"]), "c": (2, [])}), "a")
+
+    assert analysis.reachable["a"] == 0b111
+    assert analysis.reachable["c"] == 0b100
+    assert dict(analysis.remaining) == {"a": 2, "b": 1, "c": 0}
+    assert analysis.dominators("c") == ["a", "b"]
+    assert analysis.dead_ends == ("c",)
+    assert analysis.unreachable == ()
+
+def test_cycle_counts_each_fragment_once():
+    analysis = StoryAnalysis(
+        story({"a": (0, ["b"]), "b": (1, ["c"]), "c": (2, ["b", "d"]), "d": (3, [])}), "a"
+    )
+
+    assert analysis.reachable["b"] == analysis.reachable["c"] == 0b1110
+    assert dict(analysis.remaining) == {"a": 3, "b": 2, "c": 2, "d": 0}
+    assert analysis.dominators("d") == ["a", "b", "c"]
+
+def test_self_loop():
+    analysis = StoryAnalysis(story({"a": (0, ["a", "b"]), "b": (1, [])}), "a")
+
+    assert analysis.remaining["a"] == 1
+    assert analysis.dead_ends == ("b",)
+
+def test_unreachable_and_dangling():
+    fragments = story({"a": (0, ["b", "missing"]), "b": (1, []), "x": (2, ["b"])})
+
+    analysis = StoryAnalysis(fragments, "a")
+
+    missing_choice = fragments["a"].choices[1].id
+    assert analysis.dangling == ((missing_choice, "a", "missing"),)
+    assert analysis.unreachable == ("x",)
+    assert "x" not in analysis.idom
+    assert analysis.dominators("b") == ["a"]
+    assert analysis.report()["unreachable_fragments"] == ["x"]
+
+def test_missing_initial_fragment_marks_everything_unreachable():
+    analysis = StoryAnalysis(story({"a": (0, ["b"]), "b": (1, [])}), "missing")
+
+    assert analysis.unreachable == ("a", "b")
+    assert dict(analysis.idom) == {}
+
+def test_diamond_dominator_is_the_fork():
+    analysis = StoryAnalysis(
+        story({"a": (0, ["b", "c"]), "b": (1, ["d"]), "c": (2, ["d"]), "d": (3, [])}), "a"
+    )
+
+    assert analysis.idom["d"] == "a"
+    assert analysis.dominators("d") == ["a"]
+
+def test_fragments_without_ordinal_are_not_counted():
+    analysis = StoryAnalysis(story({"a": (None, ["b"]), "b": (0, [])}), "a")
+
+    assert analysis.reachable["a"] == 0b1
+    assert analysis.remaining["a"] == 1
+
+@pytest.mark.parametrize("ordinals", [(0, 9, 17), (8,), (7, 8), (63, 64, 200)])
+def test_reachable_uses_bitmap_layout_beyond_first_byte(ordinals):
+    keys = [f"f{ordinal}" for ordinal in ordinals]
+    graph = {key: (ordinal, keys[i + 1:i + 2]) for i, (key, ordinal) in enumerate(zip(keys, ordinals))}
+
+    analysis = StoryAnalysis(story(graph), keys[0])
+
+    assert analysis.reachable[keys[0]] == int.from_bytes(from_ordinals(ordinals), "little")
+    assert analysis.progress(with_bit(None, ordinals[0]), keys[0]) == (1, len(ordinals))
+    assert analysis.progress(None, keys[-1]) == (0, 1)
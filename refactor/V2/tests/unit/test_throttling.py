@@ -0,0 +1,74 @@
+"""Pruebas del limitador GCRA."""
+
+import pytest
+
+from src.bot.middlewares.throttling import RateLimiter
+
+# (instante, segundos de espera esperados, consumir)
+BURST_THEN_STEADY = [
+    (0.0, 0.0, True),
+    (0.0, 0.0, True),
+    (0.0, 0.0, True),
+    (0.0, 0.5, False),    # Ráfaga de 3 agotada
+    (0.25, 0.25, False),
+    (0.5, 0.0, True),     # Un cupo cada 0,5 s
+    (0.75, 0.25, False),
+    (1.0, 0.0, True),
+    (1.0, 0.5, False),
+    (3.0, 0.0, True),     # Tras esperar, el cubo vuelve a llenarse
+    (3.0, 0.0, True),
+    (3.0, 0.0, True),
+    (3.0, 0.5, False),
+]
+
+def test_burst_then_steady_state():
+    limiter = RateLimiter(rate=2.0, burst=3)
+
+    for now, expected, consume in BURST_THEN_STEADY:
+        assert limiter.retry_after(1, now) == pytest.approx(expected), now
+        if consume:
+            limiter.consume(1, now)
+
+@pytest.mark.parametrize("rate, burst", [(1.0, 1), (2.0, 3), (10.0, 5), (0.5, 2)])
+def test_steady_rate_never_waits(rate, burst):
+    limiter = RateLimiter(rate=rate, burst=burst)
+
+    for step in range(50):
+        now = step / rate
+        assert limiter.retry_after(1, now) == pytest.approx(0.0)
+        limiter.consume(1, now)
+
+@pytest.mark.parametrize("rate, burst", [(1.0, 1), (2.0, 3), (10.0, 5), (0.5, 2)])
+def test_exhausted_burst_waits_one_interval(rate, burst):
+    limiter = RateLimiter(rate=rate, burst=burst)
+
+    for _ in range(burst):
+        assert limiter.retry_after(1, 0.0) == 0.0
+        limiter.consume(1, 0.0)
+
+    assert limiter.retry_after(1, 0.0) == pytest.approx(1.0 / rate)
+
+def test_deferred_consumption_accumulates_wait():
+    limiter = RateLimiter(rate=1.0, burst=1)
+
+    for expected in (0.0, 1.0, 2.0, 3.0):
+        assert limiter.retry_after(1, 0.0) == pytest.approx(expected)
+        limiter.consume(1, 0.0)
+
+def test_keys_are_independent():
+    limiter = RateLimiter(rate=1.0, burst=1)
+    limiter.consume(1, 0.0)
+
+    assert limiter.retry_after(1, 0.0) == pytest.approx(1.0)
+    assert limiter.retry_after(2, 0.0) == 0.0
+
+def test_prune_drops_full_buckets():
+    limiter = RateLimiter(rate=1.0, burst=2, prune_interval=60.0)
+    limiter.consume(1, 0.0)
+    limiter.consume(2, 0.0)
+    assert len(limiter) == 2
+
+    limiter.consume(3, 61.0)
+
+    assert len(limiter) == 1
+    assert limiter.retry_after(1, 61.0) == 0.0